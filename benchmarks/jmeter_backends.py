@@ -0,0 +1,38 @@
+"""
+Compara el backend Python puro con el backend columnar (NumPy) del parser JMeter.
+
+Uso:
+    python -m benchmarks.jmeter_backends --rows 500000 --labels 50 --repeat 3
+"""
+import argparse, time
+
+from benchmarks.synthetic import synthetic_jtl
+from src.services.jmeter_summary import build_summary_from_jmeter
+
+def _best_of(backend: str, data: bytes, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        build_summary_from_jmeter(data, backend=backend)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=200_000)
+    ap.add_argument("--labels", type=int, default=20)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    data = synthetic_jtl(args.rows, args.labels)
+    print(f"filas={args.rows} labels={args.labels} bytes={len(data)}")
+    for backend in ("python", "numpy"):
+        try:
+            secs = _best_of(backend, data, args.repeat)
+        except RuntimeError as e:
+            print(f"{backend:>7}: omitido ({e})")
+            continue
+        print(f"{backend:>7}: {secs:8.3f} s  {args.rows / secs:12,.0f} filas/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Suite de benchmarks reproducible de los parsers, de la ruta /summary (IA reemplazada por un stub)
+y del arranque de un worker.
+
+Cada caso corre en un subproceso nuevo (spawn) sobre un archivo sintético determinista, así
+el pico de RSS (ru_maxrss) es propio del caso y no arrastra memoria de los anteriores. Se toma
+la mejor de `--repeat` pasadas. Métricas: filas/s, pico de RSS y, para la ruta, p50/p99 de
+latencia por request (route-wide: con WIDE_LABELS labels, donde pesa serializar la respuesta).
+Los casos startup miden, en un proceso recién creado, el import de la app, el arranque
+(lifespan, con o sin WARMUP) y la latencia del primer /summary.
+
+La línea base queda en benchmarks/baseline.json (`--save`). Sin `--save` se compara contra
+ella y el proceso termina con código 1 si algún caso empeora más que `--tolerance`.
+Las cifras dependen de la máquina: la línea base se graba en el mismo runner que compara.
+
+Uso:
+    python -m benchmarks.suite                      # corre y compara
+    python -m benchmarks.suite --save               # corre y graba la línea base
+    python -m benchmarks.suite --cases jmeter-python,route --rows 100000
+"""
+import argparse, json, multiprocessing, os, platform, resource, sys, tempfile, time
+from typing import Any, Callable, Dict, List
+
+from benchmarks.synthetic import iter_jtl_lines, iter_k6_points_lines, synthetic_k6_summary
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Métrica -> True si "más alto es mejor"; se usa para decidir si un cambio es regresión.
+METRICS = {"rows_per_s": True, "peak_rss_mb": False, "p99_ms": False,
+           "import_ms": False, "first_request_ms": False}
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss está en KiB en Linux y en bytes en macOS.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def _bench_parser(path: str, filename: str, content_type: str, rows: int, repeat: int) -> Dict[str, Any]:
+    from src.application.summary_service import build_summary_from_path
+
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        summary, _, _ = build_summary_from_path(path, filename, content_type)
+        best = min(best, time.perf_counter() - t0)
+    if summary.overall.requests <= 0:
+        raise RuntimeError(f"{filename}: el parser no devolvió requests")
+    return {"seconds": round(best, 4), "rows_per_s": round(rows / best)}
+
+def _bench_parallel(path: str, filename: str, content_type: str, rows: int, repeat: int) -> Dict[str, Any]:
+    # Como en el servicio: cada rango es un trabajo del pool de parseo (procesos).
+    import asyncio
+    from src.application.analyze_service import StoredUpload, build_summary
+    from src.infrastructure.concurrency import shutdown_pools
+
+    upload = StoredUpload(path, filename, content_type, os.path.getsize(path), "bench")
+    best = float("inf")
+    try:
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            summary, _, _ = asyncio.run(build_summary(upload, {}, wait=True))
+            best = min(best, time.perf_counter() - t0)
+    finally:
+        shutdown_pools()
+    if summary.overall.requests <= 0:
+        raise RuntimeError(f"{filename}: el parser no devolvió requests")
+    return {"seconds": round(best, 4), "rows_per_s": round(rows / best)}
+
+def _bench_route(path: str, filename: str, content_type: str, rows: int, repeat: int) -> Dict[str, Any]:
+    from fastapi.testclient import TestClient
+    import src.application.analyze_service as analyze_service
+    from src.api.app import app
+    from src.core.percentiles import percentiles
+    from src.domain.summary_contract import AIReport, TokenUsage
+
+    analyze_service.generate_ai_report = lambda summary, comparison=None: (
+        AIReport(title="Informe", overview="stub"), TokenUsage(total_tokens=0), "stub")
+    with open(path, "rb") as fh:
+        data = fh.read()
+    requests = max(repeat * 10, 20)
+    latencies: List[float] = []
+    with TestClient(app) as client:
+        for _ in range(requests):
+            t0 = time.perf_counter()
+            resp = client.post("/summary", files={"file": (filename, data, content_type)})
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+            if resp.status_code != 200:
+                raise RuntimeError(f"/summary respondió {resp.status_code}: {resp.text[:200]}")
+    p50, p99 = percentiles(latencies, (0.50, 0.99))
+    return {"requests": requests, "rows_per_s": round(rows * 1000.0 / p50),
+            "p50_ms": round(p50, 2), "p99_ms": round(p99, 2)}
+
+def _bench_startup(path: str, filename: str, content_type: str, rows: int, repeat: int) -> Dict[str, Any]:
+    # Una sola medición por proceso: el import y el primer request solo son "fríos" una vez.
+    t0 = time.perf_counter()
+    from src.api.app import app
+    import_ms = (time.perf_counter() - t0) * 1000.0
+    from fastapi.testclient import TestClient
+    import src.application.analyze_service as analyze_service
+    from src.domain.summary_contract import AIReport, TokenUsage
+
+    analyze_service.generate_ai_report = lambda summary, comparison=None: (
+        AIReport(title="Informe", overview="stub"), TokenUsage(total_tokens=0), "stub")
+    with open(path, "rb") as fh:
+        data = fh.read()
+    t0 = time.perf_counter()
+    with TestClient(app) as client:
+        startup_ms = (time.perf_counter() - t0) * 1000.0
+        t0 = time.perf_counter()
+        resp = client.post("/summary", files={"file": (filename, data, content_type)})
+        first_ms = (time.perf_counter() - t0) * 1000.0
+        if resp.status_code != 200:
+            raise RuntimeError(f"/summary respondió {resp.status_code}: {resp.text[:200]}")
+    return {"import_ms": round(import_ms, 1), "startup_ms": round(startup_ms, 1),
+            "first_request_ms": round(first_ms, 1)}
+
+# nombre -> (generador, archivo, content-type, env, función de medición)
+CASES: Dict[str, tuple] = {
+    "jmeter-python": ("jtl", "run.jtl", "text/csv", {"JMETER_BACKEND": "python"}, _bench_parser),
+    "jmeter-numpy": ("jtl", "run.jtl", "text/csv", {"JMETER_BACKEND": "numpy"}, _bench_parser),
+    "jmeter-parallel": ("jtl", "run.jtl", "text/csv",
+                        {"JMETER_BACKEND": "python", "JMETER_PARALLEL_WORKERS": str(max(os.cpu_count() or 1, 2)),
+                         "JMETER_PARALLEL_MIN_MB": "0", "PARSE_EXECUTOR": "process",
+                         "PARSE_WORKERS": str(max(os.cpu_count() or 1, 2))}, _bench_parallel),
+    "k6-points": ("k6-points", "run.json", "application/json", {}, _bench_parser),
+    "k6-summary": ("k6-summary", "summary.json", "application/json", {}, _bench_parser),
+    "route": ("jtl", "run.jtl", "text/csv", {}, _bench_route),
+    "route-wide": ("jtl", "run.jtl", "text/csv", {}, _bench_route),
+    "startup": ("jtl", "run.jtl", "text/csv", {"WARMUP": "none"}, _bench_startup),
+    "startup-warm": ("jtl", "run.jtl", "text/csv", {"WARMUP": "all"}, _bench_startup),
+}
+
+# Labels del caso route-wide: respuestas grandes, donde pesa la serialización del summary.
+WIDE_LABELS = 1000
+
+# Entorno común: sin caché (cada request parsea) y parseo en el mismo proceso (RSS medible).
+_BASE_ENV = {"CACHE_BACKEND": "none", "PARSE_EXECUTOR": "inline", "TIMESERIES_WINDOW_MS": "1000"}
+
+def _child(case: str, path: str, rows: int, repeat: int, queue) -> None:
+    _, filename, content_type, env, fn = CASES[case]
+    os.environ.update(_BASE_ENV)
+    os.environ.update(env)
+    # Historial y series de la corrida en el directorio temporal del caso, no en el repo.
+    os.environ["RUNS_DB_PATH"] = os.path.join(os.path.dirname(path), f"runs-{case}.sqlite3")
+    try:
+        result = fn(path, filename, content_type, rows, repeat)
+        result["peak_rss_mb"] = _peak_rss_mb()
+        queue.put(result)
+    except Exception as e:  # el padre informa el caso como omitido
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+
+def _write_input(kind: str, path: str, rows: int, labels: int, seed: int) -> int:
+    """Escribe el archivo sintético y devuelve cuántas filas (requests) representa."""
+    with open(path, "w", encoding="utf-8", newline="") as fh:
+        if kind == "k6-summary":
+            per_label = max(rows // labels, 1)
+            fh.write(synthetic_k6_summary(labels, per_label, seed=seed).decode())
+            return per_label * labels
+        gen: Callable = iter_jtl_lines if kind == "jtl" else iter_k6_points_lines
+        fh.writelines(gen(rows, labels, seed=seed))
+    return rows
+
+def run(cases: List[str], rows: int, labels: int, repeat: int, seed: int) -> Dict[str, Dict[str, Any]]:
+    ctx = multiprocessing.get_context("spawn")
+    results: Dict[str, Dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+        inputs: Dict[str, tuple] = {}
+        for case in cases:
+            kind = CASES[case][0]
+            if kind not in inputs:
+                path = os.path.join(tmp, kind)
+                inputs[kind] = (path, _write_input(kind, path, rows, labels, seed))
+            path, n = inputs[kind]
+            # Para la ruta y el arranque se usa un archivo más chico: interesa la latencia por request.
+            if case.startswith(("route", "startup")):
+                path = os.path.join(tmp, case)
+                n = _write_input(kind, path, max(rows // 20, 1000),
+                                 WIDE_LABELS if case == "route-wide" else labels, seed)
+            queue = ctx.Queue()
+            proc = ctx.Process(target=_child, args=(case, path, n, repeat, queue))
+            proc.start()
+            result = queue.get()
+            proc.join()
+            result["rows"] = n
+            results[case] = result
+            print(_format(case, result), flush=True)
+    return results
+
+def _format(case: str, r: Dict[str, Any]) -> str:
+    if "error" in r:
+        return f"{case:>14}: omitido ({r['error']})"
+    if "import_ms" in r:
+        return (f"{case:>14}: import={r['import_ms']:.0f} ms  arranque={r['startup_ms']:.0f} ms  "
+                f"primer request={r['first_request_ms']:.0f} ms  rss={r['peak_rss_mb']:>7.1f} MB")
+    line = f"{case:>14}: {r['rows_per_s']:>12,} filas/s  rss={r['peak_rss_mb']:>7.1f} MB"
+    if "p99_ms" in r:
+        line += f"  p50={r['p50_ms']:.1f} ms  p99={r['p99_ms']:.1f} ms"
+    return line
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regresiones respecto de la línea base: cambios peores que `tolerance` (fracción) por métrica."""
+    out: List[str] = []
+    for case, r in results.items():
+        base = baseline.get("cases", {}).get(case)
+        if not base or "error" in r or "error" in base:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            if metric not in r or not base.get(metric):
+                continue
+            change = (r[metric] - base[metric]) / base[metric]
+            if (-change if higher_is_better else change) > tolerance:
+                out.append(f"{case}.{metric}: {base[metric]} -> {r[metric]} ({change:+.1%})")
+    return out
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--cases", default=",".join(CASES), help="casos separados por coma")
+    ap.add_argument("--rows", type=int, default=200_000)
+    ap.add_argument("--labels", type=int, default=20)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--tolerance", type=float, default=0.15, help="empeoramiento admitido (0.15 = 15%%)")
+    ap.add_argument("--baseline", default=BASELINE_PATH)
+    ap.add_argument("--save", action="store_true", help="graba los resultados como línea base")
+    args = ap.parse_args()
+
+    cases = [c.strip() for c in args.cases.split(",") if c.strip()]
+    unknown = [c for c in cases if c not in CASES]
+    if unknown:
+        ap.error(f"casos desconocidos: {', '.join(unknown)}")
+    params = {"rows": args.rows, "labels": args.labels, "repeat": args.repeat, "seed": args.seed}
+    print(f"filas={args.rows} labels={args.labels} repeat={args.repeat} python={platform.python_version()}")
+    results = run(cases, args.rows, args.labels, args.repeat, args.seed)
+
+    if args.save:
+        with open(args.baseline, "w", encoding="utf-8") as fh:
+            json.dump({"params": params, "machine": platform.platform(), "cases": results}, fh, indent=2)
+            fh.write("\n")
+        print(f"línea base grabada en {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print("sin línea base: correr con --save para grabarla")
+        return
+    with open(args.baseline, "r", encoding="utf-8") as fh:
+        baseline = json.load(fh)
+    if baseline.get("params") != params:
+        print(f"aviso: la línea base se grabó con otros parámetros ({baseline.get('params')})")
+    regressions = compare(results, baseline, args.tolerance)
+    for line in regressions:
+        print("REGRESIÓN " + line)
+    if regressions:
+        sys.exit(1)
+    print("sin regresiones respecto de la línea base")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Generador de resultados sintéticos (JMeter JTL, k6 NDJSON y k6 summary export).
+
+Todo es determinista dado `seed`. Las latencias siguen una lognormal (mediana y dispersión
+configurables) o una distribución bimodal (una fracción `slow_share` de muestras lentas,
+útil para colas largas). Algunas labels pueden traer IDs en la ruta para ejercitar la
+normalización.
+
+Uso:
+    python -m benchmarks.synthetic jtl --rows 1000000 --labels 50 --out run.jtl
+    python -m benchmarks.synthetic k6-points --rows 200000 --labels 20 --out run.ndjson
+    python -m benchmarks.synthetic k6-summary --labels 30 --out summary.json
+"""
+import argparse, json, math, random
+from datetime import datetime, timezone
+from typing import Callable, Iterator, List
+
+START_MS = 1731000000000
+
+def latency_sampler(rnd: random.Random, median_ms: float = 150.0, sigma: float = 0.6,
+                    slow_share: float = 0.0, slow_factor: float = 8.0) -> Callable[[], float]:
+    """Lognormal con mediana `median_ms`; con slow_share > 0 una parte sale `slow_factor` veces más lenta."""
+    mu = math.log(median_ms)
+
+    def sample() -> float:
+        v = rnd.lognormvariate(mu, sigma)
+        if slow_share and rnd.random() < slow_share:
+            v *= slow_factor
+        return v
+
+    return sample
+
+def _labels(labels: int, id_share: float, rnd: random.Random) -> List[Callable[[], str]]:
+    out: List[Callable[[], str]] = []
+    for i in range(labels):
+        verb = ("GET", "POST", "PUT", "DELETE")[i % 4]
+        if rnd.random() < id_share:
+            out.append(lambda verb=verb, i=i: f"{verb} /api/resource{i}/{rnd.randint(1, 10**6)}")
+        else:
+            out.append(lambda verb=verb, i=i: f"{verb} /api/resource{i}")
+    return out
+
+def iter_jtl_lines(rows: int, labels: int = 20, error_rate: float = 0.02, median_ms: float = 150.0,
+                   sigma: float = 0.6, slow_share: float = 0.0, id_share: float = 0.0,
+                   seed: int = 42) -> Iterator[str]:
+    rnd = random.Random(seed)
+    latency = latency_sampler(rnd, median_ms, sigma, slow_share)
+    names = _labels(labels, id_share, rnd)
+    yield "timeStamp,elapsed,label,responseCode,responseMessage,threadName,success,bytes\n"
+    ts = START_MS
+    for i in range(rows):
+        ts += rnd.randint(0, 5)
+        ok = rnd.random() >= error_rate
+        yield (f"{ts},{int(latency())},{names[i % labels]()},{200 if ok else 500},{'OK' if ok else 'Error'},"
+               f"TG 1-{i % 32},{'true' if ok else 'false'},512\n")
+
+def synthetic_jtl(rows: int, labels: int, error_rate: float = 0.02, seed: int = 42, **kwargs) -> bytes:
+    return "".join(iter_jtl_lines(rows, labels, error_rate, seed=seed, **kwargs)).encode("utf-8")
+
+def _iso(ms: int) -> str:
+    dt = datetime.fromtimestamp(ms / 1000.0, tz=timezone.utc)
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.") + f"{ms % 1000:03d}000000Z"
+
+def iter_k6_points_lines(rows: int, labels: int = 20, error_rate: float = 0.02, median_ms: float = 150.0,
+                         sigma: float = 0.6, slow_share: float = 0.0, id_share: float = 0.0,
+                         seed: int = 42) -> Iterator[str]:
+    """Salida de `k6 run --out json`: por request, puntos de http_reqs, http_req_duration y http_req_failed."""
+    rnd = random.Random(seed)
+    latency = latency_sampler(rnd, median_ms, sigma, slow_share)
+    names = _labels(labels, id_share, rnd)
+    for metric, kind in (("http_reqs", "counter"), ("http_req_duration", "trend"), ("http_req_failed", "rate")):
+        yield json.dumps({"type": "Metric", "data": {"name": metric, "type": kind}, "metric": metric}) + "\n"
+    ts = START_MS
+    for i in range(rows):
+        ts += rnd.randint(0, 5)
+        ok = rnd.random() >= error_rate
+        verb, name = names[i % labels]().split(" ", 1)
+        url = "https://api.example.com" + name
+        tags = {"expected_response": "true" if ok else "false", "group": "", "method": verb, "name": url,
+                "proto": "HTTP/1.1", "scenario": "default", "status": "200" if ok else "500", "url": url}
+        time_s = _iso(ts)
+        for metric, value in (("http_reqs", 1), ("http_req_duration", round(latency(), 3)),
+                              ("http_req_failed", 0 if ok else 1)):
+            yield json.dumps({"type": "Point", "data": {"time": time_s, "value": value, "tags": tags},
+                              "metric": metric}) + "\n"
+
+def synthetic_k6_points(rows: int, labels: int = 20, error_rate: float = 0.02, seed: int = 42, **kwargs) -> bytes:
+    return "".join(iter_k6_points_lines(rows, labels, error_rate, seed=seed, **kwargs)).encode("utf-8")
+
+def synthetic_k6_summary(labels: int = 20, requests_per_label: int = 1000, error_rate: float = 0.02,
+                         median_ms: float = 150.0, sigma: float = 0.6, seed: int = 42) -> bytes:
+    """Summary export (`--summary-export`) con un check y una métrica Metodo_* por método gRPC."""
+    rnd = random.Random(seed)
+    checks, metrics = {}, {}
+
+    def trend(median: float) -> dict:
+        q = lambda z: round(median * math.exp(sigma * z), 3)
+        return {"min": 0, "med": round(median, 3), "max": q(3.5), "p(90)": q(1.2816), "p(95)": q(1.6449),
+                "p(99)": q(2.3263), "avg": round(median * math.exp(sigma ** 2 / 2), 3)}
+
+    for i in range(labels):
+        method = f"svc{i}.Service{i}/Call{i}"
+        fails = sum(1 for _ in range(requests_per_label) if rnd.random() < error_rate)
+        checks[f"{method} OK"] = {"fails": fails, "passes": requests_per_label - fails}
+        metrics["Metodo_" + method.replace(".", "_").replace("/", "_") + "_duration"] = \
+            trend(median_ms * rnd.uniform(0.5, 2.0))
+    total = labels * requests_per_label
+    metrics["grpc_req_duration"] = trend(median_ms)
+    metrics["iterations"] = {"count": total, "rate": 100.0}
+    return json.dumps({"root_group": {"name": "", "path": "", "groups": {}, "checks": checks},
+                       "metrics": metrics}, indent=1).encode("utf-8")
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("kind", choices=("jtl", "k6-points", "k6-summary"))
+    ap.add_argument("--rows", type=int, default=100_000, help="filas (jtl) o requests (k6-points)")
+    ap.add_argument("--labels", type=int, default=20)
+    ap.add_argument("--error-rate", type=float, default=0.02)
+    ap.add_argument("--median-ms", type=float, default=150.0)
+    ap.add_argument("--sigma", type=float, default=0.6)
+    ap.add_argument("--slow-share", type=float, default=0.0, help="fracción de muestras 8x más lentas")
+    ap.add_argument("--id-share", type=float, default=0.0, help="fracción de labels con IDs en la ruta")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", required=True)
+    args = ap.parse_args()
+
+    common = dict(error_rate=args.error_rate, median_ms=args.median_ms, sigma=args.sigma, seed=args.seed)
+    with open(args.out, "w", encoding="utf-8", newline="") as fh:
+        if args.kind == "k6-summary":
+            fh.write(synthetic_k6_summary(args.labels, max(args.rows // max(args.labels, 1), 1), **common).decode())
+            return
+        gen = iter_jtl_lines if args.kind == "jtl" else iter_k6_points_lines
+        fh.writelines(gen(args.rows, args.labels, slow_share=args.slow_share, id_share=args.id_share, **common))
+
+if __name__ == "__main__":
+    main()
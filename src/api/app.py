@@ -1,13 +1,43 @@
 from dotenv import load_dotenv
 load_dotenv()  # lee variables desde .env si existe
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from src.api.routes.summary_route import router as summary_router
+from src.api.routes.jobs_route import router as jobs_router
+from src.api.routes.runs_route import router as runs_router
+from src.api.routes.metrics_route import router as metrics_router
+from src.api.instrumentation import MetricsMiddleware
+from src.application.job_service import get_runner, shutdown_runner
+from src.application.warmup import warm_up
+from src.infrastructure.jobs.store import close_stores
+from src.infrastructure.concurrency import shutdown_pools
+from src.infrastructure.ai.client_registry import registry as ai_clients
+from src.infrastructure.ai.scheduler import close_schedulers
+from src.infrastructure.cache.factory import close_cache
+from src.infrastructure.runs.store import close_run_store
 
-app = FastAPI(title="Performance Analyzer AI", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await warm_up()  # WARMUP=none por defecto: el cliente de la IA y los parsers se cargan al usarse
+    get_runner().start()  # reencola los jobs que quedaron pendientes
+    yield
+    await shutdown_runner()
+    close_stores()
+    shutdown_pools()
+    ai_clients.close()
+    close_schedulers()
+    close_cache()
+    close_run_store()
+
+app = FastAPI(title="Performance Analyzer AI", version="1.0.0", lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
 
 @app.get("/health")
 def health():
     return {"ok": True}
 
 app.include_router(summary_router)
+app.include_router(jobs_router)
+app.include_router(runs_router)
+app.include_router(metrics_router)
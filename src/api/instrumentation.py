@@ -0,0 +1,43 @@
+# Middleware ASGI con métricas HTTP: requests en curso, conteo por ruta/estado y duración
+
+import time
+from src.core import metrics
+
+HTTP_IN_FLIGHT = metrics.gauge("informai_http_requests_in_flight", "Requests HTTP en curso.")
+HTTP_REQUESTS = metrics.counter("informai_http_requests_total", "Requests HTTP por método, ruta y estado.",
+                                ("method", "route", "status"))
+HTTP_SECONDS = metrics.histogram("informai_http_request_seconds", "Duración de los requests HTTP por ruta.",
+                                 ("route",))
+
+
+class MetricsMiddleware:
+    """
+    ASGI puro (sin BaseHTTPMiddleware): no envuelve el body ni crea tareas, así que el costo
+    por request es un par de lecturas de reloj y tres actualizaciones bajo lock. La ruta se
+    etiqueta con su plantilla (/runs/{key}) para no explotar la cardinalidad.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = getattr(scope.get("route"), "path", None) or "(sin ruta)"
+            HTTP_REQUESTS.inc(1, scope["method"], route, str(status))
+            HTTP_SECONDS.observe(time.perf_counter() - t0, route)
@@ -0,0 +1,114 @@
+import gzip, os
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from src.core import fast_json
+from src.core.env import env_int
+from src.core.errors import ProblemError
+from src.domain.summary_contract import AnalyzeResponse, Latency, MethodMetrics, Summary
+
+LAYOUTS = ("rows", "columnar")
+COMPRESSIONS = ("none", "gzip", "zstd", "auto")
+GZIP_LEVEL = 5
+ZSTD_LEVEL = 3
+
+def _compression() -> str:
+    mode = os.getenv("RESPONSE_COMPRESSION", "none").strip().lower()
+    return mode if mode in COMPRESSIONS else "none"
+
+def _min_bytes() -> int:
+    return env_int("RESPONSE_COMPRESS_MIN_BYTES", 1024, minimum=0)
+
+def _accepted(accept_encoding: str) -> List[str]:
+    out = []
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding and params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            out.append(coding.strip().lower())
+    return out
+
+def _zstd(body: bytes) -> Optional[bytes]:
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+
+def compress(body: bytes, accept_encoding: str) -> Tuple[bytes, Optional[str]]:
+    """
+    Comprime según RESPONSE_COMPRESSION (none | gzip | zstd | auto) y lo que acepta el cliente.
+    auto: zstd si el cliente lo acepta y `zstandard` está instalado, si no gzip. Cuerpos por
+    debajo de RESPONSE_COMPRESS_MIN_BYTES salen tal cual. Devuelve (cuerpo, Content-Encoding).
+    """
+    mode = _compression()
+    if mode == "none" or len(body) < _min_bytes():
+        return body, None
+    accepted = _accepted(accept_encoding)
+    if mode in ("zstd", "auto") and "zstd" in accepted:
+        packed = _zstd(body)
+        if packed is not None:
+            return packed, "zstd"
+    if mode in ("gzip", "auto") and ("gzip" in accepted or "*" in accepted):
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0), "gzip"
+    return body, None
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse que acepta el cuerpo ya serializado (bytes) o lo codifica con fast_json,
+    y lo comprime si RESPONSE_COMPRESSION lo pide y el cliente lo acepta.
+    """
+
+    def __init__(self, content: Any, status_code: int = 200, headers: Optional[Dict[str, str]] = None,
+                 accept_encoding: str = ""):
+        self.accept_encoding = accept_encoding
+        self.content_encoding: Optional[str] = None
+        super().__init__(content, status_code, headers)
+
+    def render(self, content: Any) -> bytes:
+        body = bytes(content) if isinstance(content, (bytes, bytearray, memoryview)) else fast_json.dumps(content)
+        body, self.content_encoding = compress(body, self.accept_encoding)
+        return body
+
+    def init_headers(self, headers: Optional[Dict[str, str]] = None) -> None:
+        super().init_headers(headers)
+        if _compression() != "none":
+            self.raw_headers.append((b"vary", b"Accept-Encoding"))
+        if self.content_encoding is not None:
+            self.raw_headers.append((b"content-encoding", self.content_encoding.encode("latin-1")))
+
+def resolve_layout(requested: Optional[str]) -> str:
+    layout = (requested or "rows").strip().lower()
+    if layout not in LAYOUTS:
+        raise ProblemError(400, "Formato de respuesta inválido", f"layout debe ser uno de: {', '.join(LAYOUTS)}.",
+                           {"layout": layout})
+    return layout
+
+def columnar_by_method(rows: List[MethodMetrics]) -> Dict[str, Any]:
+    """by_method como arreglos por columna (mismo orden de filas); latency_ms, una columna por percentil."""
+    columns: Dict[str, Any] = {name: [getattr(m, name) for m in rows]
+                               for name in MethodMetrics.model_fields if name != "latency_ms"}
+    columns["latency_ms"] = {p: [getattr(m.latency_ms, p) for m in rows] for p in Latency.model_fields}
+    return columns
+
+def _summary_json(summary: Summary, layout: str) -> bytes:
+    if layout == "rows":
+        return fast_json.model_json(summary)
+    head = summary.model_dump(mode="json", exclude={"by_method"})
+    return fast_json.dumps({**head, "by_method": columnar_by_method(summary.by_method)})
+
+def encode_analysis(result: AnalyzeResponse, layout: str = "rows") -> bytes:
+    """
+    Cuerpo JSON de un AnalyzeResponse sin volver a validarlo ni pasar por dicts: cada parte
+    se codifica directo desde su modelo (model_json), con el mismo JSON que ve el prompt.
+    """
+    metadata = {**result.metadata, "layout": layout} if layout != "rows" else result.metadata
+    return b"".join((
+        b'{"summary":', _summary_json(result.summary, layout),
+        b',"ai_report":', fast_json.model_json(result.ai_report),
+        b',"token_usage":', fast_json.model_json(result.token_usage),
+        b',"metadata":', fast_json.dumps(metadata), b"}",
+    ))
+
+def analysis_response(request: Request, result: AnalyzeResponse, layout: str = "rows") -> FastJSONResponse:
+    return FastJSONResponse(encode_analysis(result, layout),
+                            accept_encoding=request.headers.get("accept-encoding", ""))
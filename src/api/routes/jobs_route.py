@@ -0,0 +1,74 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+from src.core.errors import problem, ProblemError
+from src.core.metrics import stage
+from src.api.uploads import receive_uploads, multipart_body
+from src.api.routes.summary_route import accept_analyzable
+from src.api.responses import FastJSONResponse
+from src.application.job_service import get_runner
+
+router = APIRouter()
+
+def _status_payload(job: dict) -> dict:
+    total = job["size"] or 0
+    done = min(job["bytes_processed"] or 0, total)
+    payload = {
+        "job_id": job["id"],
+        "status": job["status"],
+        "phase": job["phase"],
+        "filename": job["filename"],
+        "progress": {
+            "bytes_processed": done,
+            "bytes_total": total,
+            "percent": round(100.0 * done / total, 1) if total else 0.0,
+            "rows_processed": job["rows_processed"],
+        },
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+    if job["error"]:
+        payload["error"] = job["error"]
+    return payload
+
+def _not_found(job_id: str):
+    return problem(404, "Job inexistente", "No hay un job con ese identificador.", {"job_id": job_id})
+
+@router.post("/jobs", status_code=202, openapi_extra=multipart_body("file"))
+async def submit_job(request: Request):
+    """Guarda el archivo y devuelve el job_id de inmediato; el análisis sigue en segundo plano."""
+    runner = get_runner()
+    runner.start()
+    try:
+        with stage("upload_receive"):
+            # Un archivo por job: uno de más no tendría job que lo limpie de JOBS_DIR.
+            upload = (await receive_uploads(request, "file", directory=runner.uploads_dir,
+                                            accept=accept_analyzable, max_files=1))[0]
+    except ProblemError as e:
+        return e.response()
+    job_id = runner.submit(upload)
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job_id, "status": "queued",
+                 "status_url": f"/jobs/{job_id}", "result_url": f"/jobs/{job_id}/result"},
+        headers={"Location": f"/jobs/{job_id}"},
+    )
+
+@router.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = get_runner().store.get(job_id)
+    if job is None:
+        return _not_found(job_id)
+    return _status_payload(job)
+
+@router.get("/jobs/{job_id}/result")
+def job_result(job_id: str, request: Request):
+    job = get_runner().store.get(job_id)
+    if job is None:
+        return _not_found(job_id)
+    if job["status"] == "done":
+        return FastJSONResponse(job["result"], accept_encoding=request.headers.get("accept-encoding", ""))
+    if job["status"] == "failed":
+        err = job["error"] or {}
+        return JSONResponse(status_code=err.get("status", 500), content=err)
+    # Aún en curso: 202 con el estado para que el cliente siga consultando.
+    return JSONResponse(status_code=202, content=_status_payload(job), headers={"Retry-After": "2"})
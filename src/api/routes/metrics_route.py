@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from src.core.metrics import REGISTRY
+
+router = APIRouter()
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    """
+    Métricas en formato de texto de Prometheus: histogramas por etapa, filas/bytes parseados,
+    tokens, aciertos de caché y trabajos en curso. Son por proceso: con varios workers de
+    uvicorn, Prometheus debe raspar cada uno.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,35 @@
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Query
+from src.core.errors import problem, ProblemError
+from src.application.regression_service import compare_runs, resolve_baseline
+from src.domain.summary_contract import RunComparison
+from src.infrastructure.runs.store import get_run_store
+
+router = APIRouter()
+
+@router.get("/runs")
+def list_runs(service: Optional[str] = None, tag: Optional[str] = None,
+              limit: int = Query(50, ge=1, le=1000)):
+    return {"runs": get_run_store().list(service, tag, limit)}
+
+@router.get("/runs/{run_key}")
+def get_run(run_key: str):
+    run = get_run_store().get(run_key)
+    if run is None:
+        return problem(404, "Corrida inexistente", "No hay una corrida guardada con esa llave.", {"run_key": run_key})
+    return run
+
+@router.get("/runs/{run_key}/compare", response_model=RunComparison)
+async def compare_run(run_key: str,
+                      baseline: str = Query("auto", description="auto | llave de una corrida"),
+                      baseline_tag: Optional[str] = None):
+    """Compara una corrida guardada contra una línea base explícita o la anterior del mismo servicio."""
+    try:
+        baseline_key = await asyncio.to_thread(resolve_baseline, run_key, baseline, baseline_tag)
+        if baseline_key is None:
+            return problem(404, "Sin línea base", "No hay una corrida anterior con la cual comparar.",
+                           {"run_key": run_key})
+        return await asyncio.to_thread(compare_runs, run_key, baseline_key)
+    except ProblemError as e:
+        return e.response()
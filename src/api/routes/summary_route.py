@@ -1,57 +1,227 @@
-import os, uuid
-from fastapi import APIRouter, UploadFile
-from src.core.errors import problem
-from src.application.summary_service import detect_and_build_summary
-from src.infrastructure.ai.azure_openai_service import generate_ai_report
+import asyncio, json
+from typing import List, Optional, Union
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from src.core import fast_json
+from src.core.env import env_int
+from src.core.errors import problem, ProblemError
+from src.core.metrics import stage, stage_timer
+from src.application.summary_service import NDJSON_TYPES, XML_TYPES
+from src.application.analyze_service import (
+    StoredUpload, analyze_upload, prepare_analysis, resolve_ai_mode, stream_report,
+)
+from src.application import analysis_cache
+from src.application.regression_service import RunRequest
+from src.core.timeseries import downsample
+from src.api.uploads import BatchTooLarge, receive_uploads, multipart_body, is_archive, expand_archive
+from src.api.responses import analysis_response, encode_analysis, resolve_layout
 from src.domain.summary_contract import AnalyzeResponse
 
 router = APIRouter()
 
-def _max_mb() -> int:
+ACCEPTED_TYPES = ("application/json", "text/csv", "application/vnd.ms-excel") + NDJSON_TYPES + XML_TYPES
+AI_MODE_HELP = "auto | azure | local (informe por reglas, sin IA). Por defecto AI_MODE."
+LAYOUT_HELP = "rows | columnar (summary.by_method como arreglos por columna: más compacto con muchas labels)."
+
+def _batch_limit(name: str, default: int) -> int:
+    return env_int(name, default, minimum=1)
+
+def _unsupported(content_type: str) -> ProblemError:
+    return ProblemError(415, "Tipo no soportado",
+                        "Solo se aceptan JSON/NDJSON (k6) o CSV/XML (JMeter).",
+                        {"content_type": content_type})
+
+def accept_analyzable(filename: str, content_type: str) -> Optional[ProblemError]:
+    return None if content_type in ACCEPTED_TYPES else _unsupported(content_type)
+
+def _accept_batch_member(filename: str, content_type: str) -> Optional[ProblemError]:
+    return None if is_archive(filename, content_type) else accept_analyzable(filename, content_type)
+
+@router.post("/summary", response_model=AnalyzeResponse, openapi_extra=multipart_body("file"))
+async def summary(request: Request,
+                  service: Optional[str] = Query(None, description="Guarda la corrida en el historial de este servicio."),
+                  tag: Optional[str] = Query(None),
+                  baseline: str = Query("auto", description="auto | none | llave de una corrida"),
+                  baseline_tag: Optional[str] = Query(None),
+                  ai_mode: Optional[str] = Query(None, description=AI_MODE_HELP),
+                  layout: Optional[str] = Query(None, description=LAYOUT_HELP)):
+    run = RunRequest(service, tag, baseline, baseline_tag) if service else None
     try:
-        return int(os.getenv("MAX_UPLOAD_MB", "50"))
-    except ValueError:
-        return 50
-
-@router.post("/summary", response_model=AnalyzeResponse)
-async def summary(file: UploadFile):
-    if not file:
-        return problem(400, "Archivo requerido", "Adjunta un archivo JSON (k6) o CSV (JMeter).")
-
-    if file.content_type not in ("application/json", "text/csv", "application/vnd.ms-excel"):
-        return problem(415, "Tipo no soportado",
-                       "Solo se aceptan JSON (k6) o CSV (JMeter).",
-                       {"content_type": file.content_type})
-
-    content = await file.read()
-    if len(content) > _max_mb() * 1024 * 1024:
-        return problem(413, "Archivo demasiado grande",
-                       f"Tamaño máximo permitido: {_max_mb()} MB.",
-                       {"size_bytes": len(content)})
+        layout = resolve_layout(layout)
+    except ProblemError as e:
+        return e.response()
+    with stage_timer():  # analyze_upload reutiliza este timer: la recepción queda en timings_ms
+        try:
+            with stage("upload_receive"):
+                upload = (await receive_uploads(request, "file", accept=accept_analyzable, max_files=1))[0]
+        except ProblemError as e:
+            return e.response()
+        try:
+            result = await analyze_upload(upload, run=run, ai_mode=ai_mode)
+        except ProblemError as e:
+            return e.response()
+        finally:
+            upload.discard()
+    # Se devuelve la respuesta ya serializada: FastAPI no revalida ni recodifica el modelo
+    # (response_model queda solo para el esquema de OpenAPI).
+    return analysis_response(request, result, layout)
+
+def _sse(event: str, data) -> str:
+    if isinstance(data, AnalyzeResponse):
+        payload = encode_analysis(data).decode("utf-8")
+    elif isinstance(data, BaseModel):
+        payload = data.model_dump_json()
+    elif isinstance(data, bytes):
+        payload = data.decode("utf-8")
+    else:
+        payload = json.dumps(data, ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n"
 
+@router.post("/summary/stream", openapi_extra=multipart_body("file"))
+async def summary_stream(request: Request,
+                         service: Optional[str] = Query(None, description="Guarda la corrida en el historial de este servicio."),
+                         tag: Optional[str] = Query(None),
+                         baseline: str = Query("auto", description="auto | none | llave de una corrida"),
+                         baseline_tag: Optional[str] = Query(None),
+                         ai_mode: Optional[str] = Query(None, description=AI_MODE_HELP)):
+    """
+    Igual que POST /summary pero como Server-Sent Events: el evento `summary` sale apenas
+    termina el parseo; luego un `section` por cada parte del informe (title, overview,
+    highlights...) a medida que el modelo la completa, `usage` con los tokens y `done`
+    con la respuesta completa (mismo cuerpo que /summary). Un fallo de la IA llega como
+    evento `error` con el problem+json; los errores de upload/parseo responden con su
+    código HTTP antes de abrir el stream.
+    """
+    run = RunRequest(service, tag, baseline, baseline_tag) if service else None
     try:
-        summary_obj, flags = detect_and_build_summary(content, file.filename, file.content_type)
-    except KeyError as e:
-        return problem(422, "Estructura incompleta", str(e))
-    except ValueError as e:
-        return problem(400, "Archivo ilegible", str(e))
-    except Exception as e:
-        return problem(500, "Error procesando archivo", f"{type(e).__name__}: {e}")
+        mode = resolve_ai_mode(ai_mode)
+    except ProblemError as e:
+        return e.response()
+    with stage_timer() as timer:
+        try:
+            with stage("upload_receive"):
+                upload = (await receive_uploads(request, "file", accept=accept_analyzable, max_files=1))[0]
+        except ProblemError as e:
+            return e.response()
+        try:
+            prepared = await prepare_analysis(upload, timer, run=run)
+        except ProblemError as e:
+            return e.response()
+        finally:
+            upload.discard()  # desde acá solo se usa el summary
+
+    async def events():
+        yield _sse("summary", b'{"summary":' + fast_json.model_json(prepared.summary)
+                   + b',"metadata":' + fast_json.dumps(prepared.metadata(None)) + b"}")
+        try:
+            async for event, data in stream_report(prepared, mode):
+                yield _sse(event, data)
+        except ProblemError as e:
+            yield _sse("error", e.payload())
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
+@router.get("/summary/{analysis_id}/timeseries")
+def summary_timeseries(analysis_id: str,
+                       resolution_ms: Optional[int] = Query(None, ge=1),
+                       max_points: Optional[int] = Query(None, ge=1),
+                       label: Optional[List[str]] = Query(None)):
+    """
+    Series por ventana (requests, fallos, rps y percentiles) de un análisis ya hecho,
+    reagrupadas a `resolution_ms` y/o acotadas a `max_points` por serie.
+    Siempre incluye "(overall)"; `label` filtra las series por operación.
+    """
+    data = analysis_cache.get_timeseries(analysis_id)
+    if data is None:
+        return problem(404, "Serie inexistente",
+                       "No hay series de tiempo para ese análisis (formato sin muestras o expiró de la caché).",
+                       {"analysis_id": analysis_id})
+    return {"analysis_id": analysis_id, **downsample(data, resolution_ms, max_points, label)}
+
+@router.post("/summary/batch", openapi_extra=multipart_body("files", many=True))
+async def summary_batch(request: Request):
+    """
+    Analiza varios archivos (o un zip/tar con ellos) en paralelo y devuelve NDJSON:
+    una línea por archivo, en el orden en que terminan. Un archivo con error no
+    detiene el lote; su línea trae el problem+json correspondiente.
+    BATCH_MAX_FILES y BATCH_MAX_MB (bytes recibidos más los extraídos de zip/tar) se
+    controlan mientras se recibe y se extrae: pasados, el lote entero responde 413.
+    """
+    max_files = _batch_limit("BATCH_MAX_FILES", 100)
+    max_bytes = _batch_limit("BATCH_MAX_MB", 500) * 1024 * 1024
+    try:
+        with stage("upload_receive"):
+            received = await receive_uploads(request, "files", accept=_accept_batch_member, fail_fast=False,
+                                             max_total_bytes=max_bytes)
+    except ProblemError as e:
+        return e.response()
+
+    items: List[tuple[str, Union[StoredUpload, ProblemError]]] = []
+    used = sum(item.size for item in received if isinstance(item, StoredUpload))
     try:
-        ai_report, usage, ai_mode = generate_ai_report(summary_obj)
-    except Exception as e:
-        return problem(502, "Fallo consultando AI", f"{type(e).__name__}: {e}")
-
-    return AnalyzeResponse(
-        summary=summary_obj,
-        ai_report=ai_report,
-        token_usage=usage,
-        metadata={
-            "request_id": str(uuid.uuid4()),
-            "tool_detected": summary_obj.tool,
-            "input_size_bytes": len(content),
-            "flags": flags,
-            "ai_mode": ai_mode
-        }
-    )
\ No newline at end of file
+        for stored in received:
+            if isinstance(stored, ProblemError):
+                items.append((stored.extra.get("filename", ""), stored))
+            elif is_archive(stored.filename, stored.content_type):
+                try:
+                    members = await asyncio.to_thread(expand_archive, stored, max_files - len(items),
+                                                      max_bytes - used, max_bytes)
+                except BatchTooLarge:
+                    raise
+                except ProblemError as e:
+                    members = [e]
+                finally:
+                    stored.discard()
+                used += sum(m.size for m in members if isinstance(m, StoredUpload))
+                for member in members:
+                    member_name = member.filename if isinstance(member, StoredUpload) \
+                        else member.extra.get("filename", stored.filename)
+                    items.append((member_name, member))
+            else:
+                items.append((stored.filename, stored))
+        if len(items) > max_files:
+            raise BatchTooLarge(f"Máximo {max_files} archivos por lote.", {"files": len(items)})
+    except BaseException as e:
+        for item in received + [item for _, item in items]:
+            if isinstance(item, StoredUpload):
+                item.discard()
+        if isinstance(e, BatchTooLarge):
+            return e.response()
+        raise
+
+    # Acota cuántos archivos de este lote avanzan a la vez (parseo + IA); los pools
+    # globales siguen limitando el total del worker.
+    gate = asyncio.Semaphore(_batch_limit("BATCH_MAX_CONCURRENCY", 8))
+
+    async def run_one(index: int, name: str, item: Union[StoredUpload, ProblemError]) -> dict:
+        line = {"index": index, "filename": name}
+        if isinstance(item, ProblemError):
+            return {**line, "status": item.status, "error": item.payload()}
+        try:
+            async with gate:
+                result = await analyze_upload(item, wait=True)
+            return {**line, "status": 200, "result": result.model_dump(mode="json")}
+        except ProblemError as e:
+            return {**line, "status": e.status, "error": e.payload()}
+        except Exception as e:
+            # Un fallo inesperado de un archivo no corta el NDJSON de los demás.
+            err = ProblemError(500, "Error procesando archivo", f"{type(e).__name__}: {e}")
+            return {**line, "status": err.status, "error": err.payload()}
+        finally:
+            item.discard()
+
+    async def stream():
+        tasks = [asyncio.create_task(run_one(i, name, item)) for i, (name, item) in enumerate(items)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield json.dumps(await next_done, ensure_ascii=False) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+            for _, item in items:
+                if isinstance(item, StoredUpload):
+                    item.discard()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
@@ -0,0 +1,308 @@
+import asyncio, hashlib, os, tarfile, tempfile, zipfile
+from typing import BinaryIO, Callable, List, Optional, Union
+from fastapi import Request
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+from src.core.env import env_int
+from src.core.errors import ProblemError
+from src.application.analyze_service import StoredUpload
+
+_COPY_CHUNK = 1024 * 1024
+
+ARCHIVE_TYPES = ("application/zip", "application/x-zip-compressed", "application/x-tar",
+                 "application/gzip", "application/x-gzip", "application/x-gtar")
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz")
+
+# Tipo de contenido inferido para los archivos que vienen dentro de un zip/tar.
+_MEMBER_TYPES = {
+    ".json": "application/json",
+    ".ndjson": "application/x-ndjson",
+    ".jsonl": "application/x-ndjson",
+    ".csv": "text/csv",
+    ".jtl": "text/csv",
+    ".xml": "application/xml",
+}
+
+def max_upload_mb() -> int:
+    return env_int("MAX_UPLOAD_MB", 50)
+
+def _too_large(size: int) -> ProblemError:
+    return ProblemError(413, "Archivo demasiado grande",
+                        f"Tamaño máximo permitido: {max_upload_mb()} MB.",
+                        {"size_bytes": size})
+
+class BatchTooLarge(ProblemError):
+    """El lote entero supera BATCH_MAX_FILES o BATCH_MAX_MB: se rechaza completo, no por archivo."""
+
+    def __init__(self, detail: str, extra: Optional[dict] = None):
+        super().__init__(413, "Lote demasiado grande", detail, extra)
+
+def _batch_bytes_error(limit: int) -> BatchTooLarge:
+    return BatchTooLarge(f"Máximo {limit // (1024 * 1024)} MB por lote (sumando los archivos extraídos).",
+                         {"limit_bytes": limit})
+
+def _copy_to_temp(src: BinaryIO, filename: str, budget: Optional[int] = None,
+                  batch_limit: int = 0) -> tuple[str, int, str]:
+    """Copia a un temporal con tope por archivo y, con `budget`, tope de bytes que le quedan al lote."""
+    limit = max_upload_mb() * 1024 * 1024
+    digest = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(prefix="upload-", suffix=os.path.splitext(filename)[1])
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := src.read(_COPY_CHUNK):
+                size += len(chunk)
+                if size > limit:
+                    raise _too_large(size)
+                if budget is not None and size > budget:
+                    raise _batch_bytes_error(batch_limit)
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path, size, digest.hexdigest()
+
+# Margen para cabeceras y delimitadores multipart al validar Content-Length.
+_MULTIPART_OVERHEAD = 64 * 1024
+
+# accept(filename, content_type) → None si el archivo se admite, o el ProblemError a informar.
+AcceptFn = Callable[[str, str], Optional[ProblemError]]
+
+def multipart_body(field: str, many: bool = False) -> dict:
+    """Esquema OpenAPI del cuerpo multipart, ya que las rutas leen el stream sin UploadFile."""
+    item = {"type": "string", "format": "binary"}
+    schema = {"type": "array", "items": item} if many else item
+    return {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+        "type": "object", "properties": {field: schema}, "required": [field]}}}}}
+
+class _MultipartSink:
+    """
+    Callbacks de python-multipart: cada archivo del campo `field` se escribe a su temporal
+    a medida que llegan los bytes, con sha256 incremental y corte al superar el límite.
+    """
+
+    def __init__(self, field: str, directory: Optional[str], accept: Optional[AcceptFn], fail_fast: bool,
+                 max_total_bytes: Optional[int] = None, max_files: Optional[int] = None):
+        self.field = field
+        self.max_files = max_files
+        self.files = 0
+        self.directory = directory
+        self.accept = accept
+        self.fail_fast = fail_fast
+        self.limit = max_upload_mb() * 1024 * 1024
+        self.max_total = max_total_bytes
+        self.total = 0
+        self.items: List[Union[StoredUpload, ProblemError]] = []
+        self._headers: dict = {}
+        self._name = b""
+        self._value = b""
+        self._reset_part()
+
+    def _reset_part(self) -> None:
+        self._out: Optional[BinaryIO] = None
+        self._path = ""
+        self._filename = ""
+        self._content_type = ""
+        self._size = 0
+        self._digest = None
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def _fail(self, err: ProblemError) -> None:
+        err.extra.setdefault("filename", self._filename)
+        self._drop_current()
+        if self.fail_fast:
+            raise err
+        self.items.append(err)
+
+    def _drop_current(self) -> None:
+        if self._out is not None:
+            self._out.close()
+            os.unlink(self._path)
+            self._out = None
+
+    def on_part_begin(self) -> None:
+        self._headers = {}
+        self._reset_part()
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._value += data[start:end]
+
+    def on_header_end(self) -> None:
+        self._headers[self._name.lower()] = self._value
+        self._name = self._value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if options.get(b"name", b"").decode("latin-1") != self.field or b"filename" not in options:
+            return
+        self._filename = options[b"filename"].decode("utf-8", errors="replace")
+        self.files += 1
+        if self.max_files is not None and self.files > self.max_files:
+            # Antes de escribir nada del archivo de más; receive_uploads descarta los anteriores.
+            raise ProblemError(400, "Demasiados archivos",
+                               f"Esta ruta acepta un solo archivo en el campo '{self.field}'.",
+                               {"filename": self._filename, "max_files": self.max_files})
+        self._content_type = self._headers.get(b"content-type", b"").decode("latin-1").strip()
+        err = self.accept(self._filename, self._content_type) if self.accept else None
+        if err is not None:
+            self._fail(err)
+            return
+        fd, self._path = tempfile.mkstemp(prefix="upload-", suffix=os.path.splitext(self._filename)[1],
+                                          dir=self.directory)
+        self._out = os.fdopen(fd, "wb")
+        self._digest = hashlib.sha256()
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._out is None:
+            return
+        self._size += end - start
+        self.total += end - start
+        if self.max_total is not None and self.total > self.max_total:
+            self._drop_current()
+            raise _batch_bytes_error(self.max_total)  # con o sin fail_fast: corta el lote entero
+        if self._size > self.limit:
+            self._fail(_too_large(self._size))
+            return
+        chunk = data[start:end]
+        self._digest.update(chunk)
+        self._out.write(chunk)
+
+    def on_part_end(self) -> None:
+        if self._out is None:
+            return
+        self._out.close()
+        self._out = None
+        self.items.append(StoredUpload(self._path, self._filename, self._content_type,
+                                       self._size, self._digest.hexdigest()))
+
+    def discard(self) -> None:
+        self._drop_current()
+        for item in self.items:
+            if isinstance(item, StoredUpload):
+                item.discard()
+
+async def receive_uploads(request: Request, field: str = "file", directory: Optional[str] = None,
+                          accept: Optional[AcceptFn] = None,
+                          fail_fast: bool = True,
+                          max_total_bytes: Optional[int] = None,
+                          max_files: Optional[int] = None) -> List[Union[StoredUpload, ProblemError]]:
+    """
+    Lee el cuerpo multipart directo del socket y vuelca cada archivo de `field` a disco,
+    sin pasar por el SpooledTemporaryFile de Starlette: el límite MAX_UPLOAD_MB se aplica
+    mientras llegan los bytes y solo el chunk en curso vive en memoria. Las escrituras
+    corren fuera del event loop (asyncio.to_thread).
+    Con fail_fast (rutas de un archivo) el primer error se lanza y se deja de leer;
+    si no, se informa como ProblemError en la lista y se sigue con los demás archivos.
+    `directory` permite dejarlos en un almacenamiento persistente (jobs).
+    `max_total_bytes` acota la suma de todos los archivos (lotes): pasado el tope se lanza
+    BatchTooLarge aunque no haya fail_fast. Con `max_files` (rutas de un archivo), un archivo
+    de más en `field` es un 400 y no queda ningún temporal.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise ProblemError(400, "Archivo requerido", "Envía el archivo como multipart/form-data.")
+    try:
+        declared = int(request.headers.get("content-length", "0"))
+    except ValueError:
+        declared = 0
+    if fail_fast and declared > max_upload_mb() * 1024 * 1024 + _MULTIPART_OVERHEAD:
+        raise _too_large(declared)
+    if max_total_bytes is not None and declared > max_total_bytes + _MULTIPART_OVERHEAD:
+        raise _batch_bytes_error(max_total_bytes)
+
+    sink = _MultipartSink(field, directory, accept, fail_fast, max_total_bytes, max_files)
+    parser = MultipartParser(boundary, sink.callbacks())
+    try:
+        # El parser dispara las escrituras a disco desde sus callbacks: van en un hilo para
+        # que un disco lento no frene el event loop (y con él las demás requests).
+        async for chunk in request.stream():
+            await asyncio.to_thread(parser.write, chunk)
+        await asyncio.to_thread(parser.finalize)
+    except ProblemError:
+        sink.discard()
+        raise
+    except MultipartParseError as e:
+        sink.discard()
+        raise ProblemError(400, "Archivo ilegible", f"Cuerpo multipart inválido: {e}")
+    except BaseException:
+        sink.discard()
+        raise
+    if not sink.items:
+        raise ProblemError(400, "Archivo requerido", "Adjunta un archivo JSON/NDJSON (k6) o CSV/XML (JMeter).")
+    return sink.items
+
+def is_archive(filename: str, content_type: str) -> bool:
+    return content_type in ARCHIVE_TYPES or filename.lower().endswith(ARCHIVE_EXTENSIONS)
+
+def expand_archive(upload: StoredUpload, max_members: Optional[int] = None, max_bytes: Optional[int] = None,
+                   batch_limit: int = 0) -> List[Union[StoredUpload, ProblemError]]:
+    """
+    Extrae cada miembro soportado de un zip/tar a su propio temporal.
+    Los miembros no soportados o demasiado grandes se devuelven como ProblemError
+    para informarlos en el lote sin abortar el resto.
+    Con `max_members`/`max_bytes` (lo que le queda al lote) la extracción se corta apenas
+    se pasan, con BatchTooLarge: un zip bomb no llega a escribirse entero a disco.
+    `batch_limit` es el tope total en bytes, solo para el mensaje.
+    """
+    items: List[Union[StoredUpload, ProblemError]] = []
+    written = 0
+
+    def add(name: str, opener) -> None:
+        nonlocal written
+        if max_members is not None and len(items) >= max_members:
+            raise BatchTooLarge("El lote supera el máximo de archivos (BATCH_MAX_FILES).",
+                                {"archive": upload.filename})
+        ext = os.path.splitext(name.lower())[1]
+        content_type = _MEMBER_TYPES.get(ext)
+        if content_type is None:
+            err = ProblemError(415, "Tipo no soportado", "Solo se aceptan JSON/NDJSON (k6) o CSV/XML (JMeter).")
+            err.extra["filename"] = name
+            items.append(err)
+            return
+        budget = None if max_bytes is None else max_bytes - written
+        try:
+            with opener() as src:
+                path, size, sha = _copy_to_temp(src, name, budget, batch_limit)
+        except BatchTooLarge:
+            raise
+        except ProblemError as e:
+            e.extra["filename"] = name
+            items.append(e)
+            return
+        written += size
+        items.append(StoredUpload(path, name, content_type, size, sha))
+
+    try:
+        if zipfile.is_zipfile(upload.path):
+            with zipfile.ZipFile(upload.path) as zf:
+                for info in zf.infolist():
+                    if not info.is_dir():
+                        add(info.filename, lambda info=info: zf.open(info))
+        else:
+            with tarfile.open(upload.path) as tf:
+                for member in tf:
+                    if member.isfile():
+                        add(member.name, lambda member=member: tf.extractfile(member))
+    except BaseException as e:
+        for item in items:
+            if isinstance(item, StoredUpload):
+                item.discard()
+        if isinstance(e, (zipfile.BadZipFile, tarfile.TarError)):
+            raise ProblemError(400, "Archivo ilegible", f"Archivo comprimido inválido: {e}")
+        raise
+    return items
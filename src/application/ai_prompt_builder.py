@@ -1,5 +1,18 @@
-from src.domain.summary_contract import Summary
+from functools import lru_cache
+from typing import Optional
+from src.core.fast_json import model_json
+from src.domain.summary_contract import Summary, RunComparison
 
+# Subir cuando cambien los prompts: invalida los informes guardados en caché.
+PROMPT_VERSION = "5"
+
+# Umbrales de la guía del prompt (los usa también el informe local).
+ERROR_RATE_WARN_PCT = 1
+ERROR_RATE_CRIT_PCT = 3
+P95_WARN_MS = 400
+P95_CRIT_MS = 800
+
+@lru_cache(maxsize=1)
 def build_system_prompt() -> str:
     return (
         "Rol: Analista senior que redacta informes para directivos no técnicos.\n"
@@ -25,7 +38,24 @@ def build_system_prompt() -> str:
         "- Si falta un dato, escribe \"N/A\" y dilo brevemente.\n"
     )
 
-def build_user_prompt(summary: Summary) -> str:
+def _comparison_block(comparison: Optional[RunComparison]) -> str:
+    if comparison is None:
+        return ""
+    # Solo las cifras: las llaves internas de las corridas no aportan al lector.
+    data = comparison.model_dump_json(exclude={"run_key", "baseline_key"}, indent=0)
+    return f"""
+Comparación con la ejecución anterior ({comparison.baseline_tag or comparison.baseline_run_id}):
+{data}
+
+Guía de comparación:
+- verdict=regression: empeoró de forma consistente (no es ruido); menciónalo primero en risks.
+- verdict=improvement: mejoró; menciónalo en highlights.
+- verdict=changed: la cifra se movió pero no se pudo confirmar que no sea ruido; si lo mencionas, dilo así.
+- *_delta_pct es el cambio porcentual frente a la ejecución anterior.
+"""
+
+def build_user_prompt(summary: Summary, comparison: Optional[RunComparison] = None) -> str:
+    # JSON compacto directo del modelo (model_json): el mismo que lleva la respuesta HTTP.
     return f"""
 Contexto:
 - Producto: Performance Analyzer AI
@@ -34,13 +64,14 @@ Contexto:
 - Ejecución: {summary.run_id}
 
 Resumen disponible (usa SOLO estos datos):
-{summary.model_dump_json(indent=0)}
+{model_json(summary).decode('utf-8')}
 
 Guía:
-- error_rate_pct: atención > 1%, crítico > 3%.
-- p95_ms: atención > 400 ms, crítico > 800 ms.
+- error_rate_pct: atención > {ERROR_RATE_WARN_PCT}%, crítico > {ERROR_RATE_CRIT_PCT}%.
+- p95_ms: atención > {P95_WARN_MS} ms, crítico > {P95_CRIT_MS} ms.
 - Si faltan datos, usa "N/A" y explícalo en una frase.
-
+- Una fila "(otras N operaciones...)" agrupa operaciones de poco impacto: menciónala solo en conjunto.
+{_comparison_block(comparison)}
 FORMATO DE RESPUESTA (OBLIGATORIO, SOLO JSON EN ESPAÑOL Y SIN TECNICISMOS):
 {{
   "title": "string",
@@ -0,0 +1,71 @@
+import hashlib, json, os
+from typing import Optional, Tuple
+from src.domain.summary_contract import Summary, AIReport, TokenUsage, RunComparison
+from src.application.ai_prompt_builder import PROMPT_VERSION
+from src.infrastructure.cache.factory import get_cache
+from src.infrastructure.runs.store import get_run_store
+
+# Variables que cambian el resultado del parseo: forman parte de la llave del summary.
+_PARSER_SETTINGS = ("PERCENTILE_MODE", "SKETCH_EXACT_LIMIT", "SKETCH_RELATIVE_ACCURACY", "JMETER_BACKEND",
+                    "LABEL_RULES", "LABEL_RULES_FILE", "LABEL_COLLAPSE_IDS", "MAX_LABELS",
+                    "TIMESERIES_WINDOW_MS", "TIMESERIES_MAX_WINDOWS", "TIMESERIES_RELATIVE_ACCURACY")
+
+def _digest(*parts: str) -> str:
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(p.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+def summary_key(content_sha256: str, filename: str, content_type: str) -> str:
+    ext = os.path.splitext(filename.lower())[1]
+    settings = [f"{k}={os.getenv(k, '')}" for k in _PARSER_SETTINGS]
+    return "summary:" + _digest(content_sha256, ext, content_type or "", *settings)
+
+def report_key(summary: Summary, deployment: str, comparison: Optional[RunComparison] = None) -> str:
+    # run_id es la hora del parseo: no cambia el contenido del informe. Tampoco las llaves
+    # de las corridas comparadas, solo sus cifras.
+    canonical = json.dumps(summary.model_dump(exclude={"run_id"}), sort_keys=True, separators=(",", ":"))
+    versus = json.dumps(comparison.model_dump(exclude={"run_key", "baseline_key"}), sort_keys=True,
+                        separators=(",", ":")) if comparison is not None else ""
+    return "ai_report:" + _digest(canonical, PROMPT_VERSION, deployment, versus)
+
+def get_summary(key: str) -> Optional[Tuple[Summary, dict]]:
+    raw = get_cache().get(key)
+    if raw is None:
+        return None
+    data = json.loads(raw)
+    return Summary.model_validate(data["summary"]), data["flags"]
+
+def put_summary(key: str, summary: Summary, flags: dict) -> None:
+    payload = {"summary": summary.model_dump(mode="json"), "flags": flags}
+    get_cache().set(key, json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+
+def analysis_id(summary_key_: str) -> str:
+    """Identificador público del análisis: el digest de la llave del summary."""
+    return summary_key_.split(":", 1)[1]
+
+# Las series no van a la caché (opcional y con desalojo): se guardan en el SQLite del historial
+# por TIMESERIES_RETENTION_HOURS, así la timeseries_url que se publica sigue respondiendo.
+def get_timeseries(analysis_id_: str) -> Optional[dict]:
+    raw = get_run_store().get_series(analysis_id_)
+    return json.loads(raw) if raw is not None else None
+
+def has_timeseries(analysis_id_: str) -> bool:
+    return get_run_store().has_series(analysis_id_)
+
+def put_timeseries(analysis_id_: str, series: dict) -> None:
+    get_run_store().put_series(analysis_id_, json.dumps(series, separators=(",", ":")))
+
+def get_report(key: str) -> Optional[Tuple[AIReport, TokenUsage, str]]:
+    """Devuelve el informe guardado; el uso de tokens es 0 porque no se llamó a la IA."""
+    raw = get_cache().get(key)
+    if raw is None:
+        return None
+    data = json.loads(raw)
+    usage = TokenUsage(model=data["usage"].get("model"))
+    return AIReport.model_validate(data["report"]), usage, data["ai_mode"]
+
+def put_report(key: str, report: AIReport, usage: TokenUsage, ai_mode: str) -> None:
+    payload = {"report": report.model_dump(mode="json"), "usage": usage.model_dump(mode="json"), "ai_mode": ai_mode}
+    get_cache().set(key, json.dumps(payload, separators=(",", ":")).encode("utf-8"))
@@ -0,0 +1,410 @@
+import asyncio, os, threading, uuid
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Optional, Tuple
+from src.core import metrics
+from src.core.env import env_float
+from src.core.errors import ProblemError
+from src.domain.summary_contract import Summary, AnalyzeResponse, AIReport, TokenUsage, RunComparison
+from src.core.timeseries import TimeSeries
+from src.application.summary_service import build_summary_from_path, finish_parallel_jmeter, plan_parallel_jmeter
+from src.application import analysis_cache
+from src.application.regression_service import RunRequest, record_and_compare
+from src.application.prompt_compaction import compact_for_prompt
+from src.application.local_report import build_local_report
+from src.infrastructure.ai.azure_openai_service import generate_ai_report, stream_ai_report, current_deployment
+from src.infrastructure.ai.scheduler import AIUnavailable, CircuitOpen
+from src.infrastructure.concurrency import Saturated, ai_pool, parse_pool
+from src.services.jmeter_parallel import aggregate_range, parallel_workers
+
+ROWS = metrics.counter("informai_rows_processed_total", "Filas (requests) parseadas por herramienta.", ("tool",))
+BYTES = metrics.counter("informai_bytes_processed_total", "Bytes de entrada parseados por herramienta.", ("tool",))
+TOKENS = metrics.counter("informai_ai_tokens_total", "Tokens consumidos en la IA.", ("kind",))
+CACHE = metrics.counter("informai_cache_lookups_total", "Búsquedas en caché por tipo y resultado.", ("cache", "result"))
+FALLBACKS = metrics.counter("informai_ai_fallbacks_total", "Informes locales por no poder usar la IA.", ("reason",))
+IN_FLIGHT = metrics.gauge("informai_analyses_in_flight", "Análisis en curso (ruta, lotes y jobs).")
+
+@dataclass
+class StoredUpload:
+    """Archivo ya volcado a disco, listo para parsearse en otro proceso."""
+    path: str
+    filename: str
+    content_type: str
+    size: int
+    content_sha256: str
+
+    def discard(self) -> None:
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+def ai_unavailable_error(e: AIUnavailable) -> ProblemError:
+    retry_after = max(int(round(e.retry_after)), 1)
+    return ProblemError(503, "IA no disponible", str(e), {"retry_after_s": retry_after},
+                        headers={"Retry-After": str(retry_after)})
+
+def busy_error(e: Saturated) -> ProblemError:
+    return ProblemError(503, "Servicio saturado",
+                        "Hay demasiados análisis en curso. Reintenta más tarde.",
+                        {"pool": e.pool, "retry_after_s": e.retry_after},
+                        headers={"Retry-After": str(e.retry_after)})
+
+# Callback de fase: on_phase("parsing" | "reporting", datos) para reportar avance.
+PhaseCallback = Callable[[str, dict], None]
+
+async def _parse_in_ranges(upload: StoredUpload, workers: int, wait: bool,
+                           on_bytes: Optional[Callable[[int], None]]) -> Optional[tuple[Summary, dict, Optional[dict]]]:
+    """
+    CSV de JMeter grande: un trabajo del pool de parseo por rango de bytes y la fusión de
+    los parciales en un hilo. Los rangos se admiten juntos (BoundedExecutor.run_all): si el
+    pool no tiene lugar para todos no se envía ninguno. None si el archivo no es un CSV de
+    JMeter para el backend python, no hubo lugar o algún rango topó MAX_LABELS por sí solo:
+    va por el camino de siempre.
+    """
+    plan = await asyncio.to_thread(plan_parallel_jmeter, upload.path, upload.filename, upload.content_type, workers)
+    if plan is None:
+        return None
+    headers, ranges, delimiter = plan
+    series = TimeSeries()
+    window = series.window_ms if series.enabled else 0
+    done = 0
+
+    def progress(i: int) -> None:
+        nonlocal done
+        lo, hi = ranges[i]
+        done += hi - lo
+        if on_bytes is not None:
+            on_bytes(done)
+
+    calls = [(upload.path, lo, hi, headers, window, series.max_windows, delimiter) for lo, hi in ranges]
+    try:
+        with metrics.stage("parse"):
+            partials = await parse_pool().run_all(aggregate_range, calls, wait=wait, on_done=progress)
+    except Saturated:
+        return None  # no hay lugar para todos los rangos: se parsea como un solo trabajo
+    if any(capped for _, _, capped in partials):
+        # Un rango llegó solo a MAX_LABELS: su normalizador mandó a OVERFLOW_LABEL labels que el
+        # recorrido serial pudo haber admitido antes. Sin ese caso la fusión admite en el mismo
+        # orden que el serial, así que el resultado no depende de JMETER_PARALLEL_* (ni de la llave).
+        return None
+    with metrics.stage("aggregate"):
+        return await asyncio.to_thread(finish_parallel_jmeter, partials, series if window else None)
+
+async def build_summary(upload: StoredUpload, cache_info: dict, wait: bool = False,
+                        parse_fn: Callable[..., Any] = build_summary_from_path,
+                        parse_args: tuple = (),
+                        on_bytes: Optional[Callable[[int], None]] = None) -> tuple[Summary, dict, Optional[dict]]:
+    """
+    Summary desde caché o parseando en el pool de procesos. Errores → ProblemError.
+    parse_fn(path, filename, content_type, *parse_args) debe ser importable por los workers
+    y devolver (summary, flags, serie_de_tiempo | None). En un acierto de caché la serie
+    no se carga (None): quien la necesite la pide a analysis_cache.
+    Un CSV de JMeter que supera JMETER_PARALLEL_MIN_MB se reparte por rangos entre los
+    workers del mismo pool (hasta JMETER_PARALLEL_WORKERS); on_bytes(n) informa el avance.
+    """
+    try:
+        skey = analysis_cache.summary_key(upload.content_sha256, upload.filename, upload.content_type)
+        cached = analysis_cache.get_summary(skey)
+        if cached is not None:
+            cache_info["summary"] = "hit"
+            return cached[0], cached[1], None
+        result = None
+        workers = min(parallel_workers(upload.size), parse_pool().max_workers)
+        if workers > 1:
+            result = await _parse_in_ranges(upload, workers, wait, on_bytes)
+        if result is None:
+            result = await parse_pool().run(
+                parse_fn, upload.path, upload.filename, upload.content_type, *parse_args, wait=wait)
+        summary_obj, flags, series = result
+        metrics.record_stages(flags.pop("stage_ms", {}))
+        ROWS.inc(summary_obj.overall.requests, summary_obj.tool)
+        BYTES.inc(upload.size, summary_obj.tool)
+        analysis_cache.put_summary(skey, summary_obj, flags)
+        if series is not None:
+            await asyncio.to_thread(analysis_cache.put_timeseries, analysis_cache.analysis_id(skey), series)
+        return summary_obj, flags, series
+    except Saturated as e:
+        raise busy_error(e)
+    except KeyError as e:
+        raise ProblemError(422, "Estructura incompleta", str(e))
+    except ValueError as e:
+        raise ProblemError(400, "Archivo ilegible", str(e))
+    except Exception as e:
+        raise ProblemError(500, "Error procesando archivo", f"{type(e).__name__}: {e}")
+
+AI_MODES = ("auto", "azure", "local")
+
+def resolve_ai_mode(requested: Optional[str] = None) -> str:
+    """
+    Modo del informe: el pedido en el request o AI_MODE (auto por defecto); AI_BYPASS=true
+    fuerza "local". azure: siempre el modelo. local: informe por reglas, sin tokens.
+    auto: el modelo, pero cae al informe local si el circuito está abierto, no hay
+    presupuesto de tokens o la IA tarda más que AI_LATENCY_BUDGET_S.
+    """
+    if os.getenv("AI_BYPASS", "false").strip().lower() in ("1", "true", "yes", "y"):
+        return "local"
+    mode = (requested or os.getenv("AI_MODE", "auto")).strip().lower()
+    if mode not in AI_MODES:
+        raise ProblemError(400, "Modo de IA inválido", f"ai_mode debe ser uno de: {', '.join(AI_MODES)}.",
+                           {"ai_mode": mode})
+    return mode
+
+def _latency_budget() -> float:
+    return env_float("AI_LATENCY_BUDGET_S", 0.0, minimum=0.0)
+
+@dataclass
+class PreparedAnalysis:
+    """Fase de summary ya resuelta (parseo o caché + comparación); falta el informe."""
+    upload: StoredUpload
+    summary: Summary
+    flags: dict
+    analysis_id: str
+    cache_info: dict
+    timer: metrics.StageTimer
+    request_id: str
+    run_key: Optional[str] = None
+    comparison: Optional[RunComparison] = None
+    prompt_info: dict = field(default_factory=dict)
+    ai_fallback: Optional[str] = None
+    has_series: bool = False
+
+    def metadata(self, ai_mode: Optional[str]) -> dict:
+        flags = self.flags
+        return {
+            "request_id": self.request_id,
+            "tool_detected": self.summary.tool,
+            "input_size_bytes": self.upload.size,
+            "flags": flags,
+            "ai_mode": ai_mode,
+            "ai_fallback": self.ai_fallback,
+            "cache": self.cache_info,
+            "prompt": self.prompt_info,
+            "content_sha256": self.upload.content_sha256,
+            "analysis_id": self.analysis_id,
+            "timeseries_url": f"/summary/{self.analysis_id}/timeseries" if self.has_series else None,
+            "run_key": self.run_key,
+            "comparison": self.comparison.model_dump(mode="json") if self.comparison is not None else None,
+            "timings_ms": dict(self.timer.ms),
+        }
+
+    def fallback(self, reason: str) -> tuple[AIReport, TokenUsage, str]:
+        """Informe local en lugar del modelo; el motivo queda en metadata["ai_fallback"]."""
+        self.ai_fallback = reason
+        FALLBACKS.inc(1, reason)
+        self.cache_info["ai_report"] = "bypass"
+        return build_local_report(self.summary, self.comparison)
+
+def _fallback_reason(e: AIUnavailable) -> str:
+    return "circuit_open" if isinstance(e, CircuitOpen) else "token_budget"
+
+def _local(prepared: PreparedAnalysis) -> tuple[AIReport, TokenUsage, str]:
+    prepared.cache_info["ai_report"] = "bypass"
+    return build_local_report(prepared.summary, prepared.comparison)
+
+async def _compact(prepared: PreparedAnalysis) -> tuple[Summary, Optional[RunComparison]]:
+    with metrics.stage("prompt_build"):
+        summary_obj, comparison, info = await asyncio.to_thread(
+            compact_for_prompt, prepared.summary, prepared.comparison)
+    prepared.prompt_info.update(info)
+    return summary_obj, comparison
+
+def _store_report(rkey: str, result: tuple[AIReport, TokenUsage, str]) -> None:
+    usage = result[1]
+    TOKENS.inc(usage.prompt_tokens, "prompt")
+    TOKENS.inc(usage.completion_tokens, "completion")
+    analysis_cache.put_report(rkey, *result)
+
+# Llamadas que siguieron tras vencer el presupuesto de latencia (referencia fuerte hasta terminar).
+_LATE: set = set()
+
+def _store_late(rkey: str):
+    """Para un informe que llegó después del presupuesto de latencia: queda en caché para la próxima."""
+    def done(task: asyncio.Future) -> None:
+        _LATE.discard(task)
+        if not task.cancelled() and task.exception() is None:
+            _store_report(rkey, task.result())
+    return done
+
+async def build_report(prepared: PreparedAnalysis, wait: bool = False,
+                       mode: str = "azure") -> tuple[AIReport, TokenUsage, str]:
+    """
+    Informe según `mode` (ver resolve_ai_mode): local, desde caché o consultando el modelo
+    en el pool de hilos. El summary se compacta antes al presupuesto de tokens; el detalle
+    queda en prepared.prompt_info.
+    """
+    if mode == "local":
+        return _local(prepared)
+    try:
+        summary_obj, comparison = await _compact(prepared)
+        rkey = analysis_cache.report_key(summary_obj, current_deployment(), comparison)
+        cached = analysis_cache.get_report(rkey)
+        if cached is not None:
+            prepared.cache_info["ai_report"] = "hit"
+            return cached
+        call = ai_pool().run(generate_ai_report, summary_obj, comparison, wait=wait)
+        budget = _latency_budget() if mode == "auto" else 0.0
+        if not budget:
+            result = await call
+        else:
+            task = asyncio.ensure_future(call)
+            try:
+                result = await asyncio.wait_for(asyncio.shield(task), budget)
+            except asyncio.TimeoutError:
+                _LATE.add(task)
+                task.add_done_callback(_store_late(rkey))
+                return prepared.fallback("latency_budget")
+        _store_report(rkey, result)
+        return result
+    except Saturated as e:
+        raise busy_error(e)
+    except AIUnavailable as e:
+        if mode == "auto":
+            return prepared.fallback(_fallback_reason(e))
+        raise ai_unavailable_error(e)
+    except Exception as e:
+        raise ProblemError(502, "Fallo consultando AI", f"{type(e).__name__}: {e}")
+
+async def prepare_analysis(upload: StoredUpload, timer: metrics.StageTimer, wait: bool = False,
+                           request_id: Optional[str] = None,
+                           parse_fn: Callable[..., Any] = build_summary_from_path, parse_args: tuple = (),
+                           run: Optional[RunRequest] = None,
+                           on_bytes: Optional[Callable[[int], None]] = None) -> PreparedAnalysis:
+    """Summary (caché o parseo) y, con `run`, registro de la corrida y comparación con su línea base."""
+    cache_info = {"summary": "miss", "ai_report": "miss"}
+    summary_obj, flags, series = await build_summary(upload, cache_info, wait, parse_fn, parse_args, on_bytes)
+    analysis_id = analysis_cache.analysis_id(
+        analysis_cache.summary_key(upload.content_sha256, upload.filename, upload.content_type))
+    prepared = PreparedAnalysis(upload, summary_obj, flags, analysis_id, cache_info, timer,
+                                request_id or str(uuid.uuid4()))
+    # En un acierto de caché la serie pudo vencer: la URL solo se publica si sigue guardada.
+    prepared.has_series = series is not None or (
+        "timeseries_window_ms" in flags and await asyncio.to_thread(analysis_cache.has_timeseries, analysis_id))
+    if run is not None:
+        if series is None and "timeseries_window_ms" in flags:
+            series = analysis_cache.get_timeseries(analysis_id)
+        prepared.run_key, prepared.comparison = await asyncio.to_thread(
+            record_and_compare, run, summary_obj, flags, series, analysis_id)
+    return prepared
+
+def _count_report(prepared: PreparedAnalysis) -> None:
+    for kind, result in prepared.cache_info.items():
+        CACHE.inc(1, kind, result)
+
+async def analyze_upload(upload: StoredUpload, wait: bool = False, request_id: Optional[str] = None,
+                         parse_fn: Callable[..., Any] = build_summary_from_path, parse_args: tuple = (),
+                         on_phase: Optional[PhaseCallback] = None,
+                         run: Optional[RunRequest] = None, ai_mode: Optional[str] = None) -> AnalyzeResponse:
+    """
+    Pipeline completo: summary (caché o parseo) + informe (caché, IA o local según ai_mode).
+    wait=True espera turno en los pools en vez de responder 503 (lotes y jobs).
+    Con `run`, la corrida se guarda en el historial y el informe incluye la comparación
+    contra su línea base.
+    Las etapas (parseo, prompt, IA...) quedan en metadata["timings_ms"] y en /metrics.
+    """
+    mode = resolve_ai_mode(ai_mode)
+    with metrics.stage_timer() as timer:
+        IN_FLIGHT.inc()
+        try:
+            if on_phase:
+                on_phase("parsing", {})
+            on_bytes = (lambda n: on_phase("parsing", {"bytes_processed": n})) if on_phase else None
+            prepared = await prepare_analysis(upload, timer, wait, request_id, parse_fn, parse_args, run, on_bytes)
+            if on_phase:
+                on_phase("reporting", {"rows_processed": prepared.summary.overall.requests})
+            ai_report, usage, used_mode = await build_report(prepared, wait, mode)
+            _count_report(prepared)
+            return AnalyzeResponse(summary=prepared.summary, ai_report=ai_report, token_usage=usage,
+                                   metadata=prepared.metadata(used_mode))
+        finally:
+            IN_FLIGHT.dec()
+
+def _sections(report: AIReport):
+    for name in AIReport.model_fields:
+        yield "section", {"name": name, "value": getattr(report, name)}
+
+async def stream_report(prepared: PreparedAnalysis, mode: str = "azure") -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Informe en streaming para un análisis ya preparado. Eventos, en orden:
+    ("section", {"name", "value"}) por cada sección del AIReport apenas el modelo la cierra,
+    ("usage", TokenUsage) y ("done", AnalyzeResponse). Un informe en caché o local se
+    entrega completo de una vez. Los errores salen como ProblemError (igual que build_report).
+    En modo auto, si la IA no está disponible antes de la primera sección, sigue el informe local.
+    """
+    IN_FLIGHT.inc()
+    try:
+        if mode == "local":
+            result = _local(prepared)
+            for event in _sections(result[0]):
+                yield event
+        else:
+            summary_obj, comparison = await _compact(prepared)
+            rkey = analysis_cache.report_key(summary_obj, current_deployment(), comparison)
+            cached = analysis_cache.get_report(rkey)
+            if cached is not None:
+                prepared.cache_info["ai_report"] = "hit"
+                result = cached
+                for event in _sections(result[0]):
+                    yield event
+            else:
+                result, sent = [], 0
+                try:
+                    async for name, value in _relay_stream(summary_obj, comparison, prepared.timer, result):
+                        sent += 1
+                        yield "section", {"name": name, "value": value}
+                except AIUnavailable as e:
+                    if mode != "auto" or sent:
+                        raise ai_unavailable_error(e)
+                    result = prepared.fallback(_fallback_reason(e))
+                    for event in _sections(result[0]):
+                        yield event
+                else:
+                    _store_report(rkey, tuple(result))
+        ai_report, usage, used_mode = result
+        _count_report(prepared)
+        yield "usage", usage
+        yield "done", AnalyzeResponse(summary=prepared.summary, ai_report=ai_report, token_usage=usage,
+                                      metadata=prepared.metadata(used_mode))
+    finally:
+        IN_FLIGHT.dec()
+
+async def _relay_stream(summary_obj: Summary, comparison: Optional[RunComparison],
+                        timer: metrics.StageTimer, result: list) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Consume stream_ai_report en el pool de la IA y reenvía sus secciones al event loop.
+    Si el cliente se va, el hilo corta el stream del modelo en el siguiente chunk.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def pump() -> None:
+        with metrics.activate(timer):
+            events = stream_ai_report(summary_obj, comparison)
+            try:
+                for event in events:
+                    loop.call_soon_threadsafe(queue.put_nowait, event)
+                    if stop.is_set():
+                        break
+            finally:
+                events.close()
+
+    task = asyncio.ensure_future(ai_pool().run(pump))
+    task.add_done_callback(lambda _: queue.put_nowait(None))
+    try:
+        while (event := await queue.get()) is not None:
+            kind, payload = event
+            if kind == "section":
+                yield payload
+            else:
+                result[:] = payload
+        await task
+    except Saturated as e:
+        raise busy_error(e)
+    except AIUnavailable:
+        raise  # stream_report decide si cae al informe local
+    except Exception as e:
+        raise ProblemError(502, "Fallo consultando AI", f"{type(e).__name__}: {e}")
+    finally:
+        stop.set()
+        # Si el cliente cortó antes, el error del hilo (si lo hay) se descarta sin avisos.
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
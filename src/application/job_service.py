@@ -0,0 +1,119 @@
+import asyncio, os, uuid
+from typing import List, Optional
+from src.core.env import env_int
+from src.core.errors import ProblemError
+from src.core.progress import with_progress
+from src.application.summary_service import build_summary_with_series
+from src.application.analyze_service import StoredUpload, analyze_upload
+from src.infrastructure.jobs.store import JobStore, store_at
+
+def jobs_dir() -> str:
+    return os.getenv("JOBS_DIR", ".jobs")
+
+def _job_workers() -> int:
+    return env_int("JOB_WORKERS", 2, minimum=1)
+
+def build_summary_for_job(path: str, filename: str, content_type: str, db_path: str, job_id: str):
+    """Worker de parseo para jobs: igual que build_summary_from_path, reportando bytes leídos."""
+    store = store_at(db_path)
+    with open(path, "rb") as raw:
+        stream = with_progress(raw, lambda n: store.update(job_id, bytes_processed=n))
+        return build_summary_with_series(stream, filename, content_type)
+
+class JobRunner:
+    """
+    Cola local de jobs: los uploads grandes se guardan en JOBS_DIR y se procesan con
+    JOB_WORKERS tareas del event loop (que a su vez usan los pools de parseo e IA).
+    El estado vive en SQLite, así que al reiniciar se reencolan los jobs pendientes.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or jobs_dir()
+        self.uploads_dir = os.path.join(self.directory, "uploads")
+        self.db_path = os.path.join(self.directory, "jobs.sqlite3")
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def store(self) -> JobStore:
+        return store_at(self.db_path)
+
+    def start(self) -> None:
+        if self._queue is not None:
+            return
+        os.makedirs(self.uploads_dir, exist_ok=True)
+        self._queue = asyncio.Queue()
+        for job_id in self.store.pending():
+            self.store.update(job_id, status="queued", phase="queued")
+            self._queue.put_nowait(job_id)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(_job_workers())]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def submit(self, upload: StoredUpload) -> str:
+        self.start()
+        job_id = uuid.uuid4().hex
+        self.store.create(job_id, upload.filename, upload.content_type, upload.size,
+                          upload.content_sha256, upload.path)
+        self._queue.put_nowait(job_id)
+        return job_id
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        store = self.store
+        job = store.get(job_id)
+        if job is None or job["status"] not in ("queued", "running"):
+            return
+        upload = StoredUpload(job["upload_path"], job["filename"], job["content_type"],
+                              job["size"], job["content_sha256"])
+        if not os.path.exists(upload.path):
+            store.update(job_id, status="failed", phase="failed",
+                         error=ProblemError(410, "Archivo no disponible",
+                                            "El archivo del job ya no existe en disco.").payload())
+            return
+
+        def on_phase(phase: str, info: dict) -> None:
+            store.update(job_id, status="running", phase=phase, **info)
+
+        try:
+            result = await analyze_upload(upload, wait=True, request_id=job_id,
+                                          parse_fn=build_summary_for_job,
+                                          parse_args=(self.db_path, job_id), on_phase=on_phase)
+        except ProblemError as e:
+            store.update(job_id, status="failed", phase="failed", error=e.payload())
+        except asyncio.CancelledError:
+            # Apagado: el job queda "running" y se reencola al arrancar.
+            raise
+        except Exception as e:
+            store.update(job_id, status="failed", phase="failed",
+                         error=ProblemError(500, "Error procesando job", f"{type(e).__name__}: {e}").payload())
+        else:
+            store.update(job_id, status="done", phase="done", bytes_processed=upload.size,
+                         result=result.model_dump(mode="json"))
+        upload.discard()
+
+_runner: Optional[JobRunner] = None
+
+def get_runner() -> JobRunner:
+    global _runner
+    if _runner is None:
+        _runner = JobRunner()
+    return _runner
+
+async def shutdown_runner() -> None:
+    global _runner
+    if _runner is not None:
+        await _runner.stop()
+        _runner = None
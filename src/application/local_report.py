@@ -0,0 +1,114 @@
+from typing import List, Optional, Tuple
+from src.domain.summary_contract import Summary, MethodMetrics, AIReport, TokenUsage, RunComparison
+from src.application.ai_prompt_builder import (
+    ERROR_RATE_WARN_PCT, ERROR_RATE_CRIT_PCT, P95_WARN_MS, P95_CRIT_MS,
+)
+
+# Operaciones que se nombran como máximo en riesgos y recomendaciones.
+MAX_ITEMS = 5
+
+_LEVEL_TITLES = {
+    "positivo": "Resultado positivo: el sistema respondió bien a la prueba",
+    "requiere atención": "Resultado que requiere atención: hay puntos a mejorar",
+    "crítico": "Resultado crítico: el sistema no respondió como se espera",
+}
+
+def _level(error_pct: float, p95: float) -> str:
+    if error_pct > ERROR_RATE_CRIT_PCT or p95 > P95_CRIT_MS:
+        return "crítico"
+    if error_pct > ERROR_RATE_WARN_PCT or p95 > P95_WARN_MS:
+        return "requiere atención"
+    return "positivo"
+
+def _pct(rate: float) -> str:
+    return f"{rate * 100:.2f}".rstrip("0").rstrip(".") + "%"
+
+def _ms(value: float) -> str:
+    return f"{value:,.0f} ms".replace(",", ".")
+
+def _count(value: int) -> str:
+    return f"{value:,}".replace(",", ".")
+
+def _duration(ms: int) -> str:
+    seconds = ms / 1000.0
+    if seconds >= 120:
+        return f"{seconds / 60:.1f} minutos"
+    return f"{seconds:.0f} segundos"
+
+def _problems(by_method: List[MethodMetrics]) -> Tuple[List[MethodMetrics], List[MethodMetrics]]:
+    """Operaciones sobre el umbral de atención: (con errores, lentas), de peor a mejor."""
+    failing = sorted((m for m in by_method if m.error_rate * 100 > ERROR_RATE_WARN_PCT),
+                     key=lambda m: (-m.error_rate, -m.requests))
+    slow = sorted((m for m in by_method if m.latency_ms.p95 > P95_WARN_MS),
+                  key=lambda m: (-m.latency_ms.p95, -m.requests))
+    return failing[:MAX_ITEMS], slow[:MAX_ITEMS]
+
+def build_local_report(summary: Summary, comparison: Optional[RunComparison] = None) -> Tuple[AIReport, TokenUsage, str]:
+    """
+    Informe por reglas, sin modelo: mismos umbrales que la guía del prompt y textos en
+    español no técnico a partir de plantillas. Tarda microsegundos y no gasta tokens.
+    Retorna: (AIReport, TokenUsage vacío, "local")
+    """
+    o = summary.overall
+    error_pct = o.error_rate * 100
+    p95 = o.latency_ms.p95
+    level = _level(error_pct, p95)
+    failing, slow = _problems(summary.by_method)
+    regressions = [c for c in comparison.by_method if c.verdict == "regression"][:MAX_ITEMS] if comparison else []
+    improvements = [c for c in comparison.by_method if c.verdict == "improvement"][:MAX_ITEMS] if comparison else []
+
+    overview = [
+        f"Se enviaron {_count(o.requests)} solicitudes durante {_duration(o.duration_ms)}, "
+        f"a un ritmo de {o.throughput_rps:.1f} por segundo.",
+        f"Fallaron {_count(o.failures)} solicitudes ({_pct(o.error_rate)} del total).",
+        f"El 95% de las solicitudes respondió en {_ms(p95)} o menos: p95 (tiempo en el 95% de los casos).",
+        f"En conjunto el resultado es {level}.",
+    ]
+    if failing or slow:
+        overview.append(f"{len({m.name for m in failing + slow})} operaciones concentran los problemas.")
+    if comparison is not None:
+        overview.append(f"Frente a la ejecución anterior hay {comparison.regressions} operaciones que empeoraron "
+                        f"y {comparison.improvements} que mejoraron.")
+
+    highlights: List[str] = []
+    if error_pct <= ERROR_RATE_WARN_PCT:
+        highlights.append(f"La tasa de errores fue baja ({_pct(o.error_rate)}).")
+    if p95 <= P95_WARN_MS:
+        highlights.append(f"Los tiempos de respuesta fueron buenos: {_ms(p95)} en el 95% de los casos.")
+    highlights.append(f"El sistema atendió {o.throughput_rps:.1f} solicitudes por segundo.")
+    highlights += [f"{c.name} mejoró frente a la ejecución anterior." for c in improvements]
+
+    risks = [f"{c.name} empeoró frente a la ejecución anterior ({c.p95_delta_pct:+.1f}% en p95)."
+             for c in regressions]
+    risks += [f"{m.name} falló en el {_pct(m.error_rate)} de los casos." for m in failing]
+    risks += [f"{m.name} tardó hasta {_ms(m.latency_ms.p95)} en el 95% de los casos." for m in slow]
+
+    recommendations = [f"Revisar la causa de los errores en {m.name}." for m in failing]
+    recommendations += [f"Optimizar el tiempo de respuesta de {m.name}." for m in slow]
+    if regressions:
+        recommendations.insert(0, "Revisar los cambios desde la ejecución anterior en las operaciones que empeoraron.")
+    if not recommendations:
+        recommendations.append("Mantener la configuración actual y seguir monitoreando en cada entrega.")
+
+    next_steps = ["Repetir la prueba después de los ajustes y compararla con esta ejecución."]
+    if level != "positivo":
+        next_steps.insert(0, "Asignar responsables a los puntos de riesgo y acordar fechas de revisión.")
+    if level == "crítico":
+        next_steps.insert(0, "Evaluar si conviene postergar la salida a producción hasta corregir los errores.")
+
+    report = AIReport(
+        title=_LEVEL_TITLES[level],
+        overview=" ".join(overview),
+        key_metrics={
+            "requests": float(o.requests),
+            "error_rate_pct": round(error_pct, 2),
+            "p95_ms": p95,
+            "throughput_rps": round(o.throughput_rps, 3),
+            "duration_ms": float(o.duration_ms),
+        },
+        highlights=highlights,
+        risks=risks,
+        recommendations=recommendations,
+        next_steps=next_steps,
+    )
+    return report, TokenUsage(model="local"), "local"
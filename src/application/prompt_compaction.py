@@ -0,0 +1,120 @@
+import math, os
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from src.core.env import env_int
+from src.domain.summary_contract import Summary, MethodMetrics, Latency, RunComparison
+from src.application.ai_prompt_builder import build_system_prompt, build_user_prompt
+
+@lru_cache(maxsize=1)
+def _encoder():
+    """Tokenizador local: tiktoken si está instalado (PROMPT_TOKENIZER), si no None."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.get_encoding(os.getenv("PROMPT_TOKENIZER", "o200k_base"))
+    except Exception:
+        return None
+
+def count_tokens(text: str) -> int:
+    """Tokens del texto; sin tiktoken se estima con ~4 caracteres por token."""
+    enc = _encoder()
+    if enc is None:
+        return math.ceil(len(text) / 4)
+    return len(enc.encode(text, disallowed_special=()))
+
+def _prompt_tokens(summary: Summary, comparison: Optional[RunComparison]) -> int:
+    return count_tokens(build_system_prompt()) + count_tokens(build_user_prompt(summary, comparison))
+
+def impact_scores(summary: Summary, comparison: Optional[RunComparison] = None) -> Dict[str, float]:
+    """
+    Impacto de cada label en [0, ~2]: aporte a los errores (0.5), participación en el tráfico (0.3)
+    y cuánto supera su p95 al p95 global (0.2, tope al doble). Las regresiones detectadas
+    contra la línea base suman 1 para que nunca se colapsen antes que el resto.
+    """
+    overall = summary.overall
+    total_req = max(overall.requests, 1)
+    total_fail = overall.failures
+    p95 = overall.latency_ms.p95
+    regressed = {c.name for c in comparison.by_method if c.verdict == "regression"} if comparison else set()
+    scores: Dict[str, float] = {}
+    for m in summary.by_method:
+        err = m.failures / total_fail if total_fail else 0.0
+        traffic = m.requests / total_req
+        outlier = min(max(m.latency_ms.p95 / p95 - 1.0, 0.0), 1.0) if p95 > 0 else 0.0
+        scores[m.name] = 0.5 * err + 0.3 * traffic + 0.2 * outlier + (1.0 if m.name in regressed else 0.0)
+    return scores
+
+def _collapse(rest: List[MethodMetrics]) -> MethodMetrics:
+    """Fila agregada para las labels que no entran: sumas exactas y percentiles promediados por tráfico."""
+    req = sum(m.requests for m in rest)
+    fail = sum(m.failures for m in rest)
+    weight = max(req, 1)
+
+    def avg(attr: str) -> float:
+        return round(sum(getattr(m.latency_ms, attr) * m.requests for m in rest) / weight, 3)
+
+    return MethodMetrics(
+        name=f"(otras {len(rest)} operaciones, percentiles aproximados)",
+        requests=req,
+        failures=fail,
+        error_rate=round(fail / weight, 4),
+        duration_ms=max(m.duration_ms for m in rest),
+        throughput_rps=round(sum(m.throughput_rps for m in rest), 3),
+        latency_ms=Latency(p50=avg("p50"), p90=avg("p90"), p95=avg("p95"), p99=avg("p99")),
+    )
+
+def _keep(summary: Summary, comparison: Optional[RunComparison], ranked: List[MethodMetrics],
+          k: int) -> Tuple[Summary, Optional[RunComparison]]:
+    kept, rest = ranked[:k], ranked[k:]
+    by_method = sorted(kept, key=lambda m: m.name) + ([_collapse(rest)] if rest else [])
+    compact = summary.model_copy(update={"by_method": by_method})
+    if comparison is not None and rest:
+        # Las labels que desaparecieron no tienen fila en el summary: su tope es propio, no K.
+        names = {m.name for m in kept}
+        comparison = comparison.model_copy(update={
+            "by_method": [c for c in comparison.by_method if c.name in names],
+            "added_labels": [n for n in comparison.added_labels if n in names],
+            "removed_labels": comparison.removed_labels[:env_int("PROMPT_REMOVED_LABELS", 50, minimum=0)],
+        })
+    return compact, comparison
+
+def compact_for_prompt(summary: Summary, comparison: Optional[RunComparison] = None
+                       ) -> Tuple[Summary, Optional[RunComparison], Dict[str, Any]]:
+    """
+    Ajusta el summary al presupuesto PROMPT_TOKEN_BUDGET: conserva completas hasta PROMPT_TOP_K
+    labels de mayor impacto y colapsa el resto en una fila "otras". Si aun así no cabe, busca
+    (bisección) el mayor K que entra. Al compactar, la comparación lista a lo sumo
+    PROMPT_REMOVED_LABELS labels desaparecidas. Devuelve el summary/comparación a enviar y el
+    detalle de lo recortado para la metadata; over_budget indica que ni con K=0 entra.
+    """
+    budget = env_int("PROMPT_TOKEN_BUDGET", 6000)
+    top_k = env_int("PROMPT_TOP_K", 40, minimum=0)
+    before = _prompt_tokens(summary, comparison)
+    info: Dict[str, Any] = {"budget": budget, "tokens_before": before, "tokens_after": before,
+                            "tokenizer": "tiktoken" if _encoder() is not None else "chars/4",
+                            "kept_labels": len(summary.by_method), "dropped_labels": 0, "dropped": [],
+                            "over_budget": False}
+    if before <= budget and len(summary.by_method) <= top_k:
+        return summary, comparison, info
+
+    scores = impact_scores(summary, comparison)
+    ranked = sorted(summary.by_method, key=lambda m: (-scores[m.name], m.name))
+    lo, hi = 0, min(top_k, len(ranked))
+    best = _keep(summary, comparison, ranked, lo)
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        candidate = _keep(summary, comparison, ranked, mid)
+        if _prompt_tokens(*candidate) <= budget:
+            best, lo = candidate, mid + 1
+        else:
+            hi = mid - 1
+    kept = max(lo - 1, 0)
+
+    dropped = [m.name for m in ranked[kept:]]
+    limit = env_int("PROMPT_DROPPED_LIST", 100)
+    after = _prompt_tokens(*best)
+    info.update({"tokens_after": after, "kept_labels": kept, "over_budget": after > budget,
+                 "dropped_labels": len(dropped), "dropped": dropped[:limit]})
+    return best[0], best[1], info
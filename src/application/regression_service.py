@@ -0,0 +1,147 @@
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+from src.core.env import env_float
+from src.core.errors import ProblemError
+from src.core.sketch import QuantileSketch, mann_whitney
+from src.core.timeseries import TimeSeries
+from src.domain.summary_contract import Summary, LabelComparison, RunComparison
+from src.infrastructure.runs.store import get_run_store
+
+OVERALL = "(overall)"
+
+@dataclass
+class RunRequest:
+    """Dónde guardar la corrida y contra qué compararla."""
+    service: str
+    tag: Optional[str] = None
+    baseline: str = "auto"  # auto | none | llave de una corrida
+    baseline_tag: Optional[str] = None
+
+def sketches_from_series(series: Optional[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Sketches por label (y overall) a partir de la serie compacta; vacío si el formato no trae muestras."""
+    if not series:
+        return {}
+    per_label = TimeSeries.from_dict(series).label_sketches()
+    total = QuantileSketch(series["relative_accuracy"], exact_limit=0)
+    for sk in per_label.values():
+        total.merge(sk)
+    out = {name: sk.to_dict() for name, sk in per_label.items()}
+    out[OVERALL] = total.to_dict()
+    return out
+
+def _delta_pct(new: float, old: float) -> float:
+    if old == 0:
+        return 0.0 if new == 0 else 100.0
+    return round(100.0 * (new - old) / old, 2)
+
+def _compare_label(name: str, cur: Dict[str, Any], base: Dict[str, Any],
+                   cur_sk: Optional[Dict[str, Any]], base_sk: Optional[Dict[str, Any]]) -> LabelComparison:
+    """
+    Veredicto por label. Latencia: p95 o p99 se mueve más de COMPARE_MIN_DELTA_PCT y
+    Mann-Whitney sobre los sketches de ambos lados lo confirma con p < COMPARE_ALPHA. Sin
+    sketches (exports de k6, series desactivadas) no hay prueba: un cambio así queda como
+    "changed" y no cuenta como regresión ni mejora. Errores: la tasa sube más de
+    COMPARE_ERROR_RATE_DELTA (absoluto).
+    """
+    p95d = _delta_pct(cur["latency_ms"]["p95"], base["latency_ms"]["p95"])
+    p99d = _delta_pct(cur["latency_ms"]["p99"], base["latency_ms"]["p99"])
+    test = None
+    if cur_sk and base_sk:
+        test = mann_whitney(QuantileSketch.from_dict(cur_sk), QuantileSketch.from_dict(base_sk))
+    p_value, prob_slower = test if test is not None else (None, None)
+
+    min_delta = env_float("COMPARE_MIN_DELTA_PCT", 5.0)
+    slower, faster = max(p95d, p99d) > min_delta, max(p95d, p99d) < -min_delta
+    significant = p_value is not None and p_value < env_float("COMPARE_ALPHA", 0.01)
+    error_delta = cur["error_rate"] - base["error_rate"]
+    verdict = "unchanged"
+    if error_delta > env_float("COMPARE_ERROR_RATE_DELTA", 0.01):
+        verdict = "regression"
+    elif p_value is None and (slower or faster):
+        verdict = "changed"
+    elif significant and slower and prob_slower > 0.5:
+        verdict = "regression"
+    elif significant and faster and prob_slower < 0.5:
+        verdict = "improvement"
+
+    return LabelComparison(
+        name=name,
+        requests=cur["requests"],
+        baseline_requests=base["requests"],
+        p95_ms=cur["latency_ms"]["p95"],
+        baseline_p95_ms=base["latency_ms"]["p95"],
+        p95_delta_pct=p95d,
+        p99_ms=cur["latency_ms"]["p99"],
+        baseline_p99_ms=base["latency_ms"]["p99"],
+        p99_delta_pct=p99d,
+        error_rate=cur["error_rate"],
+        baseline_error_rate=base["error_rate"],
+        p_value=p_value,
+        prob_slower=round(prob_slower, 4) if prob_slower is not None else None,
+        verdict=verdict,
+    )
+
+def _not_found(key: str) -> ProblemError:
+    return ProblemError(404, "Corrida inexistente", "No hay una corrida guardada con esa llave.", {"run_key": key})
+
+def compare_runs(run_key: str, baseline_key: str) -> RunComparison:
+    store = get_run_store()
+    run, base = store.get(run_key), store.get(baseline_key)
+    if run is None:
+        raise _not_found(run_key)
+    if base is None:
+        raise _not_found(baseline_key)
+    cur_sk, base_sk = store.sketches(run_key), store.sketches(baseline_key)
+    cur_methods = {m["name"]: m for m in run["summary"]["by_method"]}
+    base_methods = {m["name"]: m for m in base["summary"]["by_method"]}
+
+    overall = _compare_label(OVERALL, run["summary"]["overall"], base["summary"]["overall"],
+                             cur_sk.get(OVERALL), base_sk.get(OVERALL))
+    by_method = [_compare_label(name, cur_methods[name], base_methods[name], cur_sk.get(name), base_sk.get(name))
+                 for name in sorted(cur_methods.keys() & base_methods.keys())]
+    return RunComparison(
+        run_key=run_key,
+        baseline_key=baseline_key,
+        baseline_run_id=base["run_id"],
+        baseline_tag=base["tag"],
+        overall=overall,
+        by_method=by_method,
+        added_labels=sorted(cur_methods.keys() - base_methods.keys()),
+        removed_labels=sorted(base_methods.keys() - cur_methods.keys()),
+        regressions=sum(1 for c in by_method if c.verdict == "regression"),
+        improvements=sum(1 for c in by_method if c.verdict == "improvement"),
+    )
+
+def resolve_baseline(run_key: str, baseline: str = "auto", baseline_tag: Optional[str] = None) -> Optional[str]:
+    """Llave de la línea base: explícita, la corrida previa del mismo servicio (auto) o ninguna."""
+    if baseline == "none":
+        return None
+    store = get_run_store()
+    if baseline != "auto":
+        if store.get(baseline) is None:
+            raise _not_found(baseline)
+        return baseline
+    run = store.get(run_key)
+    if run is None:
+        raise _not_found(run_key)
+    # La línea base es anterior a la corrida: comparar contra una posterior invierte el veredicto.
+    return store.latest(run["service"], baseline_tag, exclude=run_key, before=run["created_at"])
+
+def record_and_compare(req: RunRequest, summary: Summary, flags: dict, series: Optional[dict],
+                       analysis_id: Optional[str]) -> Tuple[str, Optional[RunComparison]]:
+    """Guarda la corrida y la compara con su línea base (si existe)."""
+    store = get_run_store()
+    baseline_key = None
+    if req.baseline == "auto":
+        baseline_key = store.latest(req.service, req.baseline_tag)
+    elif req.baseline != "none":
+        if store.get(req.baseline) is None:
+            raise _not_found(req.baseline)
+        baseline_key = req.baseline
+    run_key = uuid.uuid4().hex
+    store.add(run_key, req.service, req.tag, summary.model_dump(mode="json"), flags, analysis_id,
+              sketches_from_series(series))
+    if baseline_key is None:
+        return run_key, None
+    return run_key, compare_runs(run_key, baseline_key)
@@ -1,16 +1,136 @@
-import json
+import mmap
+from typing import List, Optional, Tuple
+from src.core.io_utils import Source, open_mapped
+from src.core.timeseries import TimeSeries
+from src.core.metrics import stage, stage_timer
 from src.services.k6_summary import build_summary_from_k6
-from src.services.jmeter_summary import build_summary_from_jmeter
+from src.services.k6_points_summary import build_summary_from_k6_points, is_points_line
+from src.services.jmeter_summary import _backend, build_summary_from_jmeter
+from src.services.jmeter_parallel import finish_partials, plan_ranges
 from src.domain.summary_contract import Summary
 
-def detect_and_build_summary(file_bytes: bytes, filename: str, content_type: str) -> tuple[Summary, dict]:
-    # JSON → K6
-    if content_type == "application/json" or filename.lower().endswith(".json"):
-        try:
-            json.loads(file_bytes.decode("utf-8", errors="strict"))
-        except Exception:
-            raise ValueError("JSON ilegible o corrupto.")
-        return build_summary_from_k6(file_bytes)
-
-    # CSV → JMeter
-    return build_summary_from_jmeter(file_bytes)
\ No newline at end of file
+NDJSON_TYPES = ("application/x-ndjson", "application/jsonl", "application/json-seq")
+NDJSON_EXTENSIONS = (".ndjson", ".jsonl")
+XML_TYPES = ("application/xml", "text/xml")
+
+# Lo que se mira del comienzo del archivo para decidir el formato.
+SNIFF_BYTES = 8192
+CSV_DELIMITERS = ",;\t|"
+JMETER_COLUMNS = frozenset(("timeStamp", "label", "elapsed", "success"))
+
+def _head(source: Source, size: int = SNIFF_BYTES) -> bytes:
+    if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        return bytes(source[:size])
+    pos = source.tell()
+    head = source.read(size)
+    source.seek(pos)
+    return head
+
+def _csv_delimiter(header: str) -> str:
+    """Separador de la cabecera CSV: el que deja las columnas de JMeter; si no, el más frecuente."""
+    for d in CSV_DELIMITERS:
+        if JMETER_COLUMNS.issubset(header.split(d)):
+            return d
+    counts = {d: header.count(d) for d in CSV_DELIMITERS}
+    best = max(counts, key=counts.get)
+    return best if counts[best] else ","
+
+def sniff_format(source: Source, filename: str, content_type: str) -> Tuple[str, str]:
+    """
+    (formato, separador CSV) mirando los primeros SNIFF_BYTES del contenido; el
+    content-type y la extensión solo desempatan. Formatos: k6_points (NDJSON de
+    `--out json`), k6_summary (`--summary-export`), jmeter_xml (JTL en XML) o jmeter (CSV).
+    """
+    text = _head(source).lstrip(b"\xef\xbb\xbf \t\r\n")
+    name = filename.lower()
+    first = text.split(b"\n", 1)[0]
+    if text.startswith(b"{"):
+        if content_type in NDJSON_TYPES or name.endswith(NDJSON_EXTENSIONS) or is_points_line(first):
+            return "k6_points", ","
+        return "k6_summary", ","
+    if text.startswith(b"<"):
+        return "jmeter_xml", ","
+    if not text:
+        raise ValueError("Archivo vacío.")
+    if content_type == "application/json" or content_type in NDJSON_TYPES or content_type in XML_TYPES:
+        raise ValueError(f"El contenido no es {'XML' if content_type in XML_TYPES else 'JSON'}: "
+                         "no empieza con '{' ni con '<'.")
+    if b"\x00" in text:
+        raise ValueError("El archivo no parece texto (CSV, JSON o XML).")
+    return "jmeter", _csv_delimiter(first.decode("utf-8", errors="replace").rstrip("\r"))
+
+def detect_format(source: Source, filename: str, content_type: str) -> str:
+    """k6_points | k6_summary | jmeter_xml | jmeter (ver sniff_format)."""
+    return sniff_format(source, filename, content_type)[0]
+
+def detect_and_build_summary(source: Source, filename: str, content_type: str,
+                             series: Optional[TimeSeries] = None) -> tuple[Summary, dict]:
+    """
+    `series` recibe las ventanas de tiempo cuando el formato trae muestras crudas.
+    Cada formato se decodifica una sola vez, directo desde `source`.
+    """
+    with stage("detect"):
+        kind, delimiter = sniff_format(source, filename, content_type)
+
+    if kind == "k6_points":
+        return build_summary_from_k6_points(source, series)
+
+    if kind == "k6_summary":
+        return build_summary_from_k6(source)
+
+    if kind == "jmeter_xml":
+        from src.services.jmeter_xml import build_summary_from_jmeter_xml  # poco frecuente: se carga al usarse
+        return build_summary_from_jmeter_xml(source, series)
+
+    # JMeter: se consume el stream por bloques, sin cargarlo completo
+    return build_summary_from_jmeter(source, series=series, delimiter=delimiter)
+
+def build_summary_with_series(source: Source, filename: str, content_type: str) -> tuple[Summary, dict, Optional[dict]]:
+    """
+    Summary + ventanas de tiempo en forma compacta (None si el formato no las trae).
+    Los tiempos por etapa viajan en flags["stage_ms"]: el proceso principal los retira
+    antes de cachear (ver analyze_service.build_summary).
+    """
+    with stage_timer(observe=False, reuse=False) as timer:
+        series = TimeSeries()
+        summary, flags = detect_and_build_summary(source, filename, content_type,
+                                                 series if series.enabled else None)
+        if not series.labels:
+            flags["stage_ms"] = timer.ms
+            return summary, flags, None
+        flags["timeseries_window_ms"] = series.window_ms
+        with stage("aggregate"):
+            data = series.to_dict()
+    flags["stage_ms"] = timer.ms
+    return summary, flags, data
+
+def build_summary_from_path(path: str, filename: str, content_type: str) -> tuple[Summary, dict, Optional[dict]]:
+    """
+    Punto de entrada para workers de proceso: recibe la ruta del upload, no sus bytes.
+    El archivo se mapea en memoria y los parsers leen las páginas directamente del mapeo.
+    """
+    with open_mapped(path) as mapped:
+        return build_summary_with_series(mapped, filename, content_type)
+
+def plan_parallel_jmeter(path: str, filename: str, content_type: str,
+                         workers: int) -> Optional[Tuple[List[str], List[Tuple[int, int]], str]]:
+    """
+    (cabecera, rangos, separador) si el archivo es un CSV de JMeter que va por el backend
+    python, para repartirlo por rangos de bytes (ver jmeter_parallel); si no, None.
+    """
+    if _backend() != "python":
+        return None
+    with open_mapped(path) as mapped:
+        kind, delimiter = sniff_format(mapped, filename, content_type)
+    if kind != "jmeter":
+        return None
+    headers, ranges = plan_ranges(path, workers, delimiter)
+    return headers, ranges, delimiter
+
+def finish_parallel_jmeter(partials: list, series: Optional[TimeSeries]) -> tuple[Summary, dict, Optional[dict]]:
+    """Summary + ventanas (como build_summary_with_series) a partir de los parciales por rango."""
+    summary, flags = finish_partials(partials, series)
+    if series is None or not series.labels:
+        return summary, flags, None
+    flags["timeseries_window_ms"] = series.window_ms
+    return summary, flags, series.to_dict()
@@ -0,0 +1,80 @@
+import asyncio, os, time
+from typing import Dict, List
+from src.core import metrics
+from src.infrastructure.concurrency import parse_pool
+
+WARMUP_STEPS = ("ai", "prompts", "parsers", "pool")
+
+WARMUP_SECONDS = metrics.gauge("informai_warmup_seconds", "Duración de cada paso del precalentamiento al arrancar.",
+                               ("step",))
+
+def warmup_steps() -> List[str]:
+    """
+    WARMUP: none (por defecto: todo se carga con el primer request que lo usa) | all |
+    lista separada por comas de ai, prompts, parsers, pool.
+    """
+    raw = os.getenv("WARMUP", "none").strip().lower()
+    if raw in ("", "none", "false", "0"):
+        return []
+    if raw in ("all", "true", "1"):
+        return list(WARMUP_STEPS)
+    return [s for s in (p.strip() for p in raw.split(",")) if s in WARMUP_STEPS]
+
+def _warm_ai() -> None:
+    # SDK de openai + pool HTTP keep-alive + cliente Azure si hay configuración.
+    from src.infrastructure.ai.client_registry import registry
+    from src.infrastructure.ai import azure_openai_service
+
+    registry.startup()
+    try:
+        azure_openai_service._client_or_raise()
+    except RuntimeError:
+        pass  # sin Azure configurado: basta con el pool HTTP
+
+def _warm_prompts() -> None:
+    # Prompt de sistema (en caché) y tokenizador local, si está instalado.
+    from src.application.ai_prompt_builder import build_system_prompt
+    from src.application.prompt_compaction import count_tokens
+
+    count_tokens(build_system_prompt())
+
+def _warm_parsers() -> None:
+    # Backend columnar si JMETER_BACKEND lo pide y decodificador JSON elegido.
+    from src.core import fast_json
+    from src.services.jmeter_summary import _backend
+
+    fast_json.decoder()
+    if _backend() in ("numpy", "auto"):
+        try:
+            import src.services.jmeter_columnar  # noqa: F401
+        except ImportError:
+            pass
+
+def _noop() -> None:
+    return None
+
+async def _warm_pool() -> None:
+    # Un trabajo vacío por worker: el pool de procesos arranca sus workers ahora y no en el primer upload.
+    pool = parse_pool()
+    await asyncio.gather(*(pool.run(_noop, wait=True) for _ in range(pool.max_workers)))
+
+async def warm_up() -> Dict[str, float]:
+    """
+    Paga al arrancar lo que si no pagaría el primer request (imports, clientes, workers).
+    Un paso que falla no impide arrancar. Devuelve los ms por paso (también en /metrics).
+    """
+    sync_steps = {"ai": _warm_ai, "prompts": _warm_prompts, "parsers": _warm_parsers}
+    timings: Dict[str, float] = {}
+    for step in warmup_steps():
+        t0 = time.perf_counter()
+        try:
+            if step == "pool":
+                await _warm_pool()
+            else:
+                await asyncio.to_thread(sync_steps[step])
+        except Exception:
+            continue
+        elapsed = time.perf_counter() - t0
+        WARMUP_SECONDS.set(elapsed, step)
+        timings[step] = round(elapsed * 1000.0, 2)
+    return timings
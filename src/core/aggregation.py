@@ -0,0 +1,73 @@
+from src.domain.summary_contract import MethodMetrics, Latency
+from src.core.sketch import QuantileSketch
+
+class LabelAccumulator:
+    """Acumulador incremental por etiqueta: conteos, extremos de tiempo y sketch de latencias."""
+
+    __slots__ = ("requests", "failures", "ts_min", "ts_max", "latencies")
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.failures = 0
+        self.ts_min = 0
+        self.ts_max = 0
+        self.latencies = QuantileSketch()
+
+    def add(self, ts: int, elapsed: float, ok: bool) -> None:
+        if self.requests == 0:
+            self.ts_min = self.ts_max = ts
+        elif ts < self.ts_min:
+            self.ts_min = ts
+        elif ts > self.ts_max:
+            self.ts_max = ts
+        self.requests += 1
+        if not ok:
+            self.failures += 1
+        self.latencies.add(elapsed)
+
+    def add_block(self, requests: int, failures: int, ts_min: int, ts_max: int) -> None:
+        """Suma un grupo ya agregado (backends vectorizados); sus latencias van con latencies.add_block."""
+        if requests == 0:
+            return
+        if self.requests == 0:
+            self.ts_min, self.ts_max = ts_min, ts_max
+        else:
+            self.ts_min = min(self.ts_min, ts_min)
+            self.ts_max = max(self.ts_max, ts_max)
+        self.requests += requests
+        self.failures += failures
+
+    def merge(self, other: "LabelAccumulator") -> "LabelAccumulator":
+        if other.requests == 0:
+            self.failures += other.failures  # fallos sin muestras de latencia (k6: solo http_req_failed)
+            return self
+        if self.requests == 0:
+            self.ts_min, self.ts_max = other.ts_min, other.ts_max
+        else:
+            self.ts_min = min(self.ts_min, other.ts_min)
+            self.ts_max = max(self.ts_max, other.ts_max)
+        self.requests += other.requests
+        self.failures += other.failures
+        self.latencies.merge(other.latencies)
+        return self
+
+    @property
+    def approximated(self) -> bool:
+        return not self.latencies.is_exact
+
+    @property
+    def duration_ms(self) -> int:
+        return self.ts_max - self.ts_min if self.requests else 0
+
+    def to_metrics(self, name: str, cls: type[MethodMetrics] = MethodMetrics) -> MethodMetrics:
+        dur = self.duration_ms
+        p50, p90, p95, p99 = self.latencies.quantiles()
+        return cls(
+            name=name,
+            requests=self.requests,
+            failures=self.failures,
+            error_rate=round(self.failures / max(self.requests, 1), 4),
+            duration_ms=dur,
+            throughput_rps=(self.requests / (dur/1000.0)) if dur else 0.0,
+            latency_ms=Latency(p50=p50, p90=p90, p95=p95, p99=p99),
+        )
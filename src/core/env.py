@@ -0,0 +1,18 @@
+import os
+from typing import Optional
+
+def env_int(name: str, default: int, minimum: Optional[int] = None) -> int:
+    """Entero de la variable `name`; `default` si falta o no es un número. Con `minimum`, acotado por abajo."""
+    try:
+        value = int(os.getenv(name, str(default)))
+    except ValueError:
+        value = default
+    return value if minimum is None else max(value, minimum)
+
+def env_float(name: str, default: float, minimum: Optional[float] = None) -> float:
+    """Como env_int, para valores decimales."""
+    try:
+        value = float(os.getenv(name, str(default)))
+    except ValueError:
+        value = default
+    return value if minimum is None else max(value, minimum)
@@ -1,11 +1,31 @@
 from fastapi.responses import JSONResponse
 
-def problem(status: int, title: str, detail: str, extra: dict | None = None):
-    payload = {
+def problem_payload(status: int, title: str, detail: str, extra: dict | None = None) -> dict:
+    return {
         "type": "about:blank",
         "title": title,
         "status": status,
         "detail": detail,
         "extra": extra or {}
     }
-    return JSONResponse(status_code=status, content=payload)
\ No newline at end of file
+
+def problem(status: int, title: str, detail: str, extra: dict | None = None, headers: dict | None = None):
+    payload = problem_payload(status, title, detail, extra)
+    return JSONResponse(status_code=status, content=payload, headers=headers)
+
+class ProblemError(Exception):
+    """Error de negocio que la capa HTTP traduce a una respuesta problem+json."""
+
+    def __init__(self, status: int, title: str, detail: str, extra: dict | None = None, headers: dict | None = None):
+        super().__init__(detail)
+        self.status = status
+        self.title = title
+        self.detail = detail
+        self.extra = extra or {}
+        self.headers = headers
+
+    def payload(self) -> dict:
+        return problem_payload(self.status, self.title, self.detail, self.extra)
+
+    def response(self) -> JSONResponse:
+        return problem(self.status, self.title, self.detail, self.extra, self.headers)
@@ -0,0 +1,53 @@
+import json, mmap, os
+from functools import lru_cache
+from typing import Any, Callable, Tuple
+
+@lru_cache(maxsize=4)
+def _decoder(name: str) -> Tuple[Callable[[Any], Any], str]:
+    if name != "json":
+        try:
+            import orjson
+        except ImportError:
+            if name == "orjson":
+                raise RuntimeError("JSON_DECODER=orjson requiere el paquete 'orjson' instalado.")
+        else:
+            return orjson.loads, "orjson"
+    return json.loads, "json"
+
+def decoder() -> Tuple[Callable[[Any], Any], str]:
+    """
+    (loads, nombre) según JSON_DECODER: auto (orjson si está instalado) | orjson | json.
+    Para lazos calientes (una línea por llamada): ambos aceptan bytes y str.
+    """
+    return _decoder(os.getenv("JSON_DECODER", "auto").strip().lower())
+
+def loads(data: Any) -> Any:
+    """Decodifica un documento completo; acepta bytes, str, memoryview o un mmap sin copiarlo con orjson."""
+    fn, name = decoder()
+    if isinstance(data, (memoryview, mmap.mmap)):
+        data = memoryview(data) if name == "orjson" else bytes(data)
+    return fn(data)
+
+@lru_cache(maxsize=4)
+def _encoder(name: str) -> Callable[[Any], bytes]:
+    if name != "json":
+        try:
+            import orjson
+        except ImportError:
+            if name == "orjson":
+                raise RuntimeError("JSON_ENCODER=orjson requiere el paquete 'orjson' instalado.")
+        else:
+            return lambda obj: orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return lambda obj: json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def dumps(obj: Any) -> bytes:
+    """JSON compacto en UTF-8 según JSON_ENCODER: auto (orjson si está instalado) | orjson | json."""
+    return _encoder(os.getenv("JSON_ENCODER", "auto").strip().lower())(obj)
+
+def model_json(model: Any) -> bytes:
+    """
+    JSON compacto de un modelo pydantic (model_dump_json, sin pasar por dict ni revalidar).
+    No se memoriza por instancia: los modelos son mutables y un cambio en el lugar dejaría
+    bytes viejos.
+    """
+    return model.model_dump_json().encode("utf-8")
@@ -0,0 +1,70 @@
+import io, mmap
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Union
+
+# Entradas aceptadas por los parsers: bytes en memoria, un archivo mapeado o un stream binario.
+Source = Union[bytes, bytearray, memoryview, mmap.mmap, BinaryIO]
+
+class MappedReader(io.RawIOBase):
+    """Lector secuencial sobre un mmap (o una vista de él): copia directo al buffer del consumidor."""
+
+    def __init__(self, mapped: Union[mmap.mmap, memoryview]):
+        self._view = memoryview(mapped)
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._view)}[whence]
+        self._pos = min(max(base + offset, 0), len(self._view))
+        return self._pos
+
+    def readinto(self, b) -> int:
+        n = min(len(b), len(self._view) - self._pos)
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def close(self) -> None:
+        # Suelta la vista para que el mmap pueda cerrarse.
+        self._view.release()
+        super().close()
+
+def as_stream(source: Source) -> BinaryIO:
+    """Stream binario sobre cualquier Source, sin copiar el contenido completo."""
+    if isinstance(source, (mmap.mmap, memoryview)):
+        return io.BufferedReader(MappedReader(source), buffer_size=1024 * 1024)
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    return source
+
+def owns_stream(source: Source) -> bool:
+    """True si as_stream() crea un stream propio (que podemos cerrar) en vez de usar el del llamador."""
+    return isinstance(source, (bytes, bytearray, memoryview, mmap.mmap))
+
+@contextmanager
+def open_mapped(path: str) -> Iterator[Union[mmap.mmap, bytes]]:
+    """
+    Mapea el archivo en memoria (solo lectura). Las páginas las carga el SO bajo demanda,
+    así que el RSS depende de lo que el parser retiene, no del tamaño del archivo.
+    """
+    with open(path, "rb") as fh:
+        try:
+            mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Archivo vacío: mmap no admite longitud 0.
+            yield b""
+            return
+        try:
+            if hasattr(mapped, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            yield mapped
+        finally:
+            mapped.close()
@@ -0,0 +1,76 @@
+import json
+from typing import Any, List, Optional, Tuple
+
+class ObjectStreamParser:
+    """
+    Parser incremental de un objeto JSON que llega por pedazos (deltas de un stream).
+
+    feed() devuelve los pares (clave, valor) del nivel superior que quedaron completos
+    con el texto recibido hasta ahora, en orden de aparición. Ignora lo que venga antes
+    de la primera llave (p. ej. una cerca ```json). No valida el objeto completo: el que
+    consume el stream debe parsear el texto final para eso.
+    """
+
+    __slots__ = ("text", "_pos", "_depth", "_in_str", "_esc", "_key_start", "_key", "_val_start", "done")
+
+    def __init__(self) -> None:
+        self.text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_str = False
+        self._esc = False
+        self._key_start = -1
+        self._key: Optional[str] = None
+        self._val_start = -1
+        self.done = False
+
+    def _close_value(self, end: int, out: List[Tuple[str, Any]]) -> None:
+        if self._key is not None:
+            try:
+                out.append((self._key, json.loads(self.text[self._val_start:end])))
+            except ValueError:
+                pass
+        self._key = None
+        self._key_start = end + 1
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        out: List[Tuple[str, Any]] = []
+        self.text += chunk
+        text = self.text
+        for i in range(self._pos, len(text)):
+            if self.done:
+                break
+            c = text[i]
+            if self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif c == "\\":
+                    self._esc = True
+                elif c == '"':
+                    self._in_str = False
+                continue
+            if self._depth == 0:
+                if c == "{":
+                    self._depth = 1
+                    self._key_start = i + 1
+                continue
+            if c == '"':
+                self._in_str = True
+            elif c in "{[":
+                self._depth += 1
+            elif c in "}]":
+                if self._depth == 1:
+                    self._close_value(i, out)
+                    self.done = True
+                self._depth -= 1
+            elif self._depth == 1:
+                if c == ":" and self._key is None:
+                    try:
+                        self._key = json.loads(text[self._key_start:i])
+                    except ValueError:
+                        self._key = None
+                    self._val_start = i + 1
+                elif c == ",":
+                    self._close_value(i, out)
+        self._pos = len(text)
+        return out
@@ -0,0 +1,97 @@
+import json, os, re
+from functools import lru_cache
+from typing import Dict, Optional, Pattern, Set, Tuple
+from src.core.env import env_int
+
+# Bucket único para las labels que llegan después de alcanzar MAX_LABELS.
+OVERFLOW_LABEL = "(otras operaciones)"
+
+# Colapso de identificadores en segmentos de ruta o valores de query string.
+_ID_RULES = (
+    (r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}", "{uuid}"),
+    (r"(?<=[/=])(?=[0-9a-fA-F]*\d)[0-9a-fA-F]{16,}(?=[/?#&;,]|$)", "{hex}"),
+    (r"(?<=[/=])\d+(?=[/?#&;,]|$)", "{id}"),
+)
+
+# Más allá de esto no se memoriza (labels crudas casi todas distintas): se recalcula.
+_MEMO_LIMIT = 65536
+
+def _max_labels() -> int:
+    return env_int("MAX_LABELS", 1000, minimum=1)
+
+def _collapse_ids() -> bool:
+    return os.getenv("LABEL_COLLAPSE_IDS", "true").strip().lower() in ("1", "true", "yes", "y")
+
+@lru_cache(maxsize=8)
+def compile_rules(rules_json: str, rules_file: str, collapse_ids: bool) -> Tuple[Tuple[Pattern, str], ...]:
+    """
+    Reglas [patrón, reemplazo] de LABEL_RULES (JSON) y/o LABEL_RULES_FILE, en ese orden,
+    seguidas del colapso de IDs. Se compilan una vez por proceso y configuración.
+    El reemplazo admite grupos de re.sub, p. ej. ["^(GET|POST) /orders/.*", "\\\\1 /orders/{*}"].
+    """
+    texts = [rules_json] if rules_json else []
+    if rules_file:
+        with open(rules_file, "r", encoding="utf-8") as fh:
+            texts.append(fh.read())
+    rules = []
+    for text in texts:
+        try:
+            rules += [(re.compile(pattern), repl) for pattern, repl in json.loads(text)]
+        except (ValueError, TypeError, re.error) as e:
+            raise RuntimeError(f"Reglas de normalización de labels inválidas: {e}")
+    if collapse_ids:
+        rules += [(re.compile(pattern), repl) for pattern, repl in _ID_RULES]
+    return tuple(rules)
+
+class LabelNormalizer:
+    """
+    Normaliza labels durante la agregación y acota cuántas distintas se conservan.
+
+    Cada label cruda pasa por las reglas compiladas; si la label resultante es nueva y ya
+    hay MAX_LABELS, cae en OVERFLOW_LABEL. El resultado final se memoriza por label cruda,
+    así la ruta caliente es un solo lookup en un dict. Una instancia por parseo.
+    """
+
+    __slots__ = ("rules", "max_labels", "capped", "_memo", "_seen")
+
+    def __init__(self, rules: Optional[Tuple[Tuple[Pattern, str], ...]] = None,
+                 max_labels: Optional[int] = None) -> None:
+        if rules is None:
+            rules = compile_rules(os.getenv("LABEL_RULES", ""), os.getenv("LABEL_RULES_FILE", ""), _collapse_ids())
+        self.rules = rules
+        self.max_labels = max_labels if max_labels is not None else _max_labels()
+        self.capped = False
+        self._memo: Dict[str, str] = {}
+        self._seen: Set[str] = set()
+
+    def normalize(self, raw: str) -> str:
+        label = raw
+        for pattern, repl in self.rules:
+            label = pattern.sub(repl, label)
+        return label
+
+    def __call__(self, raw: str) -> str:
+        label = self._memo.get(raw)
+        if label is not None:
+            return label
+        label = self.normalize(raw)
+        if label not in self._seen:
+            if len(self._seen) < self.max_labels:
+                self._seen.add(label)
+            else:
+                self.capped = True
+                label = OVERFLOW_LABEL
+        if len(self._memo) < _MEMO_LIMIT:
+            self._memo[raw] = label
+        return label
+
+    def lookup(self, raw: str) -> str:
+        """
+        Como llamar a la instancia, pero sin admitir labels nuevas: si la label normalizada
+        no ocupa ya un lugar, devuelve OVERFLOW_LABEL sin gastar cupo de MAX_LABELS.
+        """
+        label = self._memo.get(raw)
+        if label is not None:
+            return label
+        label = self.normalize(raw)
+        return label if label in self._seen else OVERFLOW_LABEL
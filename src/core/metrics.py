@@ -0,0 +1,227 @@
+import threading, time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Límites de los histogramas de etapas, en segundos (de 1 ms a 2 min).
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels_text(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _num(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(int(v)) if float(v).is_integer() else repr(float(v))
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [f"{self.name}{_labels_text(self.labelnames, k)} {_num(v)}" for k, v in items]
+
+class Gauge(_Metric):
+    """Valor instantáneo; con `callback` se lee al exponer (p. ej. trabajos pendientes de un pool)."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                 callback: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {} if labelnames else {(): 0.0}
+        self.callback = callback
+
+    def inc(self, amount: float = 1.0, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, *labels: str) -> None:
+        self.inc(-amount, *labels)
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        if self.callback is not None:
+            values.update(self.callback())
+        return self._header() + [f"{self.name}{_labels_text(self.labelnames, k)} {_num(v)}"
+                                 for k, v in sorted(values.items())]
+
+class Histogram(_Metric):
+    """Histograma acumulativo con límites fijos: observe() es un bisect y tres sumas bajo un lock."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = STAGE_BUCKETS) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [conteos por límite (+Inf al final), suma, total]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, *labels: str) -> int:
+        entry = self._values.get(labels)
+        return entry[2] if entry else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._values.items())
+        out = self._header()
+        for labels, (counts, total, n) in items:
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                le = 'le="' + _num(bound) + '"'
+                out.append(f"{self.name}_bucket{_labels_text(self.labelnames, labels, le)} {cumulative}")
+            out.append(f"{self.name}_sum{_labels_text(self.labelnames, labels)} {_num(total)}")
+            out.append(f"{self.name}_count{_labels_text(self.labelnames, labels)} {n}")
+        return out
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.setdefault(metric.name, metric)
+        return self._metrics[metric.name]
+
+    def render(self) -> str:
+        """Formato de texto de Prometheus (exposición 0.0.4)."""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+def counter(name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, help_text, labelnames))
+
+def gauge(name: str, help_text: str, labelnames: Tuple[str, ...] = (), callback=None) -> Gauge:
+    return REGISTRY.register(Gauge(name, help_text, labelnames, callback))
+
+def histogram(name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+              buckets: Tuple[float, ...] = STAGE_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, help_text, labelnames, buckets))
+
+STAGE_SECONDS = histogram("informai_stage_seconds", "Duración de cada etapa del análisis.", ("stage",))
+
+# ------------------------------ Etapas por request ---------------------------- #
+
+class StageTimer:
+    """
+    Tiempos por etapa de un análisis, en ms. Con observe=True cada etapa además alimenta
+    el histograma global; los workers de parseo usan observe=False y devuelven sus tiempos
+    para que el proceso principal los incorpore con merge().
+    """
+
+    __slots__ = ("ms", "observe")
+
+    def __init__(self, observe: bool = True) -> None:
+        self.ms: Dict[str, float] = {}
+        self.observe = observe
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.ms[stage] = round(self.ms.get(stage, 0.0) + seconds * 1000.0, 3)
+        if self.observe:
+            STAGE_SECONDS.observe(seconds, stage)
+
+    def merge(self, stage_ms: Dict[str, float]) -> None:
+        for stage, ms in stage_ms.items():
+            self.add(stage, ms / 1000.0)
+
+_current: ContextVar[Optional[StageTimer]] = ContextVar("stage_timer", default=None)
+
+def current_timer() -> Optional[StageTimer]:
+    return _current.get()
+
+@contextmanager
+def stage_timer(observe: bool = True, reuse: bool = True) -> Iterator[StageTimer]:
+    """
+    Deja un StageTimer como actual en este contexto. Con reuse=True y uno ya activo
+    (p. ej. el de la ruta que recibió el upload) se reutiliza ése.
+    """
+    timer = _current.get() if reuse else None
+    if timer is not None:
+        yield timer
+        return
+    timer = StageTimer(observe)
+    token = _current.set(timer)
+    try:
+        yield timer
+    finally:
+        _current.reset(token)
+
+@contextmanager
+def activate(timer: StageTimer) -> Iterator[StageTimer]:
+    """Deja `timer` como actual (p. ej. en el hilo que consume el stream de la IA)."""
+    token = _current.set(timer)
+    try:
+        yield timer
+    finally:
+        _current.reset(token)
+
+def record_stages(stage_ms: Dict[str, float]) -> None:
+    """Incorpora tiempos medidos en otro proceso al StageTimer actual (o solo al histograma)."""
+    timer = _current.get()
+    (timer if timer is not None else StageTimer()).merge(stage_ms)
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Mide una etapa en el StageTimer actual; sin uno activo solo alimenta el histograma."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - t0
+        timer = _current.get()
+        if timer is not None:
+            timer.add(name, seconds)
+        else:
+            STAGE_SECONDS.observe(seconds, name)
@@ -1,12 +1,21 @@
-from typing import List
+from typing import Iterable, List, Sequence
 
-def percentile(values: List[float], p: float) -> float:
-    if not values:
-        return 0.0
+def percentiles(values: Iterable[float], ps: Sequence[float]) -> List[float]:
+    """Percentiles exactos (interpolación lineal) ordenando los datos una sola vez."""
     vals = sorted(values)
-    k = (len(vals) - 1) * p
-    f = int(k)
-    c = min(f + 1, len(vals) - 1)
-    if f == c:
-        return float(vals[f])
-    return float(vals[f] * (c - k) + vals[c] * (k - f))
\ No newline at end of file
+    if not vals:
+        return [0.0 for _ in ps]
+    out: List[float] = []
+    last = len(vals) - 1
+    for p in ps:
+        k = last * p
+        f = int(k)
+        c = min(f + 1, last)
+        if f == c:
+            out.append(float(vals[f]))
+        else:
+            out.append(float(vals[f] * (c - k) + vals[c] * (k - f)))
+    return out
+
+def percentile(values: List[float], p: float) -> float:
+    return percentiles(values, (p,))[0]
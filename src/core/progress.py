@@ -0,0 +1,41 @@
+import io, time
+from typing import BinaryIO, Callable
+
+class ProgressReader(io.RawIOBase):
+    """
+    Envuelve un archivo binario y reporta los bytes leídos sin tocar el bucle del parser.
+    El callback se invoca como mucho cada `min_interval_s` segundos (y al llegar al final).
+    Se usa dentro de io.BufferedReader para ofrecer read/readline/iteración normales.
+    """
+
+    def __init__(self, raw: BinaryIO, callback: Callable[[int], None], min_interval_s: float = 0.5):
+        self._raw = raw
+        self._callback = callback
+        self._min_interval_s = min_interval_s
+        self._last = 0.0
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return self._raw.seekable()
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self._raw.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._raw.tell()
+
+    def readinto(self, b) -> int:
+        n = self._raw.readinto(b)
+        if n:
+            self.bytes_read = max(self.bytes_read, self._raw.tell())
+        now = time.monotonic()
+        if not n or now - self._last >= self._min_interval_s:
+            self._last = now
+            self._callback(self.bytes_read)
+        return n
+
+def with_progress(raw: BinaryIO, callback: Callable[[int], None], min_interval_s: float = 0.5) -> io.BufferedReader:
+    return io.BufferedReader(ProgressReader(raw, callback, min_interval_s), buffer_size=1024 * 1024)
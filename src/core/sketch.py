@@ -0,0 +1,237 @@
+import math, os, sys
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from src.core.env import env_int
+from src.core.percentiles import percentiles
+
+# Percentiles que publica el contrato (Latency).
+SUMMARY_QUANTILES = (0.50, 0.90, 0.95, 0.99)
+
+def _relative_accuracy() -> float:
+    try:
+        alpha = float(os.getenv("SKETCH_RELATIVE_ACCURACY", "0.01"))
+    except ValueError:
+        return 0.01
+    return alpha if 0.0 < alpha < 1.0 else 0.01
+
+def _exact_limit() -> int:
+    """
+    Cantidad de muestras que se guardan tal cual antes de pasar al sketch.
+    PERCENTILE_MODE: auto (por defecto) | exact (nunca aproxima) | sketch (siempre aproxima).
+    """
+    mode = os.getenv("PERCENTILE_MODE", "auto").strip().lower()
+    if mode == "exact":
+        return sys.maxsize
+    if mode == "sketch":
+        return 0
+    return env_int("SKETCH_EXACT_LIMIT", 4096, minimum=0)
+
+class QuantileSketch:
+    """
+    Sketch de cuantiles estilo DDSketch con error relativo acotado y fusionable.
+
+    Mientras haya pocas muestras (<= exact_limit) se guardan los valores y los
+    percentiles son exactos (misma interpolación que core.percentiles). Al superar el
+    límite se pasa a cubetas logarítmicas: cualquier cuantil devuelto está a menos de
+    `relative_accuracy` (relativo) del valor real. Dos sketches con la misma precisión
+    se fusionan sumando cubetas, así que se pueden combinar labels, bloques o workers.
+    """
+
+    __slots__ = ("relative_accuracy", "exact_limit", "_gamma", "_inv_log_gamma",
+                 "_values", "_bins", "_zero", "count", "min", "max")
+
+    def __init__(self, relative_accuracy: Optional[float] = None, exact_limit: Optional[int] = None) -> None:
+        self.relative_accuracy = relative_accuracy if relative_accuracy is not None else _relative_accuracy()
+        self.exact_limit = exact_limit if exact_limit is not None else _exact_limit()
+        self._gamma = (1.0 + self.relative_accuracy) / (1.0 - self.relative_accuracy)
+        self._inv_log_gamma = 1.0 / math.log(self._gamma)
+        self._values: Optional[array] = array("d") if self.exact_limit > 0 else None
+        self._bins: Dict[int, int] = {}
+        self._zero = 0
+        self.count = 0
+        self.min = 0.0
+        self.max = 0.0
+
+    @property
+    def is_exact(self) -> bool:
+        return self._values is not None
+
+    def add(self, v: float) -> None:
+        if self.count == 0:
+            self.min = self.max = v
+        elif v < self.min:
+            self.min = v
+        elif v > self.max:
+            self.max = v
+        self.count += 1
+        values = self._values
+        if values is not None:
+            values.append(v)
+            if len(values) > self.exact_limit:
+                self._collapse()
+        elif v > 0.0:
+            k = math.ceil(math.log(v) * self._inv_log_gamma)
+            bins = self._bins
+            bins[k] = bins.get(k, 0) + 1
+        else:
+            self._zero += 1
+
+    @property
+    def inv_log_gamma(self) -> float:
+        """La cubeta de v > 0 es ceil(ln(v) * inv_log_gamma) (para calcularlas fuera, vectorizado)."""
+        return self._inv_log_gamma
+
+    def add_block(self, count: int, lo: float, hi: float, values: Optional[Sequence[float]] = None,
+                  zero: int = 0, bins: Optional[Dict[int, int]] = None) -> None:
+        """
+        Suma un grupo ya agregado (backends vectorizados): sus muestras en `values`, o
+        bien `zero` + `bins` calculadas con inv_log_gamma. Equivale a `count` llamadas a add.
+        """
+        other = QuantileSketch(self.relative_accuracy, self.exact_limit)
+        other.count, other.min, other.max = count, lo, hi
+        if values is not None:
+            other._values = array("d", values)
+        else:
+            other._values, other._zero, other._bins = None, zero, bins or {}
+        self.merge(other)
+
+    def _collapse(self) -> None:
+        values, self._values = self._values, None
+        bins = self._bins
+        inv = self._inv_log_gamma
+        for v in values:
+            if v > 0.0:
+                k = math.ceil(math.log(v) * inv)
+                bins[k] = bins.get(k, 0) + 1
+            else:
+                self._zero += 1
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        if other.count == 0:
+            return self
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("No se pueden fusionar sketches con distinta precisión relativa.")
+        if self.count == 0:
+            self.min, self.max = other.min, other.max
+        else:
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        self.count += other.count
+
+        if self._values is not None and other._values is not None \
+                and len(self._values) + len(other._values) <= self.exact_limit:
+            self._values.extend(other._values)
+            return self
+
+        if self._values is not None:
+            self._collapse()
+        if other._values is not None:
+            inv = self._inv_log_gamma
+            bins = self._bins
+            for v in other._values:
+                if v > 0.0:
+                    k = math.ceil(math.log(v) * inv)
+                    bins[k] = bins.get(k, 0) + 1
+                else:
+                    self._zero += 1
+        else:
+            bins = self._bins
+            for k, n in other._bins.items():
+                bins[k] = bins.get(k, 0) + n
+            self._zero += other._zero
+        return self
+
+    def quantiles(self, ps: Sequence[float] = SUMMARY_QUANTILES) -> List[float]:
+        """Responde todos los cuantiles pedidos en una sola pasada (ps ascendentes)."""
+        if self.count == 0:
+            return [0.0 for _ in ps]
+        if self._values is not None:
+            return percentiles(self._values, ps)
+
+        ranks = [p * (self.count - 1) for p in ps]
+        out: List[float] = []
+        i = 0
+        cum = self._zero
+        while i < len(ranks) and ranks[i] < cum:
+            out.append(0.0)
+            i += 1
+        gamma = self._gamma
+        for k in sorted(self._bins):
+            if i >= len(ranks):
+                break
+            cum += self._bins[k]
+            if ranks[i] < cum:
+                est = 2.0 * gamma ** k / (gamma + 1.0)
+                est = min(max(est, self.min), self.max)
+                while i < len(ranks) and ranks[i] < cum:
+                    out.append(est)
+                    i += 1
+        while i < len(ranks):
+            out.append(float(self.max))
+            i += 1
+        return out
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "exact_limit": self.exact_limit,
+            "count": self.count,
+            "min": self.min,
+            "max": self.max,
+            "zero": self._zero,
+            "values": list(self._values) if self._values is not None else None,
+            "bins": {str(k): n for k, n in self._bins.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "QuantileSketch":
+        sk = cls(relative_accuracy=data["relative_accuracy"], exact_limit=data["exact_limit"])
+        sk.count = int(data["count"])
+        sk.min = float(data["min"])
+        sk.max = float(data["max"])
+        sk._zero = int(data.get("zero", 0))
+        values = data.get("values")
+        sk._values = array("d", values) if values is not None else None
+        sk._bins = {int(k): int(n) for k, n in data.get("bins", {}).items()}
+        return sk
+
+def _bucket_counts(sk: QuantileSketch) -> Dict[float, int]:
+    """Conteos por cubeta (cero como -inf); los sketches exactos se discretizan igual."""
+    if sk._values is None:
+        counts: Dict[float, int] = {float(k): n for k, n in sk._bins.items()}
+        if sk._zero:
+            counts[-math.inf] = sk._zero
+        return counts
+    counts = {}
+    for v in sk._values:
+        k = float(math.ceil(math.log(v) * sk._inv_log_gamma)) if v > 0.0 else -math.inf
+        counts[k] = counts.get(k, 0) + 1
+    return counts
+
+def mann_whitney(a: QuantileSketch, b: QuantileSketch) -> Optional[Tuple[float, float]]:
+    """
+    Prueba U de Mann-Whitney (aprox. normal, corrección por empates) sobre dos sketches.
+    Cada cubeta es un grupo de empates, así que el costo es O(cubetas), no O(muestras).
+    Devuelve (p_valor bilateral, P(A > B) + ½·P(A = B)) o None si no aplica.
+    """
+    if a.count == 0 or b.count == 0 or a.relative_accuracy != b.relative_accuracy:
+        return None
+    ca, cb = _bucket_counts(a), _bucket_counts(b)
+    n1, n2 = a.count, b.count
+    n = n1 + n2
+    rank_sum = 0.0
+    ties = 0.0
+    seen = 0
+    for k in sorted(set(ca) | set(cb)):
+        x, y = ca.get(k, 0), cb.get(k, 0)
+        t = x + y
+        rank_sum += x * (seen + (t + 1) / 2.0)
+        ties += t ** 3 - t
+        seen += t
+    u = rank_sum - n1 * (n1 + 1) / 2.0
+    effect = u / (n1 * n2)
+    var = n1 * n2 / 12.0 * ((n + 1) - ties / (n * (n - 1))) if n > 1 else 0.0
+    if var <= 0.0:
+        return 1.0, effect
+    z = (u - n1 * n2 / 2.0) / math.sqrt(var)
+    return math.erfc(abs(z) / math.sqrt(2.0)), effect
@@ -1,4 +1,25 @@
+from datetime import datetime
+from functools import lru_cache
+
 def duration_ms_from_timestamps(timestamps: list[int]) -> int:
     if not timestamps:
         return 0
-    return max(timestamps) - min(timestamps)
\ No newline at end of file
+    return max(timestamps) - min(timestamps)
+
+@lru_cache(maxsize=4096)
+def _epoch_seconds(head: str, tz: str) -> int:
+    return int(datetime.fromisoformat(head + (tz or "+00:00")).timestamp())
+
+def iso_to_epoch_ms(value: str) -> int:
+    """
+    Convierte "YYYY-MM-DDTHH:MM:SS[.fracción](Z|±HH:MM)" a epoch en milisegundos.
+    La parte de segundos se cachea: en un stream de puntos se repite miles de veces.
+    """
+    head, rest = value[:19], value[19:]
+    frac = ""
+    if rest.startswith("."):
+        i = 1
+        while i < len(rest) and rest[i].isdigit():
+            i += 1
+        frac, rest = rest[1:i], rest[i:]
+    return _epoch_seconds(head, rest) * 1000 + int((frac + "000")[:3])
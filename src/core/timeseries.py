@@ -0,0 +1,338 @@
+import math, os
+from array import array
+from typing import Any, Dict, Iterable, List, Optional
+from src.core.env import env_int
+from src.core.sketch import QuantileSketch, SUMMARY_QUANTILES
+
+def window_ms() -> int:
+    """TIMESERIES_WINDOW_MS: ventana base (ms). 0 desactiva las series."""
+    return env_int("TIMESERIES_WINDOW_MS", 1000, minimum=0)
+
+def _max_windows() -> int:
+    return env_int("TIMESERIES_MAX_WINDOWS", 1440, minimum=2)
+
+def _relative_accuracy() -> float:
+    try:
+        alpha = float(os.getenv("TIMESERIES_RELATIVE_ACCURACY", "0.02"))
+    except ValueError:
+        return 0.02
+    return alpha if 0.0 < alpha < 1.0 else 0.02
+
+class WindowSeries:
+    """
+    Ventanas de una label en arrays paralelos indexados por (ventana absoluta - start).
+    Las latencias de cada ventana son cubetas logarítmicas (mismo esquema que QuantileSketch),
+    guardadas como dict disperso; no hay un objeto por ventana salvo ese dict.
+    """
+
+    __slots__ = ("start", "requests", "failures", "zeros", "mins", "maxs", "bins")
+
+    def __init__(self, start: int) -> None:
+        self.start = start
+        self.requests = array("q")
+        self.failures = array("q")
+        self.zeros = array("q")
+        self.mins = array("d")
+        self.maxs = array("d")
+        self.bins: List[Dict[int, int]] = []
+
+    def _slot(self, idx: int) -> int:
+        pos = idx - self.start
+        if pos < 0:
+            # Timestamp anterior al primero visto (filas desordenadas): se antepone.
+            self._prepend(-pos)
+            pos = 0
+        missing = pos + 1 - len(self.requests)
+        if missing > 0:
+            self.requests.extend(array("q", [0]) * missing)
+            self.failures.extend(array("q", [0]) * missing)
+            self.zeros.extend(array("q", [0]) * missing)
+            self.mins.extend(array("d", [0.0]) * missing)
+            self.maxs.extend(array("d", [0.0]) * missing)
+            self.bins.extend({} for _ in range(missing))
+        return pos
+
+    def _prepend(self, n: int) -> None:
+        self.start -= n
+        self.requests = array("q", [0]) * n + self.requests
+        self.failures = array("q", [0]) * n + self.failures
+        self.zeros = array("q", [0]) * n + self.zeros
+        self.mins = array("d", [0.0]) * n + self.mins
+        self.maxs = array("d", [0.0]) * n + self.maxs
+        self.bins = [{} for _ in range(n)] + self.bins
+
+    def add(self, idx: int, key: Optional[int], elapsed: float, ok: bool) -> None:
+        pos = idx - self.start
+        if pos < 0 or pos >= len(self.requests):
+            pos = self._slot(idx)
+        n = self.requests[pos]
+        if n == 0:
+            self.mins[pos] = self.maxs[pos] = elapsed
+        elif elapsed < self.mins[pos]:
+            self.mins[pos] = elapsed
+        elif elapsed > self.maxs[pos]:
+            self.maxs[pos] = elapsed
+        self.requests[pos] = n + 1
+        if not ok:
+            self.failures[pos] += 1
+        if key is None:
+            self.zeros[pos] += 1
+        else:
+            bins = self.bins[pos]
+            bins[key] = bins.get(key, 0) + 1
+
+    def add_window(self, idx: int, requests: int, failures: int, zeros: int,
+                   lo: float, hi: float, bins: Dict[int, int]) -> None:
+        """Suma una ventana ya agregada (fusiones, reescalado y backends vectorizados)."""
+        if requests == 0 and failures == 0:
+            return
+        pos = self._slot(idx)
+        n = self.requests[pos]
+        if requests:
+            if n == 0:
+                self.mins[pos], self.maxs[pos] = lo, hi
+            else:
+                self.mins[pos] = min(self.mins[pos], lo)
+                self.maxs[pos] = max(self.maxs[pos], hi)
+        self.requests[pos] = n + requests
+        self.failures[pos] += failures
+        self.zeros[pos] += zeros
+        target = self.bins[pos]
+        for k, c in bins.items():
+            target[k] = target.get(k, 0) + c
+
+    def windows(self) -> Iterable[tuple]:
+        for pos in range(len(self.requests)):
+            yield (self.start + pos, self.requests[pos], self.failures[pos], self.zeros[pos],
+                   self.mins[pos], self.maxs[pos], self.bins[pos])
+
+class TimeSeries:
+    """
+    Métricas por ventana de tiempo y por label, calculadas en la misma pasada que el summary.
+
+    Las ventanas están alineadas a epoch (índice = ts // window_ms). Si la corrida abarca más
+    de TIMESERIES_MAX_WINDOWS ventanas, el ancho se duplica (fusionando pares), así la memoria
+    queda acotada aunque el soak test dure días.
+    """
+
+    def __init__(self, window_ms_: Optional[int] = None, max_windows: Optional[int] = None,
+                 relative_accuracy: Optional[float] = None) -> None:
+        self.window_ms = window_ms_ if window_ms_ is not None else window_ms()
+        self.max_windows = max_windows if max_windows is not None else _max_windows()
+        self.relative_accuracy = relative_accuracy if relative_accuracy is not None else _relative_accuracy()
+        gamma = (1.0 + self.relative_accuracy) / (1.0 - self.relative_accuracy)
+        self.inv_log_gamma = 1.0 / math.log(gamma)
+        self.labels: Dict[str, WindowSeries] = {}
+        self._lo: Optional[int] = None
+        self._hi: Optional[int] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_ms > 0
+
+    def _index(self, ts: int) -> int:
+        idx = ts // self.window_ms
+        if self._lo is None:
+            self._lo = self._hi = idx
+        elif idx < self._lo:
+            self._lo = idx
+        elif idx > self._hi:
+            self._hi = idx
+        else:
+            return idx
+        while self._hi - self._lo + 1 > self.max_windows:
+            self._coarsen()
+            idx //= 2
+        return idx
+
+    def reserve(self, ts_min: int, ts_max: int) -> None:
+        """Fija de antemano el rango de tiempo (backends vectorizados): evita reescalar a mitad de carga."""
+        self._index(ts_min)
+        self._index(ts_max)
+
+    def _series(self, label: str, idx: int) -> WindowSeries:
+        series = self.labels.get(label)
+        if series is None:
+            series = self.labels[label] = WindowSeries(idx)
+        return series
+
+    def add(self, label: str, ts: int, elapsed: float, ok: bool) -> None:
+        # Ruta caliente (una llamada por fila): se evita _index cuando la ventana ya está en rango.
+        idx = ts // self.window_ms
+        lo = self._lo
+        if lo is None or idx < lo or idx > self._hi:
+            idx = self._index(ts)
+        series = self.labels.get(label)
+        if series is None:
+            series = self.labels[label] = WindowSeries(idx)
+        key = math.ceil(math.log(elapsed) * self.inv_log_gamma) if elapsed > 0.0 else None
+        series.add(idx, key, elapsed, ok)
+
+    def add_window(self, label: str, ts: int, requests: int, failures: int = 0, zeros: int = 0,
+                   lo: float = 0.0, hi: float = 0.0, bins: Optional[Dict[int, int]] = None) -> None:
+        idx = self._index(ts)
+        self._series(label, idx).add_window(idx, requests, failures, zeros, lo, hi, bins or {})
+
+    def _coarsen(self) -> None:
+        self.window_ms *= 2
+        self._lo //= 2
+        self._hi //= 2
+        for label, old in list(self.labels.items()):
+            new = WindowSeries(old.start // 2)
+            for idx, req, fail, zeros, lo, hi, bins in old.windows():
+                new.add_window(idx // 2, req, fail, zeros, lo, hi, bins)
+            self.labels[label] = new
+
+    def _rescale_to(self, width: int) -> None:
+        while self.window_ms < width:
+            if self._lo is None:
+                self.window_ms *= 2
+            else:
+                self._coarsen()
+
+    def merge(self, other: "TimeSeries") -> "TimeSeries":
+        """Fusiona otra serie (otro bloque o worker). Ambas deben compartir precisión y ventana base."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("No se pueden fusionar series con distinta precisión relativa.")
+        width = max(self.window_ms, other.window_ms)
+        self._rescale_to(width)
+        factor = width // other.window_ms
+        for label, series in other.labels.items():
+            for idx, req, fail, zeros, lo, hi, bins in series.windows():
+                self.add_window(label, (idx // factor) * width, req, fail, zeros, lo, hi, bins)
+        return self
+
+    def replace_failures(self, other: "TimeSeries") -> None:
+        """Reemplaza los fallos por los contados en `other` (p. ej. la métrica http_req_failed de k6)."""
+        width = max(self.window_ms, other.window_ms)
+        self._rescale_to(width)
+        for series in self.labels.values():
+            for pos in range(len(series.failures)):
+                series.failures[pos] = 0
+        factor = width // other.window_ms
+        for label, series in other.labels.items():
+            for idx, _, fail, _, _, _, _ in series.windows():
+                if fail:
+                    self.add_window(label, (idx // factor) * width, 0, fail)
+
+    def label_sketches(self) -> Dict[str, QuantileSketch]:
+        """Un sketch por label con todas sus ventanas fusionadas (base para comparar corridas)."""
+        out: Dict[str, QuantileSketch] = {}
+        for name, series in self.labels.items():
+            count = zero = 0
+            lo = hi = 0.0
+            bins: Dict[int, int] = {}
+            for _, req, _, zeros, w_lo, w_hi, window_bins in series.windows():
+                if not req:
+                    continue
+                lo = w_lo if count == 0 else min(lo, w_lo)
+                hi = w_hi if count == 0 else max(hi, w_hi)
+                count += req
+                zero += zeros
+                for k, c in window_bins.items():
+                    bins[k] = bins.get(k, 0) + c
+            out[name] = QuantileSketch.from_dict({
+                "relative_accuracy": self.relative_accuracy, "exact_limit": 0, "count": count,
+                "min": lo, "max": hi, "zero": zero, "values": None, "bins": bins})
+        return out
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Forma compacta y serializable: arrays por label, cubetas como pares planos [k, n, ...]."""
+        return {
+            "window_ms": self.window_ms,
+            "relative_accuracy": self.relative_accuracy,
+            "labels": {
+                name: {
+                    "start": s.start,
+                    "requests": s.requests.tolist(),
+                    "failures": s.failures.tolist(),
+                    "zeros": s.zeros.tolist(),
+                    "min": s.mins.tolist(),
+                    "max": s.maxs.tolist(),
+                    "bins": [[x for kv in sorted(b.items()) for x in kv] for b in s.bins],
+                }
+                for name, s in sorted(self.labels.items())
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TimeSeries":
+        ts = cls(window_ms_=data["window_ms"], max_windows=_max_windows(),
+                 relative_accuracy=data["relative_accuracy"])
+        for name, d in data["labels"].items():
+            s = WindowSeries(d["start"])
+            s.requests = array("q", d["requests"])
+            s.failures = array("q", d["failures"])
+            s.zeros = array("q", d["zeros"])
+            s.mins = array("d", d["min"])
+            s.maxs = array("d", d["max"])
+            s.bins = [dict(zip(flat[::2], flat[1::2])) for flat in d["bins"]]
+            ts.labels[name] = s
+            end = s.start + len(s.requests) - 1
+            ts._lo = s.start if ts._lo is None else min(ts._lo, s.start)
+            ts._hi = end if ts._hi is None else max(ts._hi, end)
+        return ts
+
+def downsample(data: Dict[str, Any], resolution_ms: Optional[int] = None, max_points: Optional[int] = None,
+               labels: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Reagrupa la serie guardada a `resolution_ms` (redondeado a múltiplo de la ventana base)
+    y devuelve columnas por label más "(overall)": t_ms, requests, failures, error_rate,
+    throughput_rps y percentiles por ventana. `max_points` ensancha la ventana si hace falta
+    para no devolver más puntos que esos por serie.
+    """
+    base = data["window_ms"]
+    alpha = data["relative_accuracy"]
+    stored = TimeSeries.from_dict(data)
+    factor = max(-(-(resolution_ms or base) // base), 1)
+    # Las ventanas reagrupadas arrancan en la primera ventana de la corrida.
+    origin = stored._lo or 0
+    if max_points and stored._lo is not None:
+        span = stored._hi - stored._lo + 1
+        factor = max(factor, -(-span // max_points))
+    width = base * factor
+
+    def regroup(series_list: List[WindowSeries]) -> Dict[int, list]:
+        out: Dict[int, list] = {}
+        for series in series_list:
+            for idx, req, fail, zeros, lo, hi, bins in series.windows():
+                if not req and not fail:
+                    continue
+                w = (idx - origin) // factor
+                acc = out.get(w)
+                if acc is None:
+                    out[w] = [req, fail, zeros, lo, hi, dict(bins)]
+                    continue
+                if req:
+                    if acc[0]:
+                        acc[3], acc[4] = min(acc[3], lo), max(acc[4], hi)
+                    else:
+                        acc[3], acc[4] = lo, hi
+                acc[0] += req
+                acc[1] += fail
+                acc[2] += zeros
+                for k, c in bins.items():
+                    acc[5][k] = acc[5].get(k, 0) + c
+        return out
+
+    def columns(name: str, grouped: Dict[int, list]) -> Dict[str, Any]:
+        col: Dict[str, Any] = {"name": name, "t_ms": [], "requests": [], "failures": [], "error_rate": [],
+                               "throughput_rps": [], "p50": [], "p90": [], "p95": [], "p99": []}
+        for w in sorted(grouped):
+            req, fail, zeros, lo, hi, bins = grouped[w]
+            sketch = QuantileSketch.from_dict({"relative_accuracy": alpha, "exact_limit": 0, "count": req,
+                                               "min": lo, "max": hi, "zero": zeros, "values": None,
+                                               "bins": bins})
+            col["t_ms"].append(origin * base + w * width)
+            col["requests"].append(req)
+            col["failures"].append(fail)
+            col["error_rate"].append(round(fail / max(req, 1), 4))
+            col["throughput_rps"].append(round(req / (width / 1000.0), 3))
+            for key, value in zip(("p50", "p90", "p95", "p99"), sketch.quantiles(SUMMARY_QUANTILES)):
+                col[key].append(round(value, 3))
+        return col
+
+    selected = stored.labels if labels is None else {k: v for k, v in stored.labels.items() if k in labels}
+    series = [columns("(overall)", regroup(list(stored.labels.values())))]
+    series += [columns(name, regroup([s])) for name, s in sorted(selected.items())]
+    return {"window_ms": width, "base_window_ms": base, "series": series}
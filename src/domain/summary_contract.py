@@ -25,6 +25,34 @@ class Summary(BaseModel):
     overall: OverallMetrics
     by_method: List[MethodMetrics] = Field(default_factory=list)
 
+class LabelComparison(BaseModel):
+    name: str
+    requests: int
+    baseline_requests: int
+    p95_ms: float
+    baseline_p95_ms: float
+    p95_delta_pct: float
+    p99_ms: float
+    baseline_p99_ms: float
+    p99_delta_pct: float
+    error_rate: float
+    baseline_error_rate: float
+    p_value: Optional[float] = None
+    prob_slower: Optional[float] = None
+    verdict: str = "unchanged"
+
+class RunComparison(BaseModel):
+    run_key: str
+    baseline_key: str
+    baseline_run_id: str
+    baseline_tag: Optional[str] = None
+    overall: LabelComparison
+    by_method: List[LabelComparison] = Field(default_factory=list)
+    added_labels: List[str] = Field(default_factory=list)
+    removed_labels: List[str] = Field(default_factory=list)
+    regressions: int = 0
+    improvements: int = 0
+
 class AIReport(BaseModel):
     title: str
     overview: str
@@ -2,14 +2,19 @@
 
 import os
 import json
-from typing import Tuple, Optional
+from typing import TYPE_CHECKING, Iterator, List, Tuple, Optional
 
-import httpx
-from openai import AzureOpenAI
-from openai import APIConnectionError, APIError, AuthenticationError, RateLimitError
+if TYPE_CHECKING:  # el SDK se carga al crear el cliente (client_registry)
+    from openai import AzureOpenAI
 
-from src.domain.summary_contract import Summary, AIReport, TokenUsage
+from src.domain.summary_contract import Summary, AIReport, TokenUsage, RunComparison
 from src.application.ai_prompt_builder import build_system_prompt, build_user_prompt
+from src.application.prompt_compaction import count_tokens
+from src.infrastructure.ai.client_registry import registry
+from src.infrastructure.ai.scheduler import get_scheduler
+from src.core.env import env_int
+from src.core.metrics import stage
+from src.core.json_stream import ObjectStreamParser
 
 
 # ------------------------------- Helpers ------------------------------------ #
@@ -21,21 +26,23 @@ def _strict() -> bool:
 
 def _max_tokens() -> int:
     """Lee el presupuesto máximo de tokens de salida para la IA."""
-    try:
-        return int(os.getenv("AI_MAX_TOKENS", "1024"))
-    except ValueError:
-        return 1024
+    return env_int("AI_MAX_TOKENS", 1024)
 
 
-def _client_or_raise() -> Tuple[AzureOpenAI, str]:
+def current_deployment() -> str:
+    """Nombre del deployment configurado (o cadena vacía)."""
+    # Permitimos dos nombres de variable por compatibilidad:
+    return os.getenv("AZURE_OPENAI_DEPLOYMENT") or os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME") or ""
+
+
+def _client_or_raise() -> Tuple["AzureOpenAI", str]:
     """
-    Construye el cliente de Azure OpenAI y devuelve (client, deployment).
+    Obtiene el cliente de Azure OpenAI del registro y devuelve (client, deployment).
     Lanza RuntimeError si faltan variables de entorno.
     """
     endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
     api_key = os.getenv("AZURE_OPENAI_API_KEY")
-    # Permitimos dos nombres de variable por compatibilidad:
-    deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT") or os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
+    deployment = current_deployment()
     api_version = os.getenv("AZURE_OPENAI_API_VERSION") or "2024-12-01-preview"
 
     if not endpoint or not api_key or not deployment:
@@ -44,15 +51,8 @@ def _client_or_raise() -> Tuple[AzureOpenAI, str]:
             "AZURE_OPENAI_API_KEY o AZURE_OPENAI_DEPLOYMENT"
         )
 
-    proxies = os.getenv("HTTPS_PROXY") or os.getenv("HTTP_PROXY")
-    http_client = httpx.Client(proxies=proxies, timeout=60.0) if proxies else None
-
-    client = AzureOpenAI(
-        api_key=api_key,
-        api_version=api_version,
-        azure_endpoint=endpoint,
-        http_client=http_client,
-    )
+    # Cliente compartido (pool keep-alive) del registro; no se crea uno por solicitud.
+    client = registry.get(endpoint, api_key, api_version)
     return client, deployment
 
 
@@ -79,11 +79,85 @@ def _is_o4_family(deployment: str) -> bool:
     return deployment.lower().startswith("o4")
 
 
+def _messages(summary: Summary, comparison: Optional[RunComparison]) -> List[dict]:
+    """Prompts de sistema y de usuario; se arman una vez aunque la llamada se reintente."""
+    with stage("prompt_build"):
+        system_prompt = build_system_prompt()     # enfoque ejecutivo, no técnico
+        user_prompt = build_user_prompt(summary, comparison)  # JSON del summary (+ comparación) + instrucciones
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+
+
+def _token_cost(messages: List[dict]) -> int:
+    """Lo que Azure descuenta del TPM al recibir la llamada: prompt estimado + max_completion_tokens."""
+    return sum(count_tokens(m["content"]) + 4 for m in messages) + _max_tokens()
+
+
+def _request_params(messages: List[dict], deployment: str) -> dict:
+    """Parámetros de chat.completions para un deployment (comunes a la llamada normal y a la de stream)."""
+    # Presupuesto de salida (para evitar que reasoning consuma todo).
+    budget = _max_tokens()
+
+    params = {
+        "model": deployment,  # nombre EXACTO del deployment en Azure
+        "messages": messages,
+        # ¡OJO! o4-mini no acepta temperature != default, así que NO lo enviamos.
+        "max_completion_tokens": budget,
+    }
+
+    # Solo forzamos response_format cuando NO es o4* (los o4* suelen ignorarlo o rechazarlo)
+    if _enforce_json() and not _is_o4_family(deployment):
+        params["response_format"] = {"type": "json_object"}
+    return params
+
+
+def _enforce_json() -> bool:
+    """¿Forzamos JSON con response_format? (solo aplica si NO es o4*)."""
+    return os.getenv("AI_ENFORCE_JSON", "false").strip().lower() in ("1", "true", "yes", "y")
+
+
+def _report_from_content(content: Optional[str], deployment: str) -> AIReport:
+    """Valida el texto completo del modelo y lo convierte en AIReport."""
+    if not content:
+        # Muchos o4* pueden gastar el budget en reasoning dejando content vacío.
+        # En modo estricto, fallamos explícitamente con un mensaje claro.
+        raise ValueError(
+            "La IA devolvió contenido vacío (posible 'finish_reason=length' con razonamiento). "
+            "Incrementa AI_MAX_TOKENS o endurece el prompt para respuestas más cortas."
+        )
+
+    # Si forzamos JSON y no es o4*, parseamos directo.
+    with stage("response_parse"):
+        if _enforce_json() and not _is_o4_family(deployment):
+            return _parse_ai_json_strict(content)
+        # En o4*, pedimos JSON por prompt y validamos aquí.
+        try:
+            return _parse_ai_json_strict(content)
+        except Exception:
+            if _strict():
+                raise ValueError("La IA respondió en formato no JSON y AI_STRICT=true.")
+            # Si no es estricto, se podría hacer un fallback a texto plano:
+            # ai_report = AIReport(summary_title="Informe", summary_text=content, highlights=[], risks=[], recommendations=[], next_steps=[])
+            raise
+
+
+def _usage(usage, model: str) -> TokenUsage:
+    return TokenUsage(
+        prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+        completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+        total_tokens=getattr(usage, "total_tokens", 0) or 0,
+        model=model,
+    )
+
+
 # ------------------------------ API Principal ------------------------------- #
 
-def generate_ai_report(summary: Summary) -> Tuple[AIReport, TokenUsage, str]:
+def generate_ai_report(summary: Summary, comparison: Optional[RunComparison] = None) -> Tuple[AIReport, TokenUsage, str]:
     """
     Genera el informe ejecutivo usando Azure OpenAI.
+    Si hay `comparison`, el prompt incluye las regresiones frente a la línea base.
     Retorna: (AIReport, TokenUsage, "azure")
 
     Comportamiento:
@@ -91,76 +165,70 @@ def generate_ai_report(summary: Summary) -> Tuple[AIReport, TokenUsage, str]:
     - Si el modelo es o4* (p. ej. o4-mini), NO se envía response_format.
       En ese caso el prompt exige JSON y validamos con json.loads().
       Si AI_STRICT=true y no es JSON válido, se lanza excepción (FastAPI responderá 502).
+    - La llamada pasa por el planificador (scheduler.py): presupuesto TPM/RPM, reintentos
+      de 429/5xx/red, circuit breaker y hedging entre AZURE_OPENAI_DEPLOYMENT_LIST.
     """
-    client, deployment = _client_or_raise()
+    client, primary = _client_or_raise()
+    messages = _messages(summary, comparison)
 
-    # Prompts
-    system_prompt = build_system_prompt()     # enfoque ejecutivo, no técnico
-    user_prompt = build_user_prompt(summary)  # JSON del summary + instrucciones
+    def call(deployment: str):
+        return client.chat.completions.create(**_request_params(messages, deployment)), deployment
 
-    # Presupuesto de salida (para evitar que reasoning consuma todo).
-    budget = _max_tokens()
+    # Lo que no se resuelve con reintentos (auth, 400, circuito abierto...) se propaga y
+    # el controlador HTTP lo mapea a 5xx.
+    with stage("ai_call"):
+        resp, deployment = get_scheduler(primary).run(call, _token_cost(messages))
 
-    # ¿Forzamos JSON? (solo si NO es o4*)
-    enforce_json = os.getenv("AI_ENFORCE_JSON", "false").strip().lower() in ("1", "true", "yes", "y")
-    is_o4 = _is_o4_family(deployment)
+    # Uso de tokens (si el SDK lo entrega)
+    usage = _usage(resp.usage, getattr(resp, "model", deployment))
 
-    params = {
-        "model": deployment,  # nombre EXACTO del deployment en Azure
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
-        # ¡OJO! o4-mini no acepta temperature != default, así que NO lo enviamos.
-        "max_completion_tokens": budget,
-    }
+    content: Optional[str] = None
+    if resp.choices and resp.choices[0].message:
+        content = resp.choices[0].message.content
+    return _report_from_content(content, deployment), usage, "azure"
 
-    # Solo forzamos response_format cuando NO es o4* (los o4* suelen ignorarlo o rechazarlo)
-    if enforce_json and not is_o4:
-        params["response_format"] = {"type": "json_object"}
 
-    try:
-        resp = client.chat.completions.create(**params)
+# Evento de stream_ai_report: ("section", (clave, valor)) por cada sección completa del
+# informe, y al final ("report", (AIReport, TokenUsage, "azure")).
+StreamEvent = Tuple[str, tuple]
 
-        # Uso de tokens (si el SDK lo entrega)
-        usage = TokenUsage(
-            prompt_tokens=getattr(resp.usage, "prompt_tokens", 0),
-            completion_tokens=getattr(resp.usage, "completion_tokens", 0),
-            total_tokens=getattr(resp.usage, "total_tokens", 0),
-            model=getattr(resp, "model", deployment),
-        )
 
-        content: Optional[str] = None
-        if resp.choices and resp.choices[0].message:
-            content = resp.choices[0].message.content
-
-        if not content:
-            # Muchos o4* pueden gastar el budget en reasoning dejando content vacío.
-            # En modo estricto, fallamos explícitamente con un mensaje claro.
-            raise ValueError(
-                "La IA devolvió contenido vacío (posible 'finish_reason=length' con razonamiento). "
-                "Incrementa AI_MAX_TOKENS o endurece el prompt para respuestas más cortas."
-            )
-
-        # Si forzamos JSON y no es o4*, parseamos directo.
-        if enforce_json and not is_o4:
-            ai_report = _parse_ai_json_strict(content)
-        else:
-            # En o4*, pedimos JSON por prompt y validamos aquí.
-            try:
-                ai_report = _parse_ai_json_strict(content)
-            except Exception:
-                if _strict():
-                    raise ValueError("La IA respondió en formato no JSON y AI_STRICT=true.")
-                # Si no es estricto, se podría hacer un fallback a texto plano:
-                # ai_report = AIReport(summary_title="Informe", summary_text=content, highlights=[], risks=[], recommendations=[], next_steps=[])
-                raise
-
-        return ai_report, usage, "azure"
-
-    except (APIConnectionError, AuthenticationError, RateLimitError, APIError) as e:
-        # Errores propios de red/autenticación/rate. Dejar que FastAPI los maneje con 502/401/etc.
-        raise
-    except Exception:
-        # Cualquier otra excepción también se propaga; el controlador HTTP la mapea a 5xx con detalle.
-        raise
\ No newline at end of file
+def stream_ai_report(summary: Summary, comparison: Optional[RunComparison] = None) -> Iterator[StreamEvent]:
+    """
+    Variante en streaming de generate_ai_report (mismos prompts y validación).
+
+    Pide el completion con stream=True e include_usage, arma el JSON a medida que llegan
+    los deltas y entrega cada sección (title, overview, highlights...) apenas se cierra.
+    El último evento trae el AIReport validado sobre el texto completo y el TokenUsage,
+    que el servicio envía en el último chunk del stream.
+    """
+    client, primary = _client_or_raise()
+    messages = _messages(summary, comparison)
+
+    def call(deployment: str):
+        params = _request_params(messages, deployment)
+        params["stream"] = True
+        params["stream_options"] = {"include_usage": True}
+        return client.chat.completions.create(**params), deployment
+
+    parser = ObjectStreamParser()
+    with stage("ai_call"):
+        # Sin hedging: duplicar un stream ya abierto no acorta nada. Los reintentos
+        # cubren los errores previos al primer chunk.
+        stream, deployment = get_scheduler(primary).run(call, _token_cost(messages), hedge=False)
+        usage = TokenUsage(model=deployment)
+        try:
+            for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    usage = _usage(chunk.usage, getattr(chunk, "model", None) or deployment)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if delta is not None and delta.content:
+                    for key, value in parser.feed(delta.content):
+                        if key in AIReport.model_fields:
+                            yield "section", (key, value)
+        finally:
+            stream.close()
+
+    yield "report", (_report_from_content(parser.text, deployment), usage, "azure")
@@ -0,0 +1,89 @@
+# Registro de clientes Azure OpenAI con ciclo de vida de la aplicación
+
+import importlib.util
+import os
+import threading
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+from src.core.env import env_float, env_int
+
+if TYPE_CHECKING:  # httpx y openai se importan al crear el primer cliente (arranque más liviano)
+    import httpx
+    from openai import AzureOpenAI
+
+
+def _http2_enabled() -> bool:
+    """HTTP/2 solo si AI_HTTP2 lo permite y el paquete `h2` está instalado."""
+    wanted = os.getenv("AI_HTTP2", "true").strip().lower() in ("1", "true", "yes", "y")
+    return wanted and importlib.util.find_spec("h2") is not None
+
+
+class AzureClientRegistry:
+    """
+    Mantiene un único httpx.Client (pool keep-alive) y un AzureOpenAI por configuración.
+
+    Se abre al arrancar FastAPI y se cierra al apagarla, de modo que cada informe reutiliza
+    conexiones TCP/TLS ya establecidas en lugar de pagar un handshake por solicitud.
+    Si se usa fuera del ciclo de vida (scripts, pruebas), se crea bajo demanda.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._http: Optional["httpx.Client"] = None
+        self._clients: Dict[Tuple[str, str, str], "AzureOpenAI"] = {}
+
+    def _build_http_client(self) -> "httpx.Client":
+        import httpx
+
+        limits = httpx.Limits(
+            max_connections=env_int("AI_HTTP_MAX_CONNECTIONS", 20),
+            max_keepalive_connections=env_int("AI_HTTP_MAX_KEEPALIVE", 10),
+            keepalive_expiry=env_float("AI_HTTP_KEEPALIVE_EXPIRY_S", 60.0),
+        )
+        timeout = httpx.Timeout(
+            env_float("AI_HTTP_TIMEOUT_S", 60.0),
+            connect=env_float("AI_HTTP_CONNECT_TIMEOUT_S", 10.0),
+        )
+        proxies = os.getenv("HTTPS_PROXY") or os.getenv("HTTP_PROXY")
+        return httpx.Client(proxies=proxies, limits=limits, timeout=timeout, http2=_http2_enabled())
+
+    def startup(self) -> None:
+        with self._lock:
+            if self._http is None:
+                self._http = self._build_http_client()
+
+    def http_client(self) -> "httpx.Client":
+        if self._http is None:
+            self.startup()
+        return self._http
+
+    def get(self, endpoint: str, api_key: str, api_version: str) -> "AzureOpenAI":
+        """Devuelve el cliente para esa configuración, creándolo una sola vez."""
+        from openai import AzureOpenAI
+
+        key = (endpoint, api_key, api_version)
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+        http = self.http_client()
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._clients[key] = AzureOpenAI(
+                    api_key=api_key,
+                    api_version=api_version,
+                    azure_endpoint=endpoint,
+                    http_client=http,
+                    max_retries=0,  # los reintentos los decide el planificador (scheduler.py)
+                )
+        return client
+
+    def close(self) -> None:
+        with self._lock:
+            http, self._http = self._http, None
+            self._clients.clear()
+        if http is not None:
+            http.close()
+
+
+registry = AzureClientRegistry()
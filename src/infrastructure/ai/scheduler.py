@@ -0,0 +1,379 @@
+# Planificador de llamadas a Azure OpenAI: presupuesto TPM/RPM, reintentos, circuit breaker y hedging
+
+import contextvars
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+
+from src.core import metrics
+from src.core.env import env_float, env_int
+
+T = TypeVar("T")
+
+RETRIES = metrics.counter("informai_ai_retries_total", "Reintentos de llamadas a la IA por motivo.", ("reason",))
+HEDGES = metrics.counter("informai_ai_hedges_total", "Llamadas duplicadas en otro deployment por lentitud.")
+
+
+class AIUnavailable(RuntimeError):
+    """La IA no puede atender ahora (circuito abierto o sin presupuesto); conviene reintentar luego."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpen(AIUnavailable):
+    pass
+
+
+class BudgetExceeded(AIUnavailable):
+    pass
+
+
+# ------------------------------ Presupuesto --------------------------------- #
+
+class MinuteBudget:
+    """
+    Ventana deslizante de 60 s con los tokens y requests admitidos en un deployment.
+
+    Azure descuenta del TPM, al recibir la llamada, el prompt estimado más max_completion_tokens;
+    acá se reserva lo mismo antes de llamar. Las llamadas esperan en orden de llegada (FIFO):
+    solo la primera de la fila consulta el presupuesto, así una llamada grande no queda
+    postergada indefinidamente por otras chicas. tpm/rpm = 0 desactivan cada límite.
+    """
+
+    def __init__(self, tpm: int, rpm: int) -> None:
+        self.tpm = tpm
+        self.rpm = rpm
+        self._events: Deque[Tuple[float, int]] = deque()
+        self._tokens = 0
+        self._blocked_until = 0.0
+        self._waiters: Deque[object] = deque()
+        self._cond = threading.Condition()
+
+    def _prune(self, now: float) -> None:
+        while self._events and self._events[0][0] <= now - 60.0:
+            self._tokens -= self._events.popleft()[1]
+
+    def _wait_time(self, cost: int, now: float) -> float:
+        self._prune(now)
+        delay = max(self._blocked_until - now, 0.0)
+        if self.rpm and len(self._events) >= self.rpm:
+            delay = max(delay, self._events[len(self._events) - self.rpm][0] + 60.0 - now)
+        if self.tpm and self._tokens + cost > self.tpm:
+            excess, freed = self._tokens + cost - self.tpm, 0
+            for t, tokens in self._events:
+                freed += tokens
+                if freed >= excess:
+                    delay = max(delay, t + 60.0 - now)
+                    break
+        return delay
+
+    def acquire(self, cost: int, timeout: float) -> float:
+        """Reserva `cost` tokens y un request; devuelve los segundos esperados o lanza BudgetExceeded."""
+        if self.tpm:
+            cost = min(cost, self.tpm)  # una llamada mayor al TPM igual debe poder pasar sola
+        me = object()
+        start = time.monotonic()
+        deadline = start + timeout
+        with self._cond:
+            self._waiters.append(me)
+            try:
+                while True:
+                    now = time.monotonic()
+                    head = self._waiters[0] is me
+                    delay = self._wait_time(cost, now) if head else deadline - now
+                    if head and delay <= 0:
+                        self._events.append((now, cost))
+                        self._tokens += cost
+                        return now - start
+                    if now + delay > deadline or delay <= 0:
+                        raise BudgetExceeded("Presupuesto de tokens/requests de la IA agotado por ahora.",
+                                             retry_after=max(delay, 1.0))
+                    self._cond.wait(delay)
+            finally:
+                self._waiters.remove(me)
+                self._cond.notify_all()
+
+    def block(self, seconds: float) -> None:
+        """Tras un 429 con Retry-After, nadie vuelve a llamar a este deployment antes de tiempo."""
+        with self._cond:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+
+# ---------------------------- Circuit breaker ------------------------------- #
+
+class CircuitBreaker:
+    """
+    Cerrado → abierto tras `failures` fallos seguidos de salud (5xx, red, timeouts; los 429
+    no cuentan: son cuota, no salud). Abierto rechaza sin llamar durante `open_s`; luego
+    deja pasar una sola llamada de prueba (semiabierto) que lo cierra o lo reabre.
+    """
+
+    def __init__(self, failures: int, open_s: float) -> None:
+        self.failures = max(failures, 1)
+        self.open_s = open_s
+        self.state = "closed"
+        self._count = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def retry_after(self) -> float:
+        return max(self._opened_at + self.open_s - time.monotonic(), 0.0)
+
+    def available(self) -> bool:
+        """¿Aceptaría una llamada ahora? (no reserva el turno de prueba)."""
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            return time.monotonic() >= self._opened_at + self.open_s
+        return not self._probing
+
+    def allow(self) -> bool:
+        """Reserva el paso de una llamada; en semiabierto solo la primera pasa."""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() >= self._opened_at + self.open_s:
+                self.state = "half_open"
+                self._probing = False
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self._count = 0
+            self._probing = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self._count += 1
+            if self.state == "half_open" or self._count >= self.failures:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def release(self) -> None:
+        """La llamada de prueba terminó sin veredicto de salud (p. ej. un 429)."""
+        with self._lock:
+            self._probing = False
+
+
+# ------------------------------ Planificador -------------------------------- #
+
+def _retry_after(e: Exception) -> Optional[float]:
+    """Segundos pedidos por Azure en retry-after-ms / retry-after, si vienen."""
+    response = getattr(e, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(name)
+        if value:
+            try:
+                return max(float(value) * scale, 0.0)
+            except ValueError:
+                pass
+    return None
+
+
+def _classify(e: Exception) -> Optional[str]:
+    """Motivo reintentable ("rate_limit", "server", "connection") o None si no se reintenta."""
+    # Si la llamada llegó a fallar, openai ya está cargado: este import no cuesta.
+    from openai import APIConnectionError, APIStatusError, RateLimitError
+
+    if isinstance(e, RateLimitError):
+        return "rate_limit"
+    if isinstance(e, APIConnectionError):  # incluye APITimeoutError
+        return "connection"
+    if isinstance(e, APIStatusError) and (e.status_code >= 500 or e.status_code == 408):
+        return "server"
+    return None
+
+
+class _Deployment:
+    def __init__(self, name: str, tpm: int, rpm: int, failures: int, open_s: float) -> None:
+        self.name = name
+        self.budget = MinuteBudget(tpm, rpm)
+        self.breaker = CircuitBreaker(failures, open_s)
+
+
+class AIScheduler:
+    """
+    Punto único de salida hacia Azure OpenAI para todos los requests del proceso.
+
+    Por cada llamada: elige el primer deployment de AZURE_OPENAI_DEPLOYMENT_LIST con el
+    circuito cerrado, espera turno en su presupuesto TPM/RPM, llama y reintenta los fallos
+    transitorios con backoff exponencial con jitter (nunca antes del Retry-After de Azure).
+    Si un deployment agota sus reintentos o su presupuesto, pasa al siguiente. Con hedging
+    (AI_HEDGE_AFTER_S > 0 y 2+ deployments), si la primera llamada tarda más que eso se
+    lanza la misma en el siguiente deployment y gana la que responda antes; la perdedora
+    no se puede cancelar y sus tokens se consumen igual.
+    """
+
+    def __init__(self, deployments: List[str]) -> None:
+        tpm, rpm = env_int("AI_TPM_LIMIT", 0), env_int("AI_RPM_LIMIT", 0)
+        failures, open_s = env_int("AI_CB_FAILURES", 5), env_float("AI_CB_OPEN_S", 30.0)
+        self.deployments = [_Deployment(d, tpm, rpm, failures, open_s) for d in deployments]
+        self.max_retries = env_int("AI_RETRY_MAX", 3, minimum=0)
+        self.backoff_base = env_float("AI_RETRY_BASE_S", 0.5)
+        self.backoff_max = env_float("AI_RETRY_MAX_S", 20.0)
+        self.queue_timeout = env_float("AI_QUEUE_TIMEOUT_S", 30.0)
+        self.hedge_after = env_float("AI_HEDGE_AFTER_S", 0.0)
+        self._hedge_pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _backoff(self, attempt: int, floor: Optional[float]) -> float:
+        # Full jitter: reparte los reintentos de una ráfaga en vez de sincronizarlos.
+        delay = random.uniform(0.0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        return max(delay, floor or 0.0)
+
+    def _call(self, dep: _Deployment, fn: Callable[[str], T], cost: int) -> T:
+        """Llamada con presupuesto y reintentos en un deployment."""
+        attempt = 0
+        while True:
+            if not dep.breaker.allow():
+                raise CircuitOpen(f"Circuito abierto para el deployment {dep.name}.",
+                                  retry_after=max(dep.breaker.retry_after(), 1.0))
+            try:
+                with metrics.stage("ai_queue"):
+                    dep.budget.acquire(cost, self.queue_timeout)
+            except BaseException:
+                dep.breaker.release()  # sin llamada no hay veredicto: libera el turno de prueba
+                raise
+            try:
+                result = fn(dep.name)
+            except Exception as e:
+                reason = _classify(e)
+                if reason is None:
+                    dep.breaker.release()
+                    raise
+                if reason == "rate_limit":
+                    dep.breaker.release()
+                else:
+                    dep.breaker.failure()
+                floor = _retry_after(e)
+                if floor:
+                    dep.budget.block(floor)
+                if attempt >= self.max_retries:
+                    raise
+                RETRIES.inc(1, reason)
+                time.sleep(self._backoff(attempt, floor))
+                attempt += 1
+                continue
+            dep.breaker.success()
+            return result
+
+    def _candidates(self) -> List[_Deployment]:
+        healthy = [d for d in self.deployments if d.breaker.available()]
+        if not healthy:
+            wait_s = min(d.breaker.retry_after() for d in self.deployments)
+            raise CircuitOpen("Azure OpenAI no responde bien; circuito abierto.", retry_after=max(wait_s, 1.0))
+        return healthy
+
+    def _failover(self, candidates: List[_Deployment], fn: Callable[[str], T], cost: int) -> T:
+        last: Optional[Exception] = None
+        for dep in candidates:
+            if not dep.breaker.available():
+                continue
+            try:
+                return self._call(dep, fn, cost)
+            except AIUnavailable as e:
+                last = e
+            except Exception as e:
+                if _classify(e) is None:
+                    raise
+                last = e
+        if last is None:
+            raise CircuitOpen("Azure OpenAI no responde bien; circuito abierto.", retry_after=1.0)
+        raise last
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._hedge_pool is None:
+                self._hedge_pool = ThreadPoolExecutor(max_workers=env_int("AI_MAX_CONCURRENCY", 8) * 2,
+                                                      thread_name_prefix="ai-hedge")
+            return self._hedge_pool
+
+    def _hedged(self, candidates: List[_Deployment], fn: Callable[[str], T], cost: int) -> T:
+        pool = self._pool()
+        primary, backup = candidates[0], candidates[1:]
+        # Cada hilo necesita su propia copia del contexto (StageTimer del request).
+        first = pool.submit(contextvars.copy_context().run, self._call, primary, fn, cost)
+        done, _ = wait([first], timeout=self.hedge_after)
+        if done:
+            try:
+                return first.result()
+            except Exception as e:
+                if _classify(e) is None and not isinstance(e, AIUnavailable):
+                    raise
+                return self._failover(backup, fn, cost)
+        HEDGES.inc()
+        second = pool.submit(contextvars.copy_context().run, self._failover, backup, fn, cost)
+        pending: set[Future] = {first, second}
+        error: Optional[Exception] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut.exception() is None:
+                    return fut.result()
+                error = fut.exception()
+        raise error
+
+    def run(self, fn: Callable[[str], T], cost: int, hedge: bool = True) -> T:
+        """
+        Ejecuta fn(deployment) con el planificador. `cost` es el presupuesto de tokens a
+        reservar (prompt estimado + max_completion_tokens). hedge=False para streams.
+        """
+        candidates = self._candidates()
+        if hedge and self.hedge_after > 0 and len(candidates) > 1:
+            return self._hedged(candidates, fn, cost)
+        return self._failover(candidates, fn, cost)
+
+    def close(self) -> None:
+        with self._lock:
+            pool, self._hedge_pool = self._hedge_pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def configured_deployments(primary: str) -> List[str]:
+    """AZURE_OPENAI_DEPLOYMENT_LIST (separada por comas) o solo el deployment principal."""
+    listed = [d.strip() for d in os.getenv("AZURE_OPENAI_DEPLOYMENT_LIST", "").split(",") if d.strip()]
+    return listed or [primary]
+
+
+_schedulers: Dict[Tuple[str, ...], AIScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+metrics.gauge("informai_ai_circuit_open", "1 si el circuito del deployment está abierto.", ("deployment",),
+              callback=lambda: {(d.name,): float(d.breaker.state != "closed")
+                                for s in list(_schedulers.values()) for d in s.deployments})
+
+
+def get_scheduler(primary: str) -> AIScheduler:
+    """Un planificador por lista de deployments, compartido por todos los hilos del proceso."""
+    key = tuple(configured_deployments(primary))
+    scheduler = _schedulers.get(key)
+    if scheduler is None:
+        with _schedulers_lock:
+            scheduler = _schedulers.get(key)
+            if scheduler is None:
+                scheduler = _schedulers[key] = AIScheduler(list(key))
+    return scheduler
+
+
+def close_schedulers() -> None:
+    with _schedulers_lock:
+        schedulers = list(_schedulers.values())
+        _schedulers.clear()
+    for scheduler in schedulers:
+        scheduler.close()
@@ -0,0 +1,33 @@
+# Contrato común de los backends de caché
+
+from abc import ABC, abstractmethod
+from typing import Optional
+
+
+class CacheBackend(ABC):
+    """Caché clave → bytes con TTL. Los backends deciden cómo desalojar por tamaño."""
+
+    name = "base"
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """Devuelve el valor o None si no existe o expiró."""
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl_s: Optional[float] = None) -> None:
+        """Guarda el valor; ttl_s=None usa el TTL por defecto del backend."""
+
+    def close(self) -> None:
+        pass
+
+
+class NullCache(CacheBackend):
+    """Caché deshabilitada (CACHE_BACKEND=none): nunca hay aciertos."""
+
+    name = "none"
+
+    def get(self, key: str) -> Optional[bytes]:
+        return None
+
+    def set(self, key: str, value: bytes, ttl_s: Optional[float] = None) -> None:
+        pass
@@ -0,0 +1,50 @@
+# Selección del backend de caché según variables de entorno
+
+import os
+import threading
+from typing import Optional
+
+from src.core.env import env_float, env_int
+from src.infrastructure.cache.base import CacheBackend, NullCache
+
+
+_cache: Optional[CacheBackend] = None
+_lock = threading.Lock()
+
+
+def build_cache() -> CacheBackend:
+    """CACHE_BACKEND: memory (por defecto) | sqlite | redis | none."""
+    backend = os.getenv("CACHE_BACKEND", "memory").strip().lower()
+    ttl_s = env_float("CACHE_TTL_S", 24 * 3600.0)
+    max_entries = env_int("CACHE_MAX_ENTRIES", 1024)
+    max_bytes = env_int("CACHE_MAX_MB", 256) * 1024 * 1024
+    if backend == "none":
+        return NullCache()
+    if backend == "sqlite":
+        from src.infrastructure.cache.sqlite_cache import SqliteCache
+        path = os.getenv("CACHE_SQLITE_PATH", ".cache/analysis-cache.sqlite3")
+        return SqliteCache(path, ttl_s, max_entries, max_bytes)
+    if backend == "redis":
+        from src.infrastructure.cache.redis_cache import RedisCache
+        return RedisCache(os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0"), ttl_s)
+    if backend != "memory":
+        raise RuntimeError(f"CACHE_BACKEND desconocido: {backend}")
+    from src.infrastructure.cache.memory import MemoryCache
+    return MemoryCache(ttl_s, max_entries, max_bytes)
+
+
+def get_cache() -> CacheBackend:
+    global _cache
+    if _cache is None:
+        with _lock:
+            if _cache is None:
+                _cache = build_cache()
+    return _cache
+
+
+def close_cache() -> None:
+    global _cache
+    with _lock:
+        if _cache is not None:
+            _cache.close()
+            _cache = None
@@ -0,0 +1,33 @@
+# Caché en Redis (o compatible) para compartir resultados entre máquinas
+
+from typing import Optional
+
+from src.infrastructure.cache.base import CacheBackend
+
+
+class RedisCache(CacheBackend):
+    """
+    TTL nativo de Redis. El desalojo por tamaño lo hace el servidor
+    (configura maxmemory + maxmemory-policy=allkeys-lru).
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, ttl_s: float, prefix: str = "pa:"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requiere el paquete 'redis' instalado.")
+        self.ttl_s = ttl_s
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes, ttl_s: Optional[float] = None) -> None:
+        ttl = self.ttl_s if ttl_s is None else ttl_s
+        self._client.set(self.prefix + key, value, px=max(int(ttl * 1000), 1))
+
+    def close(self) -> None:
+        self._client.close()
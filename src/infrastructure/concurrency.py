@@ -0,0 +1,195 @@
+# Ejecutores acotados para sacar del event loop el trabajo pesado (parseo e IA)
+
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from src.core import metrics
+from src.core.env import env_int
+
+
+class Saturated(Exception):
+    """El pool alcanzó su límite de trabajos en curso + en cola; el cliente debe reintentar."""
+
+    def __init__(self, pool: str, retry_after: int):
+        super().__init__(f"Pool '{pool}' saturado; reintenta en {retry_after} s.")
+        self.pool = pool
+        self.retry_after = retry_after
+
+
+class BoundedExecutor:
+    """
+    Ejecuta funciones bloqueantes fuera del event loop con admisión acotada.
+
+    Acepta hasta `max_workers` trabajos en ejecución y `max_queue` esperando; por encima
+    de eso `run()` lanza Saturated de inmediato (backpressure) en lugar de encolar sin fin.
+    kind: "process" (CPU), "thread" (I/O) o "inline" (sin pool; útil en pruebas).
+    """
+
+    def __init__(self, name: str, kind: str, max_workers: int, max_queue: int, retry_after: int = 5):
+        self.name = name
+        self.kind = kind
+        self.max_workers = max(max_workers, 1)
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.pending = 0
+        self._executor: Optional[Executor] = None
+        self._freed: Optional[asyncio.Condition] = None
+        self._freed_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self._executor is None and self.kind != "inline":
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix=f"{self.name}-worker")
+        return self._executor
+
+    def _condition(self) -> asyncio.Condition:
+        # La condición queda atada al event loop que la usa por primera vez.
+        loop = asyncio.get_running_loop()
+        if self._freed is None or self._freed_loop is not loop:
+            self._freed = asyncio.Condition()
+            self._freed_loop = loop
+        return self._freed
+
+    def _has_room(self, n: int = 1) -> bool:
+        return self.pending + n <= self.max_workers + self.max_queue
+
+    async def _admit(self, n: int, wait: bool) -> None:
+        """Reserva `n` lugares de una vez, o ninguno: Saturated (wait=False) o espera a que haya."""
+        if not self._has_room(n):
+            if not wait:
+                raise Saturated(self.name, self.retry_after)
+            freed = self._condition()
+            async with freed:
+                await freed.wait_for(lambda: self._has_room(n))
+        self.pending += n
+
+    async def _release(self, n: int) -> None:
+        self.pending -= n
+        if self._freed is not None and self._freed_loop is asyncio.get_running_loop():
+            async with self._freed:
+                # Puede haber esperando un lote que necesita varios lugares: se despierta a todos.
+                self._freed.notify_all()
+
+    def _submit(self, executor: Executor, fn: Callable[..., Any], args: Sequence[Any]):
+        if self.kind == "thread":
+            # Como asyncio.to_thread: el hilo ve el contexto del request (StageTimer actual).
+            fn, args = functools.partial(contextvars.copy_context().run, fn, *args), ()
+        return executor.submit(fn, *args)
+
+    async def run(self, fn: Callable[..., Any], *args: Any, wait: bool = False) -> Any:
+        """
+        Ejecuta fn(*args) en el pool. Si está lleno: wait=False lanza Saturated (peticiones
+        interactivas); wait=True espera un hueco (lotes y jobs que ya fueron aceptados).
+        """
+        await self._admit(1, wait)
+        try:
+            executor = self._get_executor()
+            if executor is None:
+                return fn(*args)
+            return await asyncio.wrap_future(self._submit(executor, fn, args))
+        finally:
+            await self._release(1)
+
+    async def run_all(self, fn: Callable[..., Any], calls: Sequence[Sequence[Any]], wait: bool = False,
+                      on_done: Optional[Callable[[int], None]] = None) -> List[Any]:
+        """
+        fn(*args) por cada elemento de `calls`, admitidos como un todo: se reservan todos los
+        lugares antes de enviar nada (Saturated sin haber empezado ninguno). Si uno falla, se
+        cancelan los que no arrancaron y se espera a los que están corriendo antes de propagar
+        el error: al volver, ningún worker sigue usando los argumentos (p. ej. un temporal).
+        on_done(i) avisa cuando termina calls[i]. len(calls) no debe superar max_workers + max_queue.
+        """
+        await self._admit(len(calls), wait)
+        executor = self._get_executor()
+        if executor is None:
+            try:
+                results = []
+                for i, args in enumerate(calls):
+                    results.append(fn(*args))
+                    if on_done is not None:
+                        on_done(i)
+                return results
+            finally:
+                await self._release(len(calls))
+
+        submitted: list = []
+
+        async def collect(i: int) -> Any:
+            try:
+                result = await asyncio.wrap_future(submitted[i])
+            finally:
+                await self._release(1)
+            if on_done is not None:
+                on_done(i)
+            return result
+
+        tasks: List[asyncio.Task] = []
+        try:
+            for args in calls:
+                submitted.append(self._submit(executor, fn, args))
+            tasks = [asyncio.ensure_future(collect(i)) for i in range(len(submitted))]
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for future in submitted:
+                future.cancel()  # solo afecta a los que siguen en cola
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # Si nos cancelaron, los collect ya cortaron: se espera a los workers mismos.
+            await asyncio.gather(*(asyncio.wrap_future(f) for f in submitted), return_exceptions=True)
+            await self._release(len(calls) - len(tasks))  # los lugares que nunca llegaron a un collect
+            raise
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# --------------------------- Pools de la aplicación -------------------------- #
+
+_pools: Dict[str, BoundedExecutor] = {}
+
+metrics.gauge("informai_pool_pending", "Trabajos en curso o en cola por pool.", ("pool",),
+              callback=lambda: {(name,): float(pool.pending) for name, pool in list(_pools.items())})
+
+
+def parse_pool() -> BoundedExecutor:
+    """Pool de parseo (CPU). PARSE_EXECUTOR=process|thread|inline, PARSE_WORKERS, PARSE_MAX_QUEUE."""
+    pool = _pools.get("parse")
+    if pool is None:
+        workers = env_int("PARSE_WORKERS", min(os.cpu_count() or 1, 4), minimum=0)
+        pool = _pools["parse"] = BoundedExecutor(
+            "parse",
+            os.getenv("PARSE_EXECUTOR", "process").strip().lower(),
+            max_workers=workers,
+            max_queue=env_int("PARSE_MAX_QUEUE", workers * 2, minimum=0),
+            retry_after=env_int("BUSY_RETRY_AFTER_S", 5, minimum=0),
+        )
+    return pool
+
+
+def ai_pool() -> BoundedExecutor:
+    """Pool de llamadas a la IA (I/O). AI_MAX_CONCURRENCY, AI_MAX_QUEUE."""
+    pool = _pools.get("ai")
+    if pool is None:
+        workers = env_int("AI_MAX_CONCURRENCY", 8, minimum=0)
+        pool = _pools["ai"] = BoundedExecutor(
+            "ai",
+            "thread",
+            max_workers=workers,
+            max_queue=env_int("AI_MAX_QUEUE", workers * 4, minimum=0),
+            retry_after=env_int("BUSY_RETRY_AFTER_S", 5, minimum=0),
+        )
+    return pool
+
+
+def shutdown_pools() -> None:
+    for pool in _pools.values():
+        pool.shutdown()
+    _pools.clear()
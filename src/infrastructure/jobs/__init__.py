@@ -0,0 +1 @@
+# marcador de paquete
\ No newline at end of file
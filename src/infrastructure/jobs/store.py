@@ -0,0 +1,111 @@
+# Persistencia local (SQLite) del estado de los jobs asíncronos
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    phase TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    content_type TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    content_sha256 TEXT NOT NULL,
+    upload_path TEXT NOT NULL,
+    bytes_processed INTEGER NOT NULL DEFAULT 0,
+    rows_processed INTEGER,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+"""
+
+# Estados: queued → running → done | failed. La fase detalla el trabajo en curso.
+PENDING_STATUSES = ("queued", "running")
+
+
+class JobStore:
+    """Tabla de jobs en SQLite (WAL): la escriben el proceso web y los workers de parseo."""
+
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def _exec(self, sql: str, params: tuple = ()) -> None:
+        # Solo escrituras: las lecturas traen las filas dentro del lock (el cursor comparte la conexión).
+        with self._lock:
+            self._conn.execute(sql, params)
+
+    def create(self, job_id: str, filename: str, content_type: str, size: int,
+               content_sha256: str, upload_path: str) -> None:
+        now = time.time()
+        self._exec(
+            "INSERT INTO jobs (id, status, phase, filename, content_type, size, content_sha256, upload_path,"
+            " created_at, updated_at) VALUES (?, 'queued', 'queued', ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, filename, content_type, size, content_sha256, upload_path, now, now))
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        if "result" in fields and not isinstance(fields["result"], (str, type(None))):
+            fields["result"] = json.dumps(fields["result"], ensure_ascii=False)
+        if "error" in fields and not isinstance(fields["error"], (str, type(None))):
+            fields["error"] = json.dumps(fields["error"], ensure_ascii=False)
+        fields["updated_at"] = time.time()
+        cols = ", ".join(f"{k} = ?" for k in fields)
+        self._exec(f"UPDATE jobs SET {cols} WHERE id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            cur = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+            row = cur.fetchone()
+            if row is None:
+                return None
+            job = dict(zip([c[0] for c in cur.description], row))
+        for key in ("result", "error"):
+            if job[key] is not None:
+                job[key] = json.loads(job[key])
+        return job
+
+    def pending(self) -> List[str]:
+        """Jobs sin terminar (incluye los que estaban corriendo al caerse el proceso)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?) ORDER BY created_at", PENDING_STATUSES).fetchall()
+        return [r[0] for r in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_stores: Dict[str, JobStore] = {}
+_stores_lock = threading.Lock()
+
+
+def store_at(path: str) -> JobStore:
+    """Una conexión por ruta y proceso (los workers de parseo abren la suya)."""
+    store = _stores.get(path)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(path)
+            if store is None:
+                store = _stores[path] = JobStore(path)
+    return store
+
+
+def close_stores() -> None:
+    with _stores_lock:
+        for store in _stores.values():
+            store.close()
+        _stores.clear()
@@ -0,0 +1 @@
+# marcador de paquete
@@ -0,0 +1,182 @@
+# Historial local (SQLite) de corridas para comparar contra una línea base
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from src.core.env import env_float
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    key TEXT PRIMARY KEY,
+    service TEXT NOT NULL,
+    tag TEXT,
+    run_id TEXT NOT NULL,
+    tool TEXT NOT NULL,
+    analysis_id TEXT,
+    summary TEXT NOT NULL,
+    flags TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_service ON runs (service, created_at);
+CREATE INDEX IF NOT EXISTS runs_service_tag ON runs (service, tag, created_at);
+CREATE TABLE IF NOT EXISTS run_labels (
+    run_key TEXT NOT NULL,
+    label TEXT NOT NULL,
+    sketch TEXT NOT NULL,
+    PRIMARY KEY (run_key, label)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS series (
+    analysis_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS series_created ON series (created_at);
+"""
+
+
+def runs_db_path() -> str:
+    return os.getenv("RUNS_DB_PATH", ".runs/runs.sqlite3")
+
+
+def series_retention_s() -> float:
+    return env_float("TIMESERIES_RETENTION_HOURS", 24.0, minimum=0.0) * 3600.0
+
+
+class RunStore:
+    """
+    Corridas indexadas por (service, tag, fecha). El summary va en `runs` y los sketches
+    por label en `run_labels`, así elegir la línea base es una consulta por índice y
+    comparar solo carga las dos corridas involucradas, aunque haya miles guardadas.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def add(self, key: str, service: str, tag: Optional[str], summary: Dict[str, Any], flags: Dict[str, Any],
+            analysis_id: Optional[str], sketches: Dict[str, Dict[str, Any]]) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "INSERT INTO runs (key, service, tag, run_id, tool, analysis_id, summary, flags, created_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, service, tag, summary["run_id"], summary["tool"], analysis_id,
+                     json.dumps(summary, ensure_ascii=False), json.dumps(flags, ensure_ascii=False), time.time()))
+                self._conn.executemany(
+                    "INSERT INTO run_labels (run_key, label, sketch) VALUES (?, ?, ?)",
+                    [(key, label, json.dumps(sk, separators=(",", ":"))) for label, sk in sketches.items()])
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            cur = self._conn.execute("SELECT * FROM runs WHERE key = ?", (key,))
+            row = cur.fetchone()
+            if row is None:
+                return None
+            run = dict(zip([c[0] for c in cur.description], row))
+        run["summary"] = json.loads(run["summary"])
+        run["flags"] = json.loads(run["flags"])
+        return run
+
+    def sketches(self, key: str) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT label, sketch FROM run_labels WHERE run_key = ?", (key,)).fetchall()
+        return {label: json.loads(sk) for label, sk in rows}
+
+    def latest(self, service: str, tag: Optional[str] = None, exclude: Optional[str] = None,
+               before: Optional[float] = None) -> Optional[str]:
+        """
+        Corrida más reciente del servicio (y tag, si se indica), sin contar `exclude`.
+        Con `before` (created_at de otra corrida), solo las creadas antes que ella.
+        """
+        sql = "SELECT key FROM runs WHERE service = ?"
+        params: list = [service]
+        if tag is not None:
+            sql += " AND tag = ?"
+            params.append(tag)
+        if exclude is not None:
+            sql += " AND key != ?"
+            params.append(exclude)
+        if before is not None:
+            sql += " AND created_at < ?"
+            params.append(before)
+        sql += " ORDER BY created_at DESC LIMIT 1"
+        with self._lock:
+            row = self._conn.execute(sql, params).fetchone()
+        return row[0] if row else None
+
+    def list(self, service: Optional[str] = None, tag: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        sql = "SELECT key, service, tag, run_id, tool, analysis_id, created_at FROM runs"
+        clauses, params = [], []
+        if service is not None:
+            clauses.append("service = ?")
+            params.append(service)
+        if tag is not None:
+            clauses.append("tag = ?")
+            params.append(tag)
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            cur = self._conn.execute(sql, params)
+            cols = [c[0] for c in cur.description]
+            return [dict(zip(cols, row)) for row in cur.fetchall()]
+
+    def put_series(self, analysis_id: str, data: str) -> None:
+        """Serie de tiempo de un análisis; las más viejas que TIMESERIES_RETENTION_HOURS se borran."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO series (analysis_id, data, created_at) VALUES (?, ?, ?)",
+                               (analysis_id, data, now))
+            self._conn.execute("DELETE FROM series WHERE created_at < ?", (now - series_retention_s(),))
+
+    def get_series(self, analysis_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM series WHERE analysis_id = ? AND created_at >= ?",
+                                     (analysis_id, time.time() - series_retention_s())).fetchone()
+        return row[0] if row else None
+
+    def has_series(self, analysis_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM series WHERE analysis_id = ? AND created_at >= ?",
+                                     (analysis_id, time.time() - series_retention_s())).fetchone()
+        return row is not None
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_store: Optional[RunStore] = None
+_store_lock = threading.Lock()
+
+
+def get_run_store() -> RunStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = RunStore(runs_db_path())
+    return _store
+
+
+def close_run_store() -> None:
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+            _store = None
@@ -0,0 +1,315 @@
+"""
+Backend columnar (NumPy) para resultados de JMeter.
+
+El CSV se lee por bloques alineados a salto de línea y se tokeniza a nivel de bytes:
+las posiciones de comas y saltos se ubican con NumPy, `timeStamp`/`elapsed` se
+convierten a enteros con aritmética vectorizada y `label`/`success` se codifican con
+np.unique sobre vistas de ancho fijo. La agregación por label usa lexsort + bincount +
+reduceat. Los bloques con comillas (campos con comas escapadas) pasan por csv.reader.
+
+Cada bloque se agrega y se descarta: por label se vuelca en los mismos LabelAccumulator
+(y QuantileSketch) que usa el backend en Python puro, así que la memoria no crece con las
+filas, PERCENTILE_MODE aplica igual y el Summary coincide con el de ese backend.
+"""
+import csv, io, mmap
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from src.domain.summary_contract import Summary
+from src.core.aggregation import LabelAccumulator
+from src.core.io_utils import Source, as_stream
+from src.core.timeseries import TimeSeries
+from src.core.labels import LabelNormalizer
+from src.core.metrics import stage
+from src.services.jmeter_summary import _to_bool, summarize_jmeter
+
+_BLOCK_BYTES = 4 * 1024 * 1024
+_MAX_INT_DIGITS = 18
+_MAX_KEY_BYTES = 512
+_POW10 = 10 ** np.arange(_MAX_INT_DIGITS, dtype=np.int64)
+
+# (timestamps, claves de label, índice por fila, elapsed, ok)
+_Block = Tuple[np.ndarray, List[str], np.ndarray, np.ndarray, np.ndarray]
+
+def _iter_blocks(source: Source) -> Iterator[Tuple[Union[bytes, memoryview], bool]]:
+    """
+    Entrega (bloque, tiene_comillas) con bloques que terminan en salto de línea
+    (el último puede no tenerlo). Sobre bytes o mmap los bloques son vistas sin copia.
+    """
+    if isinstance(source, (bytes, bytearray, mmap.mmap)):
+        with memoryview(source) as view:
+            pos, n = 0, len(source)
+            while pos < n:
+                end = min(pos + _BLOCK_BYTES, n)
+                if end < n:
+                    cut = source.rfind(b"\n", pos, end)
+                    if cut < 0:
+                        cut = source.find(b"\n", end)
+                    end = n if cut < 0 else cut + 1
+                with view[pos:end] as block:
+                    yield block, source.find(b'"', pos, end) >= 0
+                pos = end
+        return
+    stream = as_stream(source)
+    carry = b""
+    while True:
+        block = stream.read(_BLOCK_BYTES)
+        if not block:
+            if carry:
+                yield carry, b'"' in carry
+            return
+        block = carry + block
+        cut = block.rfind(b"\n")
+        if cut < 0:
+            carry = block
+            continue
+        carry = block[cut + 1:]
+        block = block[:cut + 1]
+        yield block, b'"' in block
+
+def _gather(buf: np.ndarray, start: np.ndarray, length: np.ndarray, width: int) -> np.ndarray:
+    """Matriz (filas x width) con los bytes de cada campo, rellenada con ceros."""
+    cols = np.arange(width)
+    mask = cols < length[:, None]
+    idx = np.where(mask, start[:, None] + cols, 0)
+    out = buf[idx]
+    out[~mask] = 0
+    return out
+
+def _parse_ints(buf: np.ndarray, start: np.ndarray, end: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Enteros decimales sin signo; devuelve (valores, válidos). Lo demás queda inválido."""
+    length = end - start
+    n = len(start)
+    if n == 0:
+        return np.zeros(0, np.int64), np.zeros(0, bool)
+    width = int(length.max())
+    if width == 0 or width > _MAX_INT_DIGITS:
+        return np.zeros(n, np.int64), np.zeros(n, bool)
+    digits = _gather(buf, start, length, width).astype(np.int64) - 48
+    mask = np.arange(width) < length[:, None]
+    valid = (length > 0) & np.all(~mask | ((digits >= 0) & (digits <= 9)), axis=1)
+    digits[~mask] = 0
+    # Peso de cada dígito según su posición desde la derecha del campo.
+    exp = np.clip(length[:, None] - 1 - np.arange(width), 0, None)
+    values = (digits * _POW10[exp]).sum(axis=1)
+    return values, valid
+
+def _encode(buf: np.ndarray, start: np.ndarray, end: np.ndarray) -> Tuple[List[str], np.ndarray]:
+    """Codifica campos de texto: (valores distintos, índice por fila)."""
+    length = end - start
+    if len(start) == 0:
+        return [], np.zeros(0, np.int64)
+    width = max(int(length.max()), 1)
+    if width > _MAX_KEY_BYTES:
+        raw = buf.tobytes()
+        keys: Dict[str, int] = {}
+        inverse = np.fromiter(
+            (keys.setdefault(raw[s:e].decode("utf-8", errors="replace"), len(keys))
+             for s, e in zip(start.tolist(), end.tolist())),
+            dtype=np.int64, count=len(start))
+        return list(keys), inverse
+    fixed = np.ascontiguousarray(_gather(buf, start, length, width)).view(f"S{width}").ravel()
+    uniq, inverse = np.unique(fixed, return_inverse=True)
+    return [u.decode("utf-8", errors="replace") for u in uniq.tolist()], inverse.ravel()
+
+def _block_fast(block: Union[bytes, memoryview], cols: Tuple[int, int, int, int], sep: str = ",") -> _Block:
+    i_ts, i_label, i_elapsed, i_ok = cols
+    need = max(cols)
+    buf = np.frombuffer(block, dtype=np.uint8)
+    newlines = np.flatnonzero(buf == 10)
+    line_end = newlines if len(buf) and buf[-1] == 10 else np.append(newlines, len(buf))
+    line_start = np.concatenate(([0], line_end[:-1] + 1))
+    commas = np.flatnonzero(buf == ord(sep))
+    first = np.searchsorted(commas, line_start)
+    n_commas = np.searchsorted(commas, line_end) - first
+    line_end = line_end - (buf[np.maximum(line_end - 1, 0)] == 13) * (line_end > line_start)
+
+    rows = np.flatnonzero(n_commas >= need)
+    first, n_commas, line_start, line_end = first[rows], n_commas[rows], line_start[rows], line_end[rows]
+
+    def field(j: int) -> Tuple[np.ndarray, np.ndarray]:
+        s = line_start if j == 0 else commas[first + j - 1] + 1
+        e = np.where(n_commas == j, line_end, commas[np.minimum(first + j, len(commas) - 1)]) \
+            if len(commas) else line_end
+        return s, e
+
+    ts_s, ts_e = field(i_ts)
+    el_s, el_e = field(i_elapsed)
+    ts, ts_ok = _parse_ints(buf, ts_s, ts_e)
+    el_int, el_ok = _parse_ints(buf, el_s, el_e)
+    elapsed = el_int.astype(np.float64)
+
+    # Los valores que no son enteros simples se resuelven como lo haría int()/float().
+    for arr, ok_mask, s, e, conv in ((ts, ts_ok, ts_s, ts_e, int), (elapsed, el_ok, el_s, el_e, float)):
+        for i in np.flatnonzero(~ok_mask).tolist():
+            try:
+                arr[i] = conv(bytes(block[s[i]:e[i]]))
+                ok_mask[i] = True
+            except ValueError:
+                pass
+
+    valid = ts_ok & el_ok
+    lb_s, lb_e = field(i_label)
+    ok_s, ok_e = field(i_ok)
+    if not valid.all():
+        ts, elapsed = ts[valid], elapsed[valid]
+        lb_s, lb_e, ok_s, ok_e = lb_s[valid], lb_e[valid], ok_s[valid], ok_e[valid]
+    labels, label_idx = _encode(buf, lb_s, lb_e)
+    ok_vals, ok_idx = _encode(buf, ok_s, ok_e)
+    ok = np.array([_to_bool(v) for v in ok_vals], dtype=bool)[ok_idx] if ok_vals else np.zeros(0, bool)
+    return ts, labels, label_idx, elapsed, ok
+
+def _block_csv(block: Union[bytes, memoryview], cols: Tuple[int, int, int, int], sep: str = ",") -> _Block:
+    i_ts, i_label, i_elapsed, i_ok = cols
+    width = max(cols) + 1
+    ts: List[int] = []
+    elapsed: List[float] = []
+    keys: Dict[str, int] = {}
+    label_idx: List[int] = []
+    ok: List[bool] = []
+    for row in csv.reader(io.StringIO(str(block, "utf-8", errors="replace"), newline=""), delimiter=sep):
+        if len(row) < width:
+            continue
+        try:
+            t = int(row[i_ts])
+            e = float(row[i_elapsed])
+        except ValueError:
+            continue
+        ts.append(t)
+        elapsed.append(e)
+        label_idx.append(keys.setdefault(row[i_label], len(keys)))
+        ok.append(_to_bool(row[i_ok]))
+    return (np.array(ts, dtype=np.int64), list(keys), np.array(label_idx, dtype=np.int64),
+            np.array(elapsed, dtype=np.float64), np.array(ok, dtype=bool))
+
+def _first_seen(idx: np.ndarray) -> List[int]:
+    """Claves del bloque (índices) en el orden en que aparecen por primera vez en las filas del bloque."""
+    # Cada clave del bloque aparece en al menos una fila: np.unique devuelve una posición por clave.
+    _, first = np.unique(idx, return_index=True)
+    return np.argsort(first, kind="stable").tolist()
+
+def _accumulate(buckets: Dict[str, LabelAccumulator], names: List[str], codes: np.ndarray,
+                ts: np.ndarray, elapsed: np.ndarray, ok: np.ndarray) -> None:
+    """Vuelca un bloque en los acumuladores por label: conteos y extremos con reduceat, latencias por grupo."""
+    order = np.argsort(codes, kind="stable")
+    present, starts, counts = np.unique(codes[order], return_index=True, return_counts=True)
+    elapsed, ts = elapsed[order], ts[order]
+    failures = np.add.reduceat((~ok[order]).astype(np.int64), starts)
+    ts_min, ts_max = np.minimum.reduceat(ts, starts), np.maximum.reduceat(ts, starts)
+    lo, hi = np.minimum.reduceat(elapsed, starts), np.maximum.reduceat(elapsed, starts)
+    for j, code in enumerate(present.tolist()):
+        name = names[code]
+        acc = buckets.get(name)
+        if acc is None:
+            acc = buckets[name] = LabelAccumulator()
+        n = int(counts[j])
+        acc.add_block(n, int(failures[j]), int(ts_min[j]), int(ts_max[j]))
+        group = elapsed[starts[j]:starts[j] + n]
+        sketch = acc.latencies
+        if sketch.is_exact and sketch.count + n <= sketch.exact_limit:
+            sketch.add_block(n, float(lo[j]), float(hi[j]), values=group.tolist())
+            continue
+        positive = group[group > 0.0]
+        keys, key_counts = np.unique(np.ceil(np.log(positive) * sketch.inv_log_gamma).astype(np.int64),
+                                     return_counts=True)
+        sketch.add_block(n, float(lo[j]), float(hi[j]), zero=n - len(positive),
+                         bins=dict(zip(keys.tolist(), key_counts.tolist())))
+
+def fill_series(series: TimeSeries, ts: np.ndarray, codes: np.ndarray, elapsed: np.ndarray,
+                ok: np.ndarray, labels: List[str]) -> None:
+    """Agrega las ventanas por (label, ventana, cubeta) con operaciones vectorizadas."""
+    if not len(ts) or not series.enabled:
+        return
+    series.reserve(int(ts.min()), int(ts.max()))
+    width = series.window_ms
+    win = ts // width
+    w_lo = int(win.min())
+    n_win = int(win.max()) - w_lo + 1
+    group = codes.astype(np.int64) * n_win + (win - w_lo)
+    groups, inv, counts = np.unique(group, return_inverse=True, return_counts=True)
+    inv = inv.ravel()
+    fails = np.bincount(inv, weights=~ok, minlength=len(groups)).astype(np.int64)
+    positive = elapsed > 0.0
+    zeros = np.bincount(inv, weights=~positive, minlength=len(groups)).astype(np.int64)
+    order = np.argsort(inv, kind="stable")
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    mins = np.minimum.reduceat(elapsed[order], starts)
+    maxs = np.maximum.reduceat(elapsed[order], starts)
+
+    bins: List[Dict[int, int]] = [{} for _ in range(len(groups))]
+    if positive.any():
+        keys = np.ceil(np.log(elapsed[positive]) * series.inv_log_gamma).astype(np.int64)
+        k_lo = int(keys.min())
+        span = int(keys.max()) - k_lo + 1
+        pairs, pair_counts = np.unique(inv[positive].astype(np.int64) * span + (keys - k_lo), return_counts=True)
+        for pair, c in zip(pairs.tolist(), pair_counts.tolist()):
+            g, k = divmod(pair, span)
+            bins[g][k + k_lo] = c
+
+    for j, g in enumerate(groups.tolist()):
+        code, w = divmod(g, n_win)
+        series.add_window(labels[code], (w + w_lo) * width, int(counts[j]), int(fails[j]), int(zeros[j]),
+                          float(mins[j]), float(maxs[j]), bins[j])
+
+def aggregate_jmeter_columnar(source: Source, series: Optional[TimeSeries] = None,
+                              labels: Optional[LabelNormalizer] = None,
+                              delimiter: str = ",") -> Dict[str, LabelAccumulator]:
+    """
+    Equivalente vectorizado de jmeter_summary.aggregate_jmeter: mismos acumuladores por label.
+    La normalización se aplica a las labels únicas de cada bloque, en el orden en que aparecen
+    por primera vez, así el tope MAX_LABELS admite las mismas labels que fila por fila.
+    `delimiter` es el separador de columnas de un solo byte (coma, punto y coma, tab...).
+    """
+    normalize = labels if labels is not None else LabelNormalizer()
+    blocks = _iter_blocks(source)
+    first, first_quoted = next(blocks, (b"", False))
+    # Solo el primer bloque se copia para separar la cabecera; el resto se procesa como vista.
+    first = bytes(first)
+    nl = first.find(b"\n")
+    header_line, first = (first, b"") if nl < 0 else (first[:nl + 1], first[nl + 1:])
+    headers = next(csv.reader(io.StringIO(header_line.decode("utf-8-sig", errors="replace"), newline=""),
+                              delimiter=delimiter), [])
+    required = {"timeStamp", "label", "elapsed", "success"}
+    missing = [h for h in required if h not in headers]
+    if missing:
+        raise KeyError(f"Archivo JMeter incompleto. Faltan columnas: {missing}")
+    cols = (headers.index("timeStamp"), headers.index("label"), headers.index("elapsed"), headers.index("success"))
+
+    buckets: Dict[str, LabelAccumulator] = {}
+    label_ids: Dict[str, int] = {}
+    names: List[str] = []
+    add_windows = series is not None and series.enabled
+
+    def consume(block: Union[bytes, memoryview], quoted: bool) -> None:
+        if not len(block):
+            return
+        parse = _block_csv if quoted else _block_fast
+        ts, keys, idx, elapsed, ok = parse(block, cols, delimiter)
+        if not len(ts):
+            return
+        remap = np.empty(len(keys), dtype=np.int32)
+        for k in _first_seen(idx):
+            label = normalize(keys[k])
+            code = label_ids.get(label)
+            if code is None:
+                code = label_ids[label] = len(names)
+                names.append(label)
+            remap[k] = code
+        codes = remap[idx]
+        _accumulate(buckets, names, codes, ts, elapsed, ok)
+        if add_windows:
+            fill_series(series, ts, codes, elapsed, ok, names)
+
+    consume(first, first_quoted and b'"' in first)
+    for block, quoted in blocks:
+        consume(block, quoted)
+    return buckets
+
+def build_summary_from_jmeter_columnar(source: Source, series: Optional[TimeSeries] = None,
+                                       delimiter: str = ",") -> Tuple[Summary, Dict[str, bool]]:
+    normalize = LabelNormalizer()
+    with stage("parse"):
+        buckets = aggregate_jmeter_columnar(source, series, normalize, delimiter)
+    with stage("aggregate"):
+        return summarize_jmeter(buckets, normalize.capped)
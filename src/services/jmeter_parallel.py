@@ -0,0 +1,121 @@
+"""
+Parseo de JMeter en paralelo por rangos de bytes.
+
+El archivo se parte en rangos alineados a salto de línea (la cabecera se lee una vez y se
+comparte, ver plan_ranges); cada rango es un trabajo del pool de parseo compartido
+(analyze_service lo reparte, así rige la misma admisión acotada que para los uploads): el
+worker mapea el archivo, recorre su rango con aggregate_jmeter y devuelve acumuladores por
+label (conteos, fallos, extremos de tiempo y sketch de latencias) más sus ventanas de tiempo.
+Los parciales se fusionan en el orden de los rangos (finish_partials), así que el Summary
+coincide con el serial salvo por el error acotado del sketch.
+
+Igual que el backend columnar, los cortes caen en saltos de línea: no se admiten campos
+entre comillas con saltos de línea adentro. Con más de MAX_LABELS labels distintas cada
+worker aplica su propio tope, así que qué filas caen en "(otras operaciones)" puede
+diferir del recorrido serial (las labels conservadas son las mismas).
+"""
+import csv, io
+from typing import Dict, List, Optional, Tuple
+from src.domain.summary_contract import Summary
+from src.core.aggregation import LabelAccumulator
+from src.core.env import env_int
+from src.core.io_utils import open_mapped
+from src.core.labels import OVERFLOW_LABEL, LabelNormalizer
+from src.core.timeseries import TimeSeries
+from src.services.jmeter_summary import aggregate_jmeter, summarize_jmeter
+
+# Resultado de un rango: (acumuladores por label, ventanas de tiempo, ¿se topó MAX_LABELS?)
+_Partial = Tuple[Dict[str, LabelAccumulator], Optional[TimeSeries], bool]
+
+def parallel_workers(size: int) -> int:
+    """
+    Workers para un archivo de `size` bytes: JMETER_PARALLEL_WORKERS (0 = serial) si el
+    archivo supera JMETER_PARALLEL_MIN_MB; por debajo el costo de repartir no compensa.
+    """
+    workers = env_int("JMETER_PARALLEL_WORKERS", 0, minimum=0)
+    if workers < 2 or size < env_int("JMETER_PARALLEL_MIN_MB", 64, minimum=0) * 1024 * 1024:
+        return 1
+    return workers
+
+def split_ranges(mapped, start: int, parts: int) -> List[Tuple[int, int]]:
+    """Hasta `parts` rangos [inicio, fin) desde `start`, cada uno terminado en salto de línea."""
+    n = len(mapped)
+    bounds = [start]
+    for i in range(1, parts):
+        target = start + (n - start) * i // parts
+        if target <= bounds[-1]:
+            continue
+        cut = mapped.find(b"\n", target)
+        if cut < 0:
+            break
+        bounds.append(cut + 1)
+    bounds.append(n)
+    return [(lo, hi) for lo, hi in zip(bounds, bounds[1:]) if hi > lo]
+
+def aggregate_range(path: str, start: int, end: int, headers: List[str],
+                    window_ms: int, max_windows: int, delimiter: str = ",") -> _Partial:
+    """Punto de entrada del worker: agrega las filas del rango [start, end) del archivo."""
+    labels = LabelNormalizer()
+    series = TimeSeries(window_ms, max_windows) if window_ms > 0 else None
+    with open_mapped(path) as mapped, memoryview(mapped) as view, view[start:end] as chunk:
+        buckets = aggregate_jmeter(chunk, series, labels, headers=headers, delimiter=delimiter)
+    return buckets, series, labels.capped
+
+def _relabel(series: TimeSeries, renamed: Dict[str, str]) -> None:
+    for old, new in renamed.items():
+        moved = series.labels.pop(old, None)
+        if moved is None:
+            continue
+        for idx, req, fail, zeros, lo, hi, bins in moved.windows():
+            series.add_window(new, idx * series.window_ms, req, fail, zeros, lo, hi, bins)
+
+def merge_partials(partials: List[_Partial], series: Optional[TimeSeries] = None,
+                   max_labels: Optional[int] = None) -> Tuple[Dict[str, LabelAccumulator], bool]:
+    """
+    Fusiona los parciales en orden de rango. Las labels se admiten en orden de primera
+    aparición, como en el recorrido serial: pasado MAX_LABELS, las nuevas caen en
+    OVERFLOW_LABEL (acumuladores y ventanas). Devuelve (acumuladores, ¿se topó el límite?).
+    """
+    limit = max_labels if max_labels is not None else LabelNormalizer(rules=()).max_labels
+    buckets: Dict[str, LabelAccumulator] = {}
+    kept = 0
+    capped = False
+    for part_buckets, part_series, part_capped in partials:
+        capped = capped or part_capped
+        renamed: Dict[str, str] = {}
+        for label, acc in part_buckets.items():
+            if label not in buckets and label != OVERFLOW_LABEL:
+                if kept >= limit:
+                    renamed[label] = label = OVERFLOW_LABEL
+                    capped = True
+                else:
+                    kept += 1
+            target = buckets.get(label)
+            if target is None:
+                buckets[label] = acc
+            else:
+                target.merge(acc)
+        if series is not None and part_series is not None:
+            if renamed:
+                _relabel(part_series, renamed)
+            series.merge(part_series)
+    return buckets, capped
+
+def plan_ranges(path: str, workers: int, delimiter: str = ",") -> Tuple[List[str], List[Tuple[int, int]]]:
+    """(columnas de la cabecera, rangos [inicio, fin) de datos) para repartir entre `workers`."""
+    with open_mapped(path) as mapped:
+        nl = mapped.find(b"\n")
+        header_line = bytes(mapped[:nl if nl >= 0 else len(mapped)])
+        ranges = split_ranges(mapped, nl + 1, workers) if nl >= 0 else []
+    text = header_line.decode("utf-8-sig", errors="replace")
+    headers = next(csv.reader(io.StringIO(text, newline=""), delimiter=delimiter), [])
+    required = {"timeStamp", "label", "elapsed", "success"}
+    missing = [h for h in required if h not in headers]
+    if missing:
+        raise KeyError(f"Archivo JMeter incompleto. Faltan columnas: {missing}")
+    return headers, ranges
+
+def finish_partials(partials: List[_Partial], series: Optional[TimeSeries] = None) -> Tuple[Summary, Dict[str, bool]]:
+    """Summary a partir de los parciales en orden de rango; las ventanas se fusionan en `series`."""
+    buckets, capped = merge_partials(partials, series)
+    return summarize_jmeter(buckets, capped)
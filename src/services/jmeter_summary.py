@@ -1,88 +1,113 @@
-import csv, io, time
-from typing import Dict, Any, List, Tuple
-from src.domain.summary_contract import Summary, OverallMetrics, MethodMetrics, Latency
-from src.core.percentiles import percentile
-from src.core.time_utils import duration_ms_from_timestamps
+import csv, io, os, time
+from typing import Dict, List, Optional, Tuple
+from src.domain.summary_contract import Summary, OverallMetrics
+from src.core.aggregation import LabelAccumulator
+from src.core.io_utils import Source, as_stream, owns_stream
+from src.core.timeseries import TimeSeries
+from src.core.labels import LabelNormalizer
+from src.core.metrics import stage
+
+_TRUE_VALUES = frozenset(("true", "1", "y", "yes", "t"))
 
 def _to_bool(v: str) -> bool:
     s = str(v).strip().lower()
-    return s in ("true", "1", "y", "yes", "t")
+    return s in _TRUE_VALUES
 
-def build_summary_from_jmeter(csv_bytes: bytes) -> Tuple[Summary, Dict[str, bool]]:
-    s = io.StringIO(csv_bytes.decode("utf-8", errors="replace"))
-    reader = csv.DictReader(s)
-    headers = reader.fieldnames or []
-    required = {"timeStamp", "label", "elapsed", "success"}
-    missing = [h for h in required if h not in headers]
-    if missing:
-        raise KeyError(f"Archivo JMeter incompleto. Faltan columnas: {missing}")
+def _open_text(source: Source) -> io.TextIOWrapper:
+    # Envuelve bytes, un mmap o un stream binario sin decodificarlo completo:
+    # TextIOWrapper lee y decodifica por bloques a medida que el csv.reader avanza.
+    # utf-8-sig descarta el BOM que agregan Excel y algunos exportadores (si no, la
+    # primera columna se llamaría "\ufefftimeStamp").
+    return io.TextIOWrapper(as_stream(source), encoding="utf-8-sig", errors="replace", newline="")
 
-    rows: List[Dict[str, Any]] = []
-    for row in reader:
-        try:
-            rows.append({
-                "ts": int(row["timeStamp"]),
-                "label": str(row["label"]),
-                "elapsed": float(row["elapsed"]),
-                "ok": _to_bool(row["success"])
-            })
-        except Exception:
-            continue
+def aggregate_jmeter(source: Source, series: Optional[TimeSeries] = None,
+                     labels: Optional[LabelNormalizer] = None,
+                     headers: Optional[List[str]] = None, delimiter: str = ",") -> Dict[str, LabelAccumulator]:
+    """
+    Recorre el CSV de JMeter en una sola pasada y devuelve acumuladores por label.
+    Solo se conserva el estado agregado; las filas no se materializan.
+    Si se pasa `series`, en la misma pasada se llenan las ventanas de tiempo.
+    Las labels pasan por `labels` (normalización + tope de cardinalidad).
+    Con `headers`, `source` es un tramo sin cabecera (ver jmeter_parallel).
+    `delimiter` es el separador de columnas (ver summary_service.sniff_format).
+    """
+    normalize = labels if labels is not None else LabelNormalizer()
+    text = _open_text(source)
+    try:
+        reader = csv.reader(text, delimiter=delimiter)
+        if headers is None:
+            headers = next(reader, None) or []
+        required = {"timeStamp", "label", "elapsed", "success"}
+        missing = [h for h in required if h not in headers]
+        if missing:
+            raise KeyError(f"Archivo JMeter incompleto. Faltan columnas: {missing}")
 
-    requests = len(rows)
-    failures = sum(1 for r in rows if not r["ok"])
-    error_rate = round(failures / max(requests, 1), 4)
+        i_ts = headers.index("timeStamp")
+        i_label = headers.index("label")
+        i_elapsed = headers.index("elapsed")
+        i_ok = headers.index("success")
+        width = max(i_ts, i_label, i_elapsed, i_ok) + 1
 
-    timestamps = [r["ts"] for r in rows]
-    duration_ms = duration_ms_from_timestamps(timestamps)
-    throughput = (requests / (duration_ms/1000.0)) if duration_ms else 0.0
+        buckets: Dict[str, LabelAccumulator] = {}
+        add_window = series.add if series is not None and series.enabled else None
+        for row in reader:
+            if len(row) < width:
+                continue
+            try:
+                ts = int(row[i_ts])
+                elapsed = float(row[i_elapsed])
+            except ValueError:
+                continue
+            label = normalize(row[i_label])
+            acc = buckets.get(label)
+            if acc is None:
+                acc = buckets[label] = LabelAccumulator()
+            ok = row[i_ok].strip().lower() in _TRUE_VALUES
+            acc.add(ts, elapsed, ok)
+            if add_window is not None:
+                add_window(label, ts, elapsed, ok)
+        return buckets
+    finally:
+        # No cerramos el stream del llamador (UploadFile lo gestiona FastAPI).
+        if owns_stream(source):
+            text.close()
+        else:
+            text.detach()
 
-    latencies = [r["elapsed"] for r in rows]
-    lat = Latency(
-        p50=percentile(latencies, 0.50),
-        p90=percentile(latencies, 0.90),
-        p95=percentile(latencies, 0.95),
-        p99=percentile(latencies, 0.99),
-    )
+def summarize_jmeter(buckets: Dict[str, LabelAccumulator], labels_capped: bool = False) -> Tuple[Summary, Dict[str, bool]]:
+    total = LabelAccumulator()
+    for acc in buckets.values():
+        total.merge(acc)
 
-    overall = OverallMetrics(
-        name="(overall)",
-        requests=requests,
-        failures=failures,
-        error_rate=error_rate,
-        duration_ms=duration_ms,
-        throughput_rps=throughput,
-        latency_ms=lat,
-    )
+    overall = total.to_metrics("(overall)", OverallMetrics)
+    by_method = [acc.to_metrics(name) for name, acc in sorted(buckets.items())]
 
-    buckets: Dict[str, List[Dict[str, Any]]] = {}
-    for r in rows:
-        buckets.setdefault(r["label"], []).append(r)
+    approximated = total.approximated or any(acc.approximated for acc in buckets.values())
+    flags = {"approximated_percentiles": approximated, "approximated_duration": False, "approximated_failures": False,
+             "labels_capped": labels_capped}
+    run_id = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    return Summary(tool="jmeter", run_id=run_id, overall=overall, by_method=by_method), flags
 
-    by_method: List[MethodMetrics] = []
-    for name, recs in sorted(buckets.items()):
-        req = len(recs)
-        fai = sum(1 for x in recs if not x["ok"])
-        er = round(fai / max(req, 1), 4)
-        ts = [x["ts"] for x in recs]
-        dur = duration_ms_from_timestamps(ts)
-        thr = (req / (dur/1000.0)) if dur else 0.0
-        latv = [x["elapsed"] for x in recs]
-        by_method.append(MethodMetrics(
-            name=name,
-            requests=req,
-            failures=fai,
-            error_rate=er,
-            duration_ms=dur,
-            throughput_rps=thr,
-            latency_ms=Latency(
-                p50=percentile(latv, 0.50),
-                p90=percentile(latv, 0.90),
-                p95=percentile(latv, 0.95),
-                p99=percentile(latv, 0.99),
-            ),
-        ))
+def _backend() -> str:
+    """JMETER_BACKEND: python (por defecto) | numpy | auto (numpy si está instalado)."""
+    return os.getenv("JMETER_BACKEND", "python").strip().lower()
 
-    flags = {"approximated_percentiles": False, "approximated_duration": False, "approximated_failures": False}
-    run_id = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
-    return Summary(tool="jmeter", run_id=run_id, overall=overall, by_method=by_method), flags
\ No newline at end of file
+def build_summary_from_jmeter(source: Source, backend: Optional[str] = None,
+                              series: Optional[TimeSeries] = None,
+                              delimiter: str = ",") -> Tuple[Summary, Dict[str, bool]]:
+    backend = (backend or _backend()).lower()
+    if backend in ("numpy", "auto"):
+        try:
+            from src.services.jmeter_columnar import build_summary_from_jmeter_columnar
+        except ImportError:
+            if backend == "numpy":
+                raise RuntimeError("JMETER_BACKEND=numpy requiere el paquete 'numpy' instalado.")
+        else:
+            return build_summary_from_jmeter_columnar(source, series, delimiter)
+    elif backend != "python":
+        raise RuntimeError(f"JMETER_BACKEND desconocido: {backend}")
+    labels = LabelNormalizer()
+    with stage("parse"):
+        buckets = aggregate_jmeter(source, series, labels, delimiter=delimiter)
+    with stage("aggregate"):
+        return summarize_jmeter(buckets, labels.capped)
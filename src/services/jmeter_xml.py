@@ -0,0 +1,72 @@
+"""
+Parser de resultados JMeter en XML (JTL con `jmeter.save.saveservice.output_format=xml`).
+
+Se recorre con iterparse: cada <httpSample>/<sample> de primer nivel se agrega y se
+descarta al cerrarse, así la memoria no depende del tamaño del archivo. Los sub-samples
+(recursos embebidos, hijos de un Transaction Controller) no se cuentan aparte: quedan
+dentro de la muestra que los contiene. Atributos: ts (timestamp), t (elapsed), lb (label)
+y s (success).
+"""
+from typing import Dict, Optional, Tuple
+from xml.etree.ElementTree import ParseError, iterparse
+from src.domain.summary_contract import Summary
+from src.core.aggregation import LabelAccumulator
+from src.core.io_utils import Source, as_stream, owns_stream
+from src.core.timeseries import TimeSeries
+from src.core.labels import LabelNormalizer
+from src.core.metrics import stage
+from src.services.jmeter_summary import _to_bool, summarize_jmeter
+
+SAMPLE_TAGS = ("httpSample", "sample")
+
+def aggregate_jmeter_xml(source: Source, series: Optional[TimeSeries] = None,
+                         labels: Optional[LabelNormalizer] = None) -> Dict[str, LabelAccumulator]:
+    normalize = labels if labels is not None else LabelNormalizer()
+    stream = as_stream(source)
+    buckets: Dict[str, LabelAccumulator] = {}
+    add_window = series.add if series is not None and series.enabled else None
+    depth = 0
+    root = None
+    try:
+        for event, elem in iterparse(stream, events=("start", "end")):
+            if event == "start":
+                if root is None:
+                    root = elem
+                depth += 1
+                continue
+            depth -= 1
+            if depth != 1:
+                continue
+            if elem.tag in SAMPLE_TAGS:
+                attrs = elem.attrib
+                try:
+                    ts = int(attrs["ts"])
+                    elapsed = float(attrs["t"])
+                except (KeyError, ValueError):
+                    ts = None
+                if ts is not None:
+                    label = normalize(attrs.get("lb", ""))
+                    acc = buckets.get(label)
+                    if acc is None:
+                        acc = buckets[label] = LabelAccumulator()
+                    ok = _to_bool(attrs.get("s", "true"))
+                    acc.add(ts, elapsed, ok)
+                    if add_window is not None:
+                        add_window(label, ts, elapsed, ok)
+            # Muestra de primer nivel cerrada: se suelta junto con sus hijos.
+            root.clear()
+    except ParseError as e:
+        raise ValueError(f"XML de JMeter ilegible: {e}")
+    finally:
+        if owns_stream(source):
+            stream.close()
+    return buckets
+
+def build_summary_from_jmeter_xml(source: Source, series: Optional[TimeSeries] = None) -> Tuple[Summary, Dict[str, bool]]:
+    labels = LabelNormalizer()
+    with stage("parse"):
+        buckets = aggregate_jmeter_xml(source, series, labels)
+    if not buckets:
+        raise KeyError("Archivo JMeter XML sin muestras (<httpSample>/<sample> con ts y t).")
+    with stage("aggregate"):
+        return summarize_jmeter(buckets, labels.capped)
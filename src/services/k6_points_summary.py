@@ -0,0 +1,164 @@
+"""
+Parser del stream crudo de k6 (`k6 run --out json=...`, NDJSON: un objeto por línea).
+
+Se recorre línea a línea y solo se conservan acumuladores por operación:
+- `http_req_duration` / `grpc_req_duration`: latencias (sketch), conteo y timestamps reales.
+- `http_req_failed`: fallos reales por operación. k6 lo emite después del
+  `http_req_duration` del mismo request, así que solo se busca entre las labels ya
+  admitidas: no ocupa lugar en MAX_LABELS (lo desconocido va a OVERFLOW_LABEL).
+Si el archivo no trae `http_req_failed` (p. ej. gRPC), los fallos se derivan del tag `status`.
+"""
+import time
+from typing import Any, Dict, Optional, Tuple
+from src.domain.summary_contract import Summary, OverallMetrics
+from src.core.aggregation import LabelAccumulator
+from src.core import fast_json
+from src.core.metrics import stage
+from src.core.time_utils import iso_to_epoch_ms
+from src.core.io_utils import Source, as_stream, owns_stream
+from src.core.timeseries import TimeSeries
+from src.core.labels import OVERFLOW_LABEL, LabelNormalizer
+
+DURATION_METRICS = ("http_req_duration", "grpc_req_duration")
+FAILED_METRIC = "http_req_failed"
+
+def is_points_line(line: bytes) -> bool:
+    """True si la línea es un registro Metric/Point del output JSON de k6."""
+    try:
+        obj = fast_json.loads(line)
+    except ValueError:
+        return False
+    return isinstance(obj, dict) and obj.get("type") in ("Metric", "Point") and "metric" in obj
+
+def _label(tags: Dict[str, Any]) -> str:
+    name = tags.get("name") or tags.get("url") or "(sin nombre)"
+    method = tags.get("method")
+    # gRPC usa el método completo como name; en HTTP el verbo distingue operaciones.
+    return f"{method} {name}" if method and not str(name).startswith(f"{method} ") else str(name)
+
+def _status_ok(metric: str, status: Optional[str]) -> bool:
+    if status is None or status == "":
+        return True
+    if metric == "grpc_req_duration":
+        return status == "0"
+    try:
+        code = int(status)
+    except ValueError:
+        return False
+    return 0 < code < 400
+
+def aggregate_k6_points(source: Source, series: Optional[TimeSeries] = None
+                        ) -> Tuple[Dict[str, LabelAccumulator], Dict[str, Any]]:
+    stream = as_stream(source)
+    normalize = LabelNormalizer()
+    if series is not None and not series.enabled:
+        series = None
+    # Los fallos por ventana de http_req_failed se cuentan aparte: solo se sabe al final
+    # si el archivo trae esa métrica o hay que derivarlos del tag status.
+    failed_series = TimeSeries(series.window_ms, series.max_windows, series.relative_accuracy) if series else None
+    buckets: Dict[str, LabelAccumulator] = {}
+    failed: Dict[str, int] = {}
+    status_counts: Dict[str, int] = {}
+    seen_failed_metric = False
+    points = 0
+    loads, _ = fast_json.decoder()
+
+    try:
+        for line in stream:
+            # Filtro barato antes de decodificar: la mayoría de líneas son otras métricas
+            # (http_reqs, data_sent, vus, iterations...).
+            if b'_req_' not in line:
+                continue
+            try:
+                obj = loads(line)
+            except ValueError:
+                continue
+            # Una línea rara (string, lista, data que no es objeto) se salta como cualquier otra ilegible.
+            if not isinstance(obj, dict) or obj.get("type") != "Point":
+                continue
+            metric = obj.get("metric")
+            data = obj.get("data")
+            if not isinstance(data, dict):
+                continue
+            tags = data.get("tags")
+            if not isinstance(tags, dict):
+                tags = {}
+            if metric in DURATION_METRICS:
+                try:
+                    value = float(data["value"])
+                    ts = iso_to_epoch_ms(data["time"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                label = normalize(_label(tags))
+                acc = buckets.get(label)
+                if acc is None:
+                    acc = buckets[label] = LabelAccumulator()
+                status = tags.get("status")
+                ok = _status_ok(metric, status)
+                acc.add(ts, value, ok)
+                if series is not None:
+                    series.add(label, ts, value, ok)
+                if status is not None:
+                    status_counts[str(status)] = status_counts.get(str(status), 0) + 1
+                points += 1
+            elif metric == FAILED_METRIC:
+                seen_failed_metric = True
+                try:
+                    if float(data.get("value", 0)) != 0.0:
+                        label = normalize.lookup(_label(tags))
+                        failed[label] = failed.get(label, 0) + 1
+                        if failed_series is not None:
+                            failed_series.add_window(label, iso_to_epoch_ms(data["time"]), 0, 1)
+                except (KeyError, TypeError, ValueError):
+                    continue
+    finally:
+        if owns_stream(source):
+            stream.close()
+
+    if seen_failed_metric:
+        for label, acc in buckets.items():
+            acc.failures = failed.get(label, 0)
+        # Fallos de labels que no entraron (lookup → OVERFLOW_LABEL) sin ningún punto de duración
+        # en ese bucket: se suman igual, para que no desaparezcan de los totales.
+        for label, n in failed.items():
+            if label not in buckets:
+                buckets.setdefault(OVERFLOW_LABEL, LabelAccumulator()).failures += n
+        if series is not None:
+            series.replace_failures(failed_series)
+
+    info = {
+        "points": points,
+        "failures_source": FAILED_METRIC if seen_failed_metric else "status",
+        "status_counts": dict(sorted(status_counts.items())),
+        "labels_capped": normalize.capped,
+    }
+    return buckets, info
+
+def build_summary_from_k6_points(source: Source, series: Optional[TimeSeries] = None) -> Tuple[Summary, Dict[str, Any]]:
+    with stage("parse"):
+        buckets, info = aggregate_k6_points(source, series)
+    if not buckets:
+        raise ValueError("El stream de k6 no contiene puntos de http_req_duration ni grpc_req_duration.")
+    with stage("aggregate"):
+        return _summary_from_buckets(buckets, info)
+
+def _summary_from_buckets(buckets: Dict[str, LabelAccumulator], info: Dict[str, Any]) -> Tuple[Summary, Dict[str, Any]]:
+    total = LabelAccumulator()
+    for acc in buckets.values():
+        total.merge(acc)
+
+    overall = total.to_metrics("(overall)", OverallMetrics)
+    by_method = [acc.to_metrics(name) for name, acc in sorted(buckets.items())]
+
+    approximated = total.approximated or any(acc.approximated for acc in buckets.values())
+    flags = {
+        "approximated_percentiles": approximated,
+        "approximated_duration": False,
+        "approximated_failures": False,
+        "count_source": "points",
+        "failures_source": info["failures_source"],
+        "status_counts": info["status_counts"],
+        "labels_capped": info["labels_capped"],
+    }
+    run_id = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    return Summary(tool="k6", run_id=run_id, overall=overall, by_method=by_method), flags
@@ -1,6 +1,10 @@
-import json, time
+import mmap, time
 from typing import Any, Dict, List, Tuple
 from src.domain.summary_contract import Summary, OverallMetrics, MethodMetrics, Latency
+from src.core import fast_json
+from src.core.io_utils import Source
+from src.core.labels import LabelNormalizer
+from src.core.metrics import stage
 
 def _safe_float(v, default=0.0) -> float:
     try:
@@ -18,7 +22,11 @@ def _latency_from_metric_dict(m: Dict[str, Any]) -> Latency:
 def _method_metric_key(method_name: str) -> str:
     return "Metodo_" + method_name.replace(".", "_").replace("/", "_") + "_duration"
 
-def _extract_counts(data: Dict[str, Any]):
+def _extract_counts(data: Dict[str, Any], normalize: LabelNormalizer):
+    """
+    Conteos por método desde root_group.checks. Los nombres se normalizan y los checks
+    que caen en el mismo nombre se suman; `sources` guarda los nombres originales de cada uno.
+    """
     metrics = data.get("metrics", {})
     per_method = {}
     total_req = 0
@@ -26,10 +34,14 @@ def _extract_counts(data: Dict[str, Any]):
     rg_checks = data.get("root_group", {}).get("checks", {})
     if rg_checks:
         for check_name, payload in rg_checks.items():
-            method_name = check_name.replace(" OK", "")
+            raw_name = check_name.replace(" OK", "")
+            method_name = normalize(raw_name)
             passes = int(payload.get("passes", 0))
             fails = int(payload.get("fails", 0))
-            per_method[method_name] = {"requests": passes + fails, "failures": fails}
+            cnt = per_method.setdefault(method_name, {"requests": 0, "failures": 0, "sources": []})
+            cnt["requests"] += passes + fails
+            cnt["failures"] += fails
+            cnt["sources"].append((raw_name, passes + fails))
             total_req += passes + fails
             total_fail += fails
     else:
@@ -41,6 +53,14 @@ def _extract_counts(data: Dict[str, Any]):
             total_fail = int(metrics.get("http_req_failed", {}).get("count", 0))
     return total_req, total_fail, per_method
 
+def _merged_latency(metrics: Dict[str, Any], sources: List[Tuple[str, int]]) -> Latency:
+    """Latencia del método; si agrupa varios checks, promedio ponderado por requests (aproximado)."""
+    if len(sources) == 1:
+        return _latency_from_metric_dict(metrics.get(_method_metric_key(sources[0][0]), {}))
+    weight = max(sum(n for _, n in sources), 1)
+    parts = [(_latency_from_metric_dict(metrics.get(_method_metric_key(name), {})), n) for name, n in sources]
+    return Latency(**{p: sum(getattr(lat, p) * n for lat, n in parts) / weight for p in ("p50", "p90", "p95", "p99")})
+
 def _duration_seconds(data: Dict[str, Any]) -> float:
     it = data.get("metrics", {}).get("iterations", {})
     count = it.get("count")
@@ -49,10 +69,25 @@ def _duration_seconds(data: Dict[str, Any]) -> float:
         return float(count) / float(rate)
     return 0.0
 
-def build_summary_from_k6(json_bytes: bytes) -> Tuple[Summary, Dict[str, bool]]:
-    data = json.loads(json_bytes.decode("utf-8", errors="strict"))
+def build_summary_from_k6(source: Source) -> Tuple[Summary, Dict[str, bool]]:
+    """Summary export de k6 (`--summary-export`): el documento se decodifica una sola vez."""
+    with stage("parse"):
+        if not isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+            source = source.read()
+        try:
+            data = fast_json.loads(source)
+        except ValueError:
+            raise ValueError("JSON ilegible o corrupto.")
+        if not isinstance(data, dict):
+            raise ValueError("El summary de k6 debe ser un objeto JSON.")
+    with stage("aggregate"):
+        return _summary_from_data(data)
+
+def _summary_from_data(data: Dict[str, Any]) -> Tuple[Summary, Dict[str, bool]]:
     metrics: Dict[str, Any] = data.get("metrics", {})
-    total_req, total_fail, per_method = _extract_counts(data)
+    normalize = LabelNormalizer()
+    total_req, total_fail, per_method = _extract_counts(data, normalize)
+    merged = any(len(cnt["sources"]) > 1 for cnt in per_method.values())
     error_rate = round(total_fail / max(total_req, 1), 4)
     duration_s = _duration_seconds(data)
     duration_ms = int(duration_s * 1000.0)
@@ -66,9 +101,10 @@ def build_summary_from_k6(json_bytes: bytes) -> Tuple[Summary, Dict[str, bool]]:
         lat = Latency()
 
     flags = {
-        "approximated_percentiles": (lat.p99 == 0.0),
+        "approximated_percentiles": (lat.p99 == 0.0) or merged,
         "approximated_duration": (duration_ms == 0),
         "count_source": "root_group.checks" if per_method else ("metrics.checks" if "checks" in metrics else "http_reqs"),
+        "labels_capped": normalize.capped,
     }
 
     overall = OverallMetrics(
@@ -82,8 +118,7 @@ def build_summary_from_k6(json_bytes: bytes) -> Tuple[Summary, Dict[str, bool]]:
         fai = int(cnt.get("failures", 0))
         er = round(fai / max(req, 1), 4)
         thr = (req / duration_s) if duration_s else 0.0
-        mkey = _method_metric_key(method_name)
-        mlat = _latency_from_metric_dict(metrics.get(mkey, {}))
+        mlat = _merged_latency(metrics, cnt["sources"])
         by_method.append(MethodMetrics(
             name=method_name, requests=req, failures=fai, error_rate=er,
             duration_ms=duration_ms, throughput_rps=thr, latency_ms=mlat
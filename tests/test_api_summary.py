@@ -0,0 +1,884 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from fastapi.testclient import TestClient
+
+import src.application.analyze_service as analyze_service
+from src.api.app import app
+from src.domain.summary_contract import AIReport, TokenUsage
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    from src.infrastructure.cache.factory import close_cache
+
+    monkeypatch.setenv("CACHE_BACKEND", "memory")
+    close_cache()
+    yield
+    close_cache()
+
+
+@pytest.fixture
+def jobs_dir(tmp_path, monkeypatch):
+    from src.application import job_service
+
+    monkeypatch.setenv("JOBS_DIR", str(tmp_path / "jobs"))
+    monkeypatch.setattr(job_service, "_runner", None)
+    return tmp_path / "jobs"
+
+
+@pytest.fixture(autouse=True)
+def runs_db(tmp_path, monkeypatch):
+    from src.infrastructure.runs.store import close_run_store
+
+    monkeypatch.setenv("RUNS_DB_PATH", str(tmp_path / "runs.sqlite3"))
+    close_run_store()
+    yield
+    close_run_store()
+
+
+@pytest.fixture
+def fresh_pools():
+    """Los workers de parseo heredan el entorno al arrancar: se recrean tras cambiarlo."""
+    from src.infrastructure.concurrency import shutdown_pools
+
+    shutdown_pools()
+    yield
+    shutdown_pools()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(
+        analyze_service, "generate_ai_report",
+        lambda summary, comparison=None: (AIReport(title="Informe", overview="ok"), TokenUsage(total_tokens=42), "stub"),
+    )
+    return TestClient(app)
+
+
+def _post(client, path, content_type, filename=None):
+    with open(path, "rb") as fh:
+        return client.post("/summary", files={"file": (filename or path.split("/")[-1], fh, content_type)})
+
+
+def test_jmeter_csv(client):
+    resp = _post(client, "samples/jmeter_sample.csv", "text/csv")
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["metadata"]["tool_detected"] == "jmeter"
+    assert body["summary"]["overall"]["requests"] == 4
+
+
+def test_k6_summary_export(client):
+    resp = _post(client, "samples/k6_sample.json", "application/json")
+    assert resp.status_code == 200
+    assert resp.json()["summary"]["overall"]["requests"] == 240
+
+
+@pytest.mark.parametrize("content_type,filename", [
+    ("application/x-ndjson", None),
+    ("application/json", "k6_out.json"),
+])
+def test_k6_raw_points(client, content_type, filename):
+    resp = _post(client, "samples/k6_points_sample.ndjson", content_type, filename)
+    assert resp.status_code == 200
+    body = resp.json()
+    overall = body["summary"]["overall"]
+    assert overall["requests"] == 5
+    assert overall["failures"] == 1
+    assert overall["duration_ms"] == 2000
+    names = [m["name"] for m in body["summary"]["by_method"]]
+    assert names == ["GET https://api.example.com/users", "POST https://api.example.com/orders"]
+    assert body["metadata"]["flags"]["failures_source"] == "http_req_failed"
+
+
+def test_k6_points_skip_lines_that_are_not_objects():
+    from src.services.k6_points_summary import build_summary_from_k6_points
+
+    with open("samples/k6_points_sample.ndjson", "rb") as fh:
+        sample = fh.read()
+    odd = (b'"http_req_duration"\n[1,"_req_"]\n'
+           b'{"type": "Point", "metric": "http_req_duration", "data": [1, 2]}\n'
+           b'{"type": "Point", "metric": "http_req_failed", "data": {"value": 0, "tags": ["_req_"], '
+           b'"time": "2024-05-01T10:00:00Z"}}\n')
+    expected, _ = build_summary_from_k6_points(sample)
+    got, _ = build_summary_from_k6_points(odd + sample)
+    assert got.model_dump(exclude={"run_id"}) == expected.model_dump(exclude={"run_id"})
+
+
+def test_k6_failure_points_do_not_take_label_slots(monkeypatch):
+    from src.services.k6_points_summary import build_summary_from_k6_points
+
+    monkeypatch.setenv("MAX_LABELS", "2")
+
+    def point(metric, name, value, second):
+        return json.dumps({"type": "Point", "metric": metric, "data": {
+            "time": f"2024-05-01T10:00:0{second}Z", "value": value,
+            "tags": {"method": "GET", "name": name, "status": "200"}}}) + "\n"
+
+    data = "".join((
+        point("http_req_duration", "/a", 10, 0), point("http_req_failed", "/a", 1, 0),
+        point("http_req_failed", "/sin-duracion", 1, 1),
+        point("http_req_duration", "/b", 20, 2), point("http_req_failed", "/b", 0, 2),
+        point("http_req_duration", "/c", 30, 3), point("http_req_failed", "/c", 1, 3),
+    )).encode()
+    summary, flags = build_summary_from_k6_points(data)
+    failures = {m.name: m.failures for m in summary.by_method}
+    assert failures == {"GET /a": 1, "GET /b": 0, "(otras operaciones)": 2}
+    assert flags["labels_capped"] is True
+
+    # Sin ninguna duración en el bucket de desborde, sus fallos igual cuentan.
+    data = "".join((
+        point("http_req_duration", "/a", 10, 0), point("http_req_failed", "/a", 1, 0),
+        point("http_req_failed", "/sin-duracion", 1, 1),
+        point("http_req_duration", "/b", 20, 2), point("http_req_failed", "/b", 0, 2),
+    )).encode()
+    summary, _ = build_summary_from_k6_points(data)
+    rows = {m.name: (m.requests, m.failures) for m in summary.by_method}
+    assert rows == {"GET /a": (1, 1), "GET /b": (1, 0), "(otras operaciones)": (0, 1)}
+    assert (summary.overall.requests, summary.overall.failures) == (2, 2)
+
+
+def test_timeseries_endpoint_downsamples(client, monkeypatch):
+    body = _post(client, "samples/k6_points_sample.ndjson", "application/x-ndjson").json()
+    url = body["metadata"]["timeseries_url"]
+    assert url == f"/summary/{body['metadata']['analysis_id']}/timeseries"
+
+    fine = client.get(url).json()
+    overall = fine["series"][0]
+    assert fine["window_ms"] == 1000
+    assert overall["name"] == "(overall)"
+    assert sum(overall["requests"]) == 5
+    assert sum(overall["failures"]) == 1
+
+    coarse = client.get(url, params={"resolution_ms": 10000, "label": "POST https://api.example.com/orders"}).json()
+    assert coarse["window_ms"] == 10000
+    assert [s["name"] for s in coarse["series"]] == ["(overall)", "POST https://api.example.com/orders"]
+    assert coarse["series"][0]["requests"] == [5]
+
+    assert client.get("/summary/desconocido/timeseries").status_code == 404
+
+    # La serie no depende de la caché opcional: sin caché la URL publicada sigue respondiendo.
+    from src.infrastructure.cache.factory import close_cache
+
+    monkeypatch.setenv("CACHE_BACKEND", "none")
+    close_cache()
+    body = _post(client, "samples/jmeter_sample.csv", "text/csv").json()
+    assert client.get(body["metadata"]["timeseries_url"]).json()["series"][0]["name"] == "(overall)"
+
+
+def _jtl(latency_ms, rows=400):
+    lines = [b"timeStamp,elapsed,label,success"]
+    lines += [b"%d,%d,GET /items,true" % (1_700_000_000_000 + i * 50, latency_ms + i % 40) for i in range(rows)]
+    return b"\n".join(lines) + b"\n"
+
+
+def test_runs_are_compared_against_previous_baseline(client, monkeypatch):
+    seen = []
+    monkeypatch.setattr(
+        analyze_service, "generate_ai_report",
+        lambda summary, comparison=None: seen.append(comparison) or (
+            AIReport(title="Informe", overview="ok"), TokenUsage(total_tokens=42), "stub"),
+    )
+
+    def post(data, tag):
+        resp = client.post("/summary", params={"service": "checkout", "tag": tag},
+                           files={"file": (f"{tag}.csv", data, "text/csv")})
+        assert resp.status_code == 200
+        return resp.json()["metadata"]
+
+    first = post(_jtl(100), "v1")
+    assert first["comparison"] is None
+    same = post(_jtl(100, rows=401), "v2")
+    assert same["comparison"]["overall"]["verdict"] == "unchanged"
+    slow = post(_jtl(180), "v3")
+    comparison = slow["comparison"]
+    assert comparison["baseline_tag"] == "v2"
+    assert comparison["regressions"] == 1
+    assert comparison["by_method"][0]["verdict"] == "regression"
+    assert comparison["by_method"][0]["p_value"] < 0.01
+    assert seen[-1] is not None and seen[-1].regressions == 1
+
+    explicit = client.get(f"/runs/{slow['run_key']}/compare", params={"baseline": first["run_key"]}).json()
+    assert explicit["baseline_tag"] == "v1"
+    assert explicit["overall"]["verdict"] == "regression"
+    assert [r["tag"] for r in client.get("/runs", params={"service": "checkout"}).json()["runs"]] == ["v3", "v2", "v1"]
+
+    # baseline=auto sobre una corrida vieja: la anterior a ella (v1), no la última guardada (v3).
+    middle = client.get(f"/runs/{same['run_key']}/compare").json()
+    assert middle["baseline_tag"] == "v1"
+    assert middle["regressions"] == 0
+    assert client.get(f"/runs/{first['run_key']}/compare").status_code == 404
+
+
+def test_latency_change_without_sketches_is_not_a_regression(client, fresh_pools, monkeypatch):
+    monkeypatch.setenv("TIMESERIES_WINDOW_MS", "0")  # sin series no hay sketches para la prueba
+
+    def post(data, tag):
+        resp = client.post("/summary", params={"service": "search", "tag": tag},
+                           files={"file": (f"{tag}.csv", data, "text/csv")})
+        return resp.json()["metadata"]
+
+    post(_jtl(100), "v1")
+    comparison = post(_jtl(180), "v2")["comparison"]
+    assert comparison["by_method"][0]["verdict"] == "changed"
+    assert comparison["by_method"][0]["p_value"] is None
+    assert comparison["regressions"] == 0
+
+
+def test_prompt_compacted_to_token_budget(client, monkeypatch, request):
+    monkeypatch.setenv("PROMPT_TOKEN_BUDGET", "4000")
+    monkeypatch.setenv("PROMPT_TOP_K", "20")
+    monkeypatch.setenv("LABEL_COLLAPSE_IDS", "false")
+    monkeypatch.setenv("MAX_LABELS", "5000")
+    request.getfixturevalue("fresh_pools")
+    sent = []
+    monkeypatch.setattr(
+        analyze_service, "generate_ai_report",
+        lambda summary, comparison=None: sent.append(summary) or (
+            AIReport(title="Informe", overview="ok"), TokenUsage(total_tokens=42), "stub"),
+    )
+    # 1500 URLs dinámicas; /checkout concentra los errores y debe sobrevivir al recorte.
+    lines = [b"timeStamp,elapsed,label,success"]
+    lines += [b"%d,%d,GET /items/%d,true" % (1_700_000_000_000 + i, 50 + i % 7, i) for i in range(1500)]
+    lines += [b"%d,900,POST /checkout,false" % (1_700_000_002_000 + i) for i in range(30)]
+    data = b"\n".join(lines) + b"\n"
+    body = client.post("/summary", files={"file": ("big.csv", data, "text/csv")}).json()
+
+    prompt = body["metadata"]["prompt"]
+    assert prompt["tokens_before"] > 4000 >= prompt["tokens_after"]
+    assert prompt["kept_labels"] <= 20
+    assert prompt["dropped_labels"] == 1501 - prompt["kept_labels"]
+    assert "POST /checkout" not in prompt["dropped"]
+    names = [m.name for m in sent[0].by_method]
+    assert "POST /checkout" in names and names[-1].startswith("(otras ")
+    assert sum(m.requests for m in sent[0].by_method) == 1530
+    assert len(body["summary"]["by_method"]) == 1501
+    assert prompt["over_budget"] is False
+
+
+def test_prompt_compaction_keeps_removed_labels_and_flags_over_budget(monkeypatch):
+    from src.application.prompt_compaction import compact_for_prompt
+    from src.domain.summary_contract import LabelComparison, RunComparison
+    from src.services.jmeter_summary import build_summary_from_jmeter
+
+    monkeypatch.setenv("PROMPT_TOP_K", "1")
+    monkeypatch.setenv("PROMPT_REMOVED_LABELS", "3")
+    summary, _ = build_summary_from_jmeter(b"timeStamp,elapsed,label,success\n"
+                                           b"1,10,a,true\n2,20,b,true\n3,30,c,false\n")
+    comparison = RunComparison(run_key="r", baseline_key="b", baseline_run_id="x",
+                               overall=LabelComparison(name="(overall)", requests=3, baseline_requests=3,
+                                                       p95_ms=30, baseline_p95_ms=30, p95_delta_pct=0,
+                                                       p99_ms=30, baseline_p99_ms=30, p99_delta_pct=0,
+                                                       error_rate=0.3, baseline_error_rate=0.3),
+                               removed_labels=["old1", "old2", "old3", "old4"])
+    _, compact, info = compact_for_prompt(summary, comparison)
+    # K=1 no recorta las desaparecidas: solo su propio tope.
+    assert info["kept_labels"] == 1 and compact.removed_labels == ["old1", "old2", "old3"]
+    assert info["over_budget"] is False
+
+    monkeypatch.setenv("PROMPT_TOKEN_BUDGET", "10")
+    _, _, info = compact_for_prompt(summary, comparison)
+    assert info["kept_labels"] == 0
+    assert info["over_budget"] is True and info["tokens_after"] > 10
+
+
+def test_unsupported_type(client):
+    resp = _post(client, "samples/jmeter_sample.csv", "text/plain")
+    assert resp.status_code == 415
+
+
+def test_oversized_upload_rejected_while_streaming(client, monkeypatch, tmp_path):
+    monkeypatch.setenv("MAX_UPLOAD_MB", "1")
+    chunk = b"timeStamp,elapsed,label,success\n" + b"1,1,a,true\n" * 120_000
+    resp = client.post("/summary", files={"file": ("big.csv", chunk, "text/csv")})
+    assert resp.status_code == 413
+    assert resp.json()["extra"]["size_bytes"] > 1024 * 1024
+
+    # Sin Content-Length el corte ocurre al superar el límite dentro del stream.
+    body = iter([b"--b\r\nContent-Disposition: form-data; name=\"file\"; filename=\"big.csv\"\r\n"
+                 b"Content-Type: text/csv\r\n\r\n"] + [b"1,1,a,true\n" * 10_000] * 20)
+    resp = client.post("/summary", content=body, headers={"Content-Type": "multipart/form-data; boundary=b"})
+    assert resp.status_code == 413
+
+
+def test_single_file_routes_reject_extra_files_without_leaking(client, monkeypatch, tmp_path):
+    import os
+    import tempfile
+
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    with open("samples/jmeter_sample.csv", "rb") as fh:
+        data = fh.read()
+    files = [("file", ("a.csv", data, "text/csv")), ("file", ("b.csv", data, "text/csv"))]
+    for route in ("/summary", "/summary/stream"):
+        resp = client.post(route, files=files)
+        assert resp.status_code == 400
+        assert resp.json()["extra"] == {"filename": "b.csv", "max_files": 1}
+    assert os.listdir(tmp_path) == []
+
+
+def test_repeat_upload_hits_cache(client, monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        analyze_service, "generate_ai_report",
+        lambda summary, comparison=None: calls.append(1) or (AIReport(title="Informe", overview="ok"), TokenUsage(total_tokens=42), "stub"),
+    )
+    first = _post(client, "samples/jmeter_sample.csv", "text/csv").json()
+    second = _post(client, "samples/jmeter_sample.csv", "text/csv").json()
+    assert first["metadata"]["cache"] == {"summary": "miss", "ai_report": "miss"}
+    assert second["metadata"]["cache"] == {"summary": "hit", "ai_report": "hit"}
+    assert second["token_usage"]["total_tokens"] == 0
+    assert second["summary"] == first["summary"]
+    assert len(calls) == 1
+
+
+def test_saturated_parse_pool_returns_503(client, monkeypatch):
+    from src.infrastructure.concurrency import BoundedExecutor
+
+    busy = BoundedExecutor("parse", "inline", max_workers=1, max_queue=0, retry_after=7)
+    busy.pending = 1
+    monkeypatch.setattr(analyze_service, "parse_pool", lambda: busy)
+    resp = _post(client, "samples/jmeter_sample.csv", "text/csv")
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "7"
+
+
+class _FakeAzure(BaseHTTPRequestHandler):
+    """Endpoint local con la forma de chat/completions de Azure OpenAI."""
+
+    protocol_version = "HTTP/1.1"
+    connections = 0
+    requests = 0
+
+    def setup(self):
+        type(self).connections += 1
+        super().setup()
+
+    def do_POST(self):
+        cls = type(self)
+        cls.requests += 1
+        sent = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        deployment = self.path.split("/deployments/")[1].split("/")[0]
+        cls.deployments.append(deployment)
+        time.sleep(cls.delays.get(deployment, 0))
+        status = cls.statuses.pop(0) if cls.statuses else 200
+        if status != 200:
+            body = json.dumps({"error": {"code": str(status), "message": "fallo simulado"}}).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if status == 429:
+                self.send_header("retry-after-ms", "30")
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        report = {"title": "Informe", "overview": "Todo estable.", "highlights": [], "risks": [],
+                  "recommendations": [], "next_steps": []}
+        if sent.get("stream"):
+            return self._stream(json.dumps(report))
+        body = json.dumps({
+            "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": "gpt-test",
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": json.dumps(report)}}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, content):
+        """chat.completion.chunk por SSE: deltas de 7 caracteres y el uso en el último chunk."""
+        base = {"id": "chatcmpl-1", "object": "chat.completion.chunk", "created": 0, "model": "gpt-test"}
+        chunks = [{**base, "choices": [{"index": 0, "delta": {"content": content[i:i + 7]}}]}
+                  for i in range(0, len(content), 7)]
+        chunks.append({**base, "choices": [],
+                       "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}})
+        body = "".join(f"data: {json.dumps(c)}\n\n" for c in chunks) + "data: [DONE]\n\n"
+        body = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_azure(monkeypatch):
+    from src.infrastructure.ai.client_registry import registry
+
+    from src.infrastructure.ai.scheduler import close_schedulers
+
+    handler = type("Handler", (_FakeAzure,), {"connections": 0, "requests": 0, "deployments": [],
+                                              "statuses": [], "delays": {}})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.handle_error = lambda request, client_address: None  # clientes que cortan (hedging)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("AZURE_OPENAI_ENDPOINT", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setenv("AZURE_OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("AZURE_OPENAI_DEPLOYMENT", "gpt-test")
+    monkeypatch.delenv("HTTPS_PROXY", raising=False)
+    monkeypatch.delenv("HTTP_PROXY", raising=False)
+    monkeypatch.setenv("AI_RETRY_BASE_S", "0.01")
+    registry.close()
+    close_schedulers()
+    yield handler
+    registry.close()
+    close_schedulers()
+    server.shutdown()
+    server.server_close()
+
+
+def test_ai_client_reuses_connections(fake_azure, jobs_dir, monkeypatch):
+    monkeypatch.setenv("CACHE_BACKEND", "none")
+    with TestClient(app) as client:
+        for _ in range(3):
+            resp = _post(client, "samples/jmeter_sample.csv", "text/csv")
+            assert resp.status_code == 200
+            assert resp.json()["token_usage"]["total_tokens"] == 15
+    assert fake_azure.requests == 3
+    assert fake_azure.connections == 1
+
+
+def test_batch_streams_one_line_per_file(client):
+    import io
+    import zipfile
+
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.write("samples/k6_points_sample.ndjson", "run/k6_points.ndjson")
+        zf.writestr("run/notes.txt", "sin datos")
+    with open("samples/jmeter_sample.csv", "rb") as csv_fh, open("samples/k6_sample.json", "rb") as k6_fh:
+        resp = client.post("/summary/batch", files=[
+            ("files", ("jmeter.csv", csv_fh, "text/csv")),
+            ("files", ("k6.json", k6_fh, "application/json")),
+            ("files", ("broken.csv", b"timeStamp,elapsed\n1,2\n", "text/csv")),
+            ("files", ("results.zip", archive.getvalue(), "application/zip")),
+        ])
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    lines = {line["filename"]: line for line in map(json.loads, resp.text.splitlines())}
+    assert set(lines) == {"jmeter.csv", "k6.json", "broken.csv", "run/k6_points.ndjson", "run/notes.txt"}
+    assert lines["jmeter.csv"]["result"]["summary"]["overall"]["requests"] == 4
+    assert lines["k6.json"]["result"]["summary"]["tool"] == "k6"
+    assert lines["run/k6_points.ndjson"]["result"]["summary"]["overall"]["requests"] == 5
+    assert lines["broken.csv"]["status"] == 422
+    assert lines["run/notes.txt"]["status"] == 415
+
+
+def test_batch_limits_apply_while_expanding_and_errors_stay_per_file(client, monkeypatch):
+    import io
+    import zipfile
+    import src.api.routes.summary_route as summary_route
+
+    def zipped(members):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+            for name, data in members.items():
+                zf.writestr(name, data)
+        return archive.getvalue()
+
+    monkeypatch.setenv("BATCH_MAX_FILES", "3")
+    many = zipped({f"run{i}.csv": "timeStamp,elapsed,label,success\n" for i in range(50)})
+    resp = client.post("/summary/batch", files=[("files", ("many.zip", many, "application/zip"))])
+    assert resp.status_code == 413
+    assert resp.json()["title"] == "Lote demasiado grande"
+
+    monkeypatch.setenv("BATCH_MAX_FILES", "100")
+    monkeypatch.setenv("BATCH_MAX_MB", "1")
+    bomb = zipped({f"big{i}.csv": "0" * (600 * 1024) for i in range(3)})
+    resp = client.post("/summary/batch", files=[("files", ("bomb.zip", bomb, "application/zip"))])
+    assert resp.status_code == 413
+    assert resp.json()["extra"]["limit_bytes"] == 1024 * 1024
+
+    real = summary_route.analyze_upload
+
+    async def flaky(upload, **kwargs):
+        if upload.filename == "bad.csv":
+            raise OSError("disco lleno")
+        return await real(upload, **kwargs)
+
+    monkeypatch.setattr(summary_route, "analyze_upload", flaky)
+    with open("samples/jmeter_sample.csv", "rb") as fh:
+        data = fh.read()
+    resp = client.post("/summary/batch", files=[("files", ("bad.csv", data, "text/csv")),
+                                                ("files", ("good.csv", data, "text/csv"))])
+    lines = {line["filename"]: line for line in map(json.loads, resp.text.splitlines())}
+    assert lines["bad.csv"]["status"] == 500
+    assert "OSError" in lines["bad.csv"]["error"]["detail"]
+    assert lines["good.csv"]["status"] == 200
+
+
+def _wait_for_job(client, job_id, timeout=10.0):
+    import time
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = client.get(f"/jobs/{job_id}").json()
+        if status["status"] in ("done", "failed"):
+            return status
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} no terminó: {status}")
+
+
+def test_job_submit_poll_and_fetch(client, jobs_dir):
+    with TestClient(app) as c:
+        with open("samples/jmeter_sample.csv", "rb") as fh:
+            resp = c.post("/jobs", files={"file": ("jmeter.csv", fh, "text/csv")})
+        assert resp.status_code == 202
+        job_id = resp.json()["job_id"]
+        status = _wait_for_job(c, job_id)
+        assert status["phase"] == "done"
+        assert status["progress"]["rows_processed"] == 4
+        assert status["progress"]["percent"] == 100.0
+        result = c.get(f"/jobs/{job_id}/result")
+        assert result.status_code == 200
+        assert result.json()["summary"]["overall"]["requests"] == 4
+        assert c.get("/jobs/desconocido").status_code == 404
+
+
+def test_job_with_extra_files_is_rejected_without_orphans(client, jobs_dir):
+    import os
+
+    with open("samples/jmeter_sample.csv", "rb") as fh:
+        data = fh.read()
+    with TestClient(app) as c:
+        resp = c.post("/jobs", files=[("file", ("a.csv", data, "text/csv")), ("file", ("b.csv", data, "text/csv"))])
+        assert resp.status_code == 400
+    assert os.listdir(jobs_dir / "uploads") == []
+
+
+def test_large_jobs_split_into_ranges_on_the_parse_pool(client, jobs_dir, fresh_pools, monkeypatch):
+    from src.services import jmeter_parallel
+
+    monkeypatch.setenv("JMETER_PARALLEL_WORKERS", "3")
+    monkeypatch.setenv("JMETER_PARALLEL_MIN_MB", "0")
+    monkeypatch.setenv("PARSE_EXECUTOR", "inline")
+    monkeypatch.setenv("PARSE_WORKERS", "2")  # el reparto no pasa del tamaño del pool
+    monkeypatch.setenv("CACHE_BACKEND", "none")  # el job vuelve a parsear el mismo archivo
+    calls = []
+
+    def counted(path, start, end, *args):
+        calls.append((start, end))
+        return jmeter_parallel.aggregate_range(path, start, end, *args)
+
+    monkeypatch.setattr(analyze_service, "aggregate_range", counted)
+    expected = _post(client, "samples/jmeter_sample.csv", "text/csv").json()
+    assert len(calls) == 2
+    with TestClient(app) as c:
+        with open("samples/jmeter_sample.csv", "rb") as fh:
+            job_id = c.post("/jobs", files={"file": ("jmeter.csv", fh, "text/csv")}).json()["job_id"]
+        assert _wait_for_job(c, job_id)["progress"]["percent"] == 100.0
+        result = c.get(f"/jobs/{job_id}/result").json()
+    assert len(calls) == 4
+    assert result["summary"]["by_method"] == expected["summary"]["by_method"]
+    assert result["summary"]["overall"] == expected["summary"]["overall"]
+
+
+def test_range_parse_matches_serial_when_a_range_hits_the_label_cap(client, fresh_pools, monkeypatch):
+    monkeypatch.setenv("MAX_LABELS", "3")
+    monkeypatch.setenv("PARSE_EXECUTOR", "inline")
+    monkeypatch.setenv("PARSE_WORKERS", "2")
+    monkeypatch.setenv("CACHE_BACKEND", "none")
+    # 1.er rango: a/b (+ w). 2.º rango: x, y, z llenan su propio tope y después a, que en serie
+    # conserva su nombre.
+    rows = [b"a" if i % 2 else b"b" for i in range(100)] + [b"w", b"x", b"y", b"z"] + [b"a"] * 96
+    data = b"timeStamp,elapsed,label,success\n" + b"".join(
+        b"%d,%d,%s,true\n" % (1000 + i, 10 + i % 9, label) for i, label in enumerate(rows))
+
+    def by_method():
+        resp = client.post("/summary", files={"file": ("big.csv", data, "text/csv")})
+        return resp.json()["summary"]["by_method"]
+
+    monkeypatch.setenv("JMETER_PARALLEL_WORKERS", "0")
+    serial = by_method()
+    monkeypatch.setenv("JMETER_PARALLEL_WORKERS", "2")
+    monkeypatch.setenv("JMETER_PARALLEL_MIN_MB", "0")
+    assert by_method() == serial
+    assert {m["name"]: m["requests"] for m in serial} == {"a": 146, "b": 50, "w": 1, "(otras operaciones)": 3}
+
+
+def test_range_parse_is_admitted_whole_and_waits_for_siblings(client, fresh_pools, monkeypatch):
+    import os
+    from src.services import jmeter_parallel
+
+    monkeypatch.setenv("JMETER_PARALLEL_WORKERS", "3")
+    monkeypatch.setenv("JMETER_PARALLEL_MIN_MB", "0")
+    monkeypatch.setenv("PARSE_EXECUTOR", "thread")
+    monkeypatch.setenv("PARSE_WORKERS", "3")
+    monkeypatch.setenv("PARSE_MAX_QUEUE", "0")
+    monkeypatch.setenv("CACHE_BACKEND", "none")
+    data = b"timeStamp,elapsed,label,success\n" + b"".join(b"%d,%d,a,true\n" % (1000 + i, i) for i in range(300))
+    calls, finished = [], []
+
+    def flaky(path, start, end, *args):
+        calls.append(start)
+        if len(calls) > 1:
+            raise ValueError("rango roto")
+        time.sleep(0.3)
+        finished.append(os.path.exists(path))  # el temporal sigue ahí mientras el worker lo lee
+        return jmeter_parallel.aggregate_range(path, start, end, *args)
+
+    monkeypatch.setattr(analyze_service, "aggregate_range", flaky)
+    pool = analyze_service.parse_pool()
+
+    # Otro análisis ocupa un lugar: los 3 rangos no entran y se parsea como un solo trabajo.
+    pool.pending = 1
+    resp = client.post("/summary", files={"file": ("big.csv", data, "text/csv")})
+    assert resp.status_code == 200 and calls == []
+    assert resp.json()["summary"]["overall"]["requests"] == 300
+
+    # Un rango falla: se espera al que seguía corriendo antes de responder y borrar el temporal.
+    pool.pending = 0
+    resp = client.post("/summary", files={"file": ("big.csv", data, "text/csv")})
+    assert resp.status_code == 400
+    assert len(calls) >= 2 and finished == [True]
+    assert pool.pending == 0
+
+
+def test_pending_jobs_resume_after_restart(client, jobs_dir):
+    import shutil
+
+    from src.infrastructure.jobs.store import JobStore
+
+    (jobs_dir / "uploads").mkdir(parents=True)
+    upload_path = jobs_dir / "uploads" / "pending.csv"
+    shutil.copy("samples/jmeter_sample.csv", upload_path)
+    store = JobStore(str(jobs_dir / "jobs.sqlite3"))
+    store.create("job-1", "jmeter.csv", "text/csv", upload_path.stat().st_size, "0" * 64, str(upload_path))
+    store.update("job-1", status="running", phase="parsing")
+    store.close()
+
+    with TestClient(app) as c:
+        status = _wait_for_job(c, "job-1")
+        assert status["status"] == "done"
+    assert not upload_path.exists()
+
+
+def test_stage_timings_and_metrics_endpoint(client):
+    resp = _post(client, "samples/jmeter_sample.csv", "text/csv")
+    assert resp.status_code == 200
+    meta = resp.json()["metadata"]
+    assert {"upload_receive", "detect", "parse", "aggregate", "prompt_build"} <= set(meta["timings_ms"])
+    assert "stage_ms" not in meta["flags"]
+
+    # Segundo envío: el summary sale de caché y no hay etapas de parseo.
+    again = _post(client, "samples/jmeter_sample.csv", "text/csv").json()["metadata"]
+    assert again["cache"]["summary"] == "hit"
+    assert "parse" not in again["timings_ms"]
+
+    text = client.get("/metrics").text
+    assert 'informai_stage_seconds_count{stage="parse"}' in text
+    assert 'informai_rows_processed_total{tool="jmeter"}' in text
+    assert 'informai_cache_lookups_total{cache="summary",result="hit"}' in text
+    assert 'informai_http_requests_total{method="POST",route="/summary",status="200"}' in text
+
+
+def _sse_events(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_summary_stream_sends_summary_then_sections(fake_azure, monkeypatch):
+    monkeypatch.setenv("CACHE_BACKEND", "none")
+    with TestClient(app) as client:
+        with open("samples/jmeter_sample.csv", "rb") as fh:
+            resp = client.post("/summary/stream", files={"file": ("jmeter_sample.csv", fh, "text/csv")})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    events = _sse_events(resp.text)
+    names = [name for name, _ in events]
+    assert names[0] == "summary" and names[-2:] == ["usage", "done"]
+    assert events[0][1]["summary"]["overall"]["requests"] == 4
+    sections = [data["name"] for name, data in events if name == "section"]
+    assert sections[:2] == ["title", "overview"]
+    assert events[-2][1]["total_tokens"] == 15
+    done = events[-1][1]
+    assert done["ai_report"]["overview"] == "Todo estable."
+    assert "ai_call" in done["metadata"]["timings_ms"]
+
+
+def test_summary_stream_reports_ai_failure_as_event(client, monkeypatch):
+    def broken(summary, comparison=None):
+        yield "section", ("title", "Informe")
+        raise RuntimeError("sin cuota")
+
+    monkeypatch.setattr(analyze_service, "stream_ai_report", broken)
+    with open("samples/jmeter_sample.csv", "rb") as fh:
+        resp = client.post("/summary/stream", files={"file": ("jmeter_sample.csv", fh, "text/csv")})
+    events = _sse_events(resp.text)
+    assert [name for name, _ in events] == ["summary", "section", "error"]
+    assert events[-1][1]["status"] == 502
+
+
+def test_scheduler_retries_rate_limits_after_retry_after(fake_azure, monkeypatch):
+    monkeypatch.setenv("CACHE_BACKEND", "none")
+    fake_azure.statuses = [429, 429]
+    with TestClient(app) as client:
+        resp = _post(client, "samples/jmeter_sample.csv", "text/csv")
+    assert resp.status_code == 200
+    assert fake_azure.requests == 3
+    assert "retries" not in resp.json()  # los reintentos son transparentes para el cliente
+
+
+def test_circuit_breaker_opens_after_repeated_server_errors(fake_azure, monkeypatch):
+    monkeypatch.setenv("CACHE_BACKEND", "none")
+    monkeypatch.setenv("AI_MODE", "azure")
+    monkeypatch.setenv("AI_CB_FAILURES", "2")
+    monkeypatch.setenv("AI_RETRY_MAX", "1")
+    fake_azure.statuses = [500] * 10
+    with TestClient(app) as client:
+        first = _post(client, "samples/jmeter_sample.csv", "text/csv")
+        second = _post(client, "samples/jmeter_sample.csv", "text/csv")
+    assert first.status_code == 502
+    assert second.status_code == 503
+    assert int(second.headers["Retry-After"]) >= 1
+    assert fake_azure.requests == 2  # con el circuito abierto ya no se llama a Azure
+
+
+def test_token_budget_rejects_when_exhausted(fake_azure, monkeypatch):
+    monkeypatch.setenv("CACHE_BACKEND", "none")
+    monkeypatch.setenv("AI_MODE", "azure")
+    monkeypatch.setenv("AI_TPM_LIMIT", "1000")
+    monkeypatch.setenv("AI_QUEUE_TIMEOUT_S", "0.1")
+    with TestClient(app) as client:
+        assert _post(client, "samples/jmeter_sample.csv", "text/csv").status_code == 200
+        resp = _post(client, "samples/jmeter_sample.csv", "text/csv")
+    assert resp.status_code == 503
+    assert resp.json()["title"] == "IA no disponible"
+    assert fake_azure.requests == 1
+
+
+def test_budget_exhausted_during_probe_releases_half_open_breaker(monkeypatch):
+    from src.infrastructure.ai.scheduler import AIScheduler, BudgetExceeded
+
+    monkeypatch.setenv("AI_RPM_LIMIT", "1")
+    monkeypatch.setenv("AI_QUEUE_TIMEOUT_S", "0.05")
+    scheduler = AIScheduler(["d1"])
+    dep = scheduler.deployments[0]
+    assert scheduler.run(lambda name: name, cost=10) == "d1"  # agota el RPM
+    dep.breaker.state, dep.breaker._opened_at = "open", time.monotonic() - dep.breaker.open_s - 1
+    with pytest.raises(BudgetExceeded):
+        scheduler.run(lambda name: name, cost=10)
+    # Sin llamada no hubo veredicto: el turno de prueba vuelve a estar libre.
+    assert dep.breaker.state == "half_open"
+    assert dep.breaker.available() and dep.breaker.allow()
+
+
+def test_slow_deployment_is_hedged(fake_azure, monkeypatch):
+    monkeypatch.setenv("CACHE_BACKEND", "none")
+    monkeypatch.setenv("AZURE_OPENAI_DEPLOYMENT_LIST", "lento,rapido")
+    monkeypatch.setenv("AI_HEDGE_AFTER_S", "0.1")
+    fake_azure.delays = {"lento": 1.5}
+    with TestClient(app) as client:
+        t0 = time.perf_counter()
+        resp = _post(client, "samples/jmeter_sample.csv", "text/csv")
+        elapsed = time.perf_counter() - t0
+    assert resp.status_code == 200
+    assert fake_azure.deployments[:2] == ["lento", "rapido"]
+    assert elapsed < 1.2
+
+
+def test_local_report_mode_skips_ai(client, monkeypatch):
+    with open("samples/jmeter_sample.csv", "rb") as fh:
+        resp = client.post("/summary?ai_mode=local", files={"file": ("jmeter_sample.csv", fh, "text/csv")})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["metadata"]["ai_mode"] == "local"
+    assert body["token_usage"]["total_tokens"] == 0
+    assert body["ai_report"]["title"].startswith("Resultado")
+    assert body["ai_report"]["key_metrics"]["requests"] == 4
+
+    monkeypatch.setenv("AI_BYPASS", "true")
+    assert _post(client, "samples/jmeter_sample.csv", "text/csv").json()["metadata"]["ai_mode"] == "local"
+    with open("samples/jmeter_sample.csv", "rb") as fh:
+        assert client.post("/summary?ai_mode=otro", files={"file": ("x.csv", fh, "text/csv")}).status_code == 200
+    monkeypatch.delenv("AI_BYPASS")
+    with open("samples/jmeter_sample.csv", "rb") as fh:
+        assert client.post("/summary?ai_mode=otro", files={"file": ("x.csv", fh, "text/csv")}).status_code == 400
+
+
+def test_open_circuit_falls_back_to_local_report(fake_azure, monkeypatch):
+    monkeypatch.setenv("CACHE_BACKEND", "none")
+    monkeypatch.setenv("AI_CB_FAILURES", "2")
+    monkeypatch.setenv("AI_RETRY_MAX", "1")
+    fake_azure.statuses = [500] * 10
+    with TestClient(app) as client:
+        assert _post(client, "samples/jmeter_sample.csv", "text/csv").status_code == 502
+        resp = _post(client, "samples/jmeter_sample.csv", "text/csv")
+    assert resp.status_code == 200
+    assert resp.json()["metadata"]["ai_mode"] == "local"
+    assert resp.json()["metadata"]["ai_fallback"] == "circuit_open"
+    assert fake_azure.requests == 2
+
+
+def test_ai_stack_loads_lazily_and_on_warmup(monkeypatch):
+    import subprocess
+    import sys
+
+    code = "import sys, src.api.app; print(sorted(m for m in ('openai', 'httpx') if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
+
+    monkeypatch.setenv("WARMUP", "ai,prompts,parsers,pool")
+    monkeypatch.setenv("PARSE_EXECUTOR", "inline")
+    with TestClient(app) as client:
+        body = client.get("/metrics").text
+    for step in ("ai", "prompts", "parsers", "pool"):
+        assert f'informai_warmup_seconds{{step="{step}"}}' in body
+    assert "openai" in sys.modules
+
+
+def test_response_matches_prompt_json_columnar_and_compressed(monkeypatch):
+    from src.application.ai_prompt_builder import build_user_prompt
+    from src.domain.summary_contract import AnalyzeResponse
+
+    prompts = []
+
+    def fake_report(summary, comparison=None):
+        prompts.append(build_user_prompt(summary, comparison))
+        return AIReport(title="Informe", overview="ok"), TokenUsage(total_tokens=42), "stub"
+
+    monkeypatch.setattr(analyze_service, "generate_ai_report", fake_report)
+    client = TestClient(app)
+    resp = _post(client, "samples/jmeter_sample.csv", "text/csv")
+    assert resp.status_code == 200
+    assert "content-encoding" not in resp.headers
+    rows = AnalyzeResponse.model_validate_json(resp.content)
+    # El prompt lleva exactamente el mismo JSON del summary que la respuesta.
+    assert json.dumps(rows.summary.model_dump(mode="json"), separators=(",", ":")) in prompts[0]
+
+    monkeypatch.setenv("RESPONSE_COMPRESSION", "gzip")
+    monkeypatch.setenv("RESPONSE_COMPRESS_MIN_BYTES", "0")
+    with open("samples/jmeter_sample.csv", "rb") as fh:
+        resp = client.post("/summary?layout=columnar", headers={"Accept-Encoding": "gzip"},
+                           files={"file": ("jmeter_sample.csv", fh, "text/csv")})
+    assert resp.headers["content-encoding"] == "gzip"
+    assert resp.headers["vary"] == "Accept-Encoding"
+    body = resp.json()
+    assert body["metadata"]["layout"] == "columnar"
+    columns = body["summary"]["by_method"]
+    assert columns["name"] == [m.name for m in rows.summary.by_method]
+    assert columns["requests"] == [m.requests for m in rows.summary.by_method]
+    assert columns["latency_ms"]["p95"] == [m.latency_ms.p95 for m in rows.summary.by_method]
+    assert body["summary"]["overall"] == rows.summary.overall.model_dump(mode="json")
+
+    with open("samples/jmeter_sample.csv", "rb") as fh:
+        assert client.post("/summary?layout=otro", files={"file": ("x.csv", fh, "text/csv")}).status_code == 400
+
+    # Un cambio en el lugar se refleja: no hay bytes memorizados por instancia.
+    from src.core.fast_json import model_json
+
+    before = model_json(rows.summary)
+    rows.summary.run_id = "otra"
+    assert model_json(rows.summary) != before and b'"run_id":"otra"' in model_json(rows.summary)
@@ -0,0 +1,194 @@
+import io
+import tempfile
+
+import pytest
+
+from src.services.jmeter_summary import build_summary_from_jmeter
+
+SAMPLE = "samples/jmeter_sample.csv"
+
+
+def _sample_bytes() -> bytes:
+    with open(SAMPLE, "rb") as fh:
+        return fh.read()
+
+
+def test_summary_from_sample():
+    summary, flags = build_summary_from_jmeter(_sample_bytes())
+    assert summary.tool == "jmeter"
+    assert summary.overall.requests == 4
+    assert summary.overall.failures == 1
+    assert summary.overall.duration_ms == 1500
+    assert summary.overall.latency_ms.p50 == pytest.approx(230.0)
+    assert [m.name for m in summary.by_method] == ["GET /users", "POST /orders"]
+    assert flags["approximated_percentiles"] is False
+
+
+def test_stream_matches_bytes_and_leaves_stream_open():
+    data = _sample_bytes()
+    with tempfile.SpooledTemporaryFile(max_size=16) as fh:
+        fh.write(data)
+        fh.seek(0)
+        streamed, _ = build_summary_from_jmeter(fh)
+        assert not fh.closed
+    expected, _ = build_summary_from_jmeter(data)
+    assert streamed.model_dump(exclude={"run_id"}) == expected.model_dump(exclude={"run_id"})
+
+
+def test_invalid_rows_are_skipped():
+    data = b"timeStamp,elapsed,label,success\n1000,10,a,true\nxx,10,a,true\n2000,30,a,false\n3000\n"
+    summary, _ = build_summary_from_jmeter(io.BytesIO(data))
+    assert summary.overall.requests == 2
+    assert summary.overall.failures == 1
+    assert summary.overall.duration_ms == 1000
+
+
+def test_missing_columns():
+    with pytest.raises(KeyError):
+        build_summary_from_jmeter(b"timeStamp,elapsed\n1,2\n")
+
+
+@pytest.mark.parametrize("backend", ["python", "numpy"])
+def test_utf8_bom_is_ignored(backend, tmp_path):
+    if backend == "numpy":
+        pytest.importorskip("numpy")
+    from src.services.jmeter_parallel import plan_ranges
+
+    expected, _ = build_summary_from_jmeter(_sample_bytes(), backend="python")
+    got, _ = build_summary_from_jmeter(io.BytesIO(b"\xef\xbb\xbf" + _sample_bytes()), backend=backend)
+    assert got.model_dump(exclude={"run_id"}) == expected.model_dump(exclude={"run_id"})
+    path = tmp_path / "bom.csv"
+    path.write_bytes(b"\xef\xbb\xbf" + _sample_bytes())
+    assert plan_ranges(str(path), 2, ",")[0][0] == "timeStamp"
+
+
+def test_sketch_mode_sets_approximated_flag(monkeypatch):
+    monkeypatch.setenv("PERCENTILE_MODE", "sketch")
+    summary, flags = build_summary_from_jmeter(_sample_bytes())
+    assert flags["approximated_percentiles"] is True
+    assert summary.overall.latency_ms.p50 == pytest.approx(210.0, rel=0.02)
+
+
+def test_columnar_backend_matches_python():
+    pytest.importorskip("numpy")
+    data = (
+        b"timeStamp,elapsed,label,success\n"
+        + b"".join(b"%d,%d,lbl%d,%s\n" % (1000 + i * 7, (i * 37) % 500, i % 5, b"false" if i % 11 == 0 else b"true")
+                   for i in range(2000))
+        + b"bad,1,lbl0,true\n1,2\n"
+    )
+    expected, expected_flags = build_summary_from_jmeter(data, backend="python")
+    got, flags = build_summary_from_jmeter(io.BytesIO(data), backend="numpy")
+    assert got.model_dump(exclude={"run_id"}) == expected.model_dump(exclude={"run_id"})
+    assert flags == expected_flags
+
+
+@pytest.mark.parametrize("mode", ["auto", "sketch"])
+def test_columnar_backend_matches_python_with_label_cap_across_blocks(monkeypatch, mode):
+    pytest.importorskip("numpy")
+    from src.services import jmeter_columnar
+
+    monkeypatch.setattr(jmeter_columnar, "_BLOCK_BYTES", 4096)
+    monkeypatch.setenv("PERCENTILE_MODE", mode)
+    monkeypatch.setenv("SKETCH_EXACT_LIMIT", "300")
+    monkeypatch.setenv("MAX_LABELS", "3")
+    # Las labels aparecen en orden inverso al alfabético y recién en bloques posteriores.
+    data = b"timeStamp,elapsed,label,success\n" + b"".join(
+        b"%d,%d,z%d,%s\n" % (1000 + i, (i * 37) % 500, 9 - min(i // 400, 9), b"false" if i % 7 == 0 else b"true")
+        for i in range(4000))
+    expected, expected_flags = build_summary_from_jmeter(data, backend="python")
+    got, flags = build_summary_from_jmeter(data, backend="numpy")
+    assert got.model_dump(exclude={"run_id"}) == expected.model_dump(exclude={"run_id"})
+    assert flags == expected_flags
+    assert flags["labels_capped"] is True
+    assert flags["approximated_percentiles"] is True
+    assert [m.name for m in got.by_method] == ["(otras operaciones)", "z7", "z8", "z9"]
+
+
+@pytest.mark.parametrize("backend", ["python", "numpy"])
+def test_mapped_file_matches_bytes(backend):
+    if backend == "numpy":
+        pytest.importorskip("numpy")
+    from src.core.io_utils import open_mapped
+
+    expected, _ = build_summary_from_jmeter(_sample_bytes(), backend="python")
+    with open_mapped(SAMPLE) as mapped:
+        got, _ = build_summary_from_jmeter(mapped, backend=backend)
+    assert got.model_dump(exclude={"run_id"}) == expected.model_dump(exclude={"run_id"})
+
+
+def test_timeseries_windows_and_coarsening():
+    from src.core.timeseries import TimeSeries
+
+    data = b"timeStamp,elapsed,label,success\n" + b"".join(
+        b"%d,%d,lbl%d,%s\n" % (i * 250, 100 + i, i % 2, b"false" if i % 4 == 0 else b"true") for i in range(40))
+    series = TimeSeries(1000, max_windows=4)
+    summary, _ = build_summary_from_jmeter(data, backend="python", series=series)
+    # 10 s de datos con máximo 4 ventanas → el ancho base se duplica hasta 4 s.
+    assert series.window_ms == 4000
+    labels = series.to_dict()["labels"]
+    assert sum(sum(v["requests"]) for v in labels.values()) == summary.overall.requests
+    assert sum(sum(v["failures"]) for v in labels.values()) == summary.overall.failures
+
+
+def test_labels_normalized_and_capped(monkeypatch):
+    monkeypatch.setenv("MAX_LABELS", "2")
+    monkeypatch.setenv("LABEL_RULES", '[["^POST /login.*", "POST /login"]]')
+    data = (b"timeStamp,elapsed,label,success\n"
+            b"1,10,GET /orders/123,true\n2,20,GET /orders/456,true\n"
+            b"3,30,POST /login?user=a,true\n4,40,GET /health,false\n5,50,GET /metrics,true\n")
+    summary, flags = build_summary_from_jmeter(data, backend="python")
+    counts = {m.name: m.requests for m in summary.by_method}
+    assert counts == {"GET /orders/{id}": 2, "POST /login": 1, "(otras operaciones)": 2}
+    assert flags["labels_capped"] is True
+
+
+def test_parallel_ranges_match_serial(monkeypatch, tmp_path):
+    from src.core.timeseries import TimeSeries
+    from src.services.jmeter_parallel import aggregate_range, finish_partials, plan_ranges
+
+    path = tmp_path / "big.jtl"
+    path.write_bytes(b"timeStamp,elapsed,label,success\n" + b"".join(
+        b"%d,%d,lbl%d,%s\n" % (1000 + i * 7, (i * 37) % 500, (i * i) % 7, b"false" if i % 11 == 0 else b"true")
+        for i in range(3000)))
+
+    def parallel(series=None):
+        headers, ranges = plan_ranges(str(path), 3)
+        assert len(ranges) == 3
+        window = series.window_ms if series is not None else 0
+        partials = [aggregate_range(str(path), lo, hi, headers, window, 8) for lo, hi in ranges]
+        return finish_partials(partials, series)
+
+    serial_series, parallel_series = TimeSeries(1000, max_windows=8), TimeSeries(1000, max_windows=8)
+    expected, expected_flags = build_summary_from_jmeter(path.read_bytes(), backend="python", series=serial_series)
+    got, flags = parallel(parallel_series)
+    assert got.model_dump(exclude={"run_id"}) == expected.model_dump(exclude={"run_id"})
+    assert flags == expected_flags
+    assert parallel_series.to_dict() == serial_series.to_dict()
+
+    monkeypatch.setenv("MAX_LABELS", "3")
+    capped, flags = parallel()
+    assert flags["labels_capped"] is True
+    assert [m.name for m in capped.by_method] == ["(otras operaciones)", "lbl0", "lbl1", "lbl4"]
+    assert capped.overall.requests == 3000
+
+
+def test_sniffed_xml_and_semicolon_csv_match_comma_csv():
+    from src.application.summary_service import detect_and_build_summary, sniff_format
+
+    expected, _ = build_summary_from_jmeter(_sample_bytes(), backend="python")
+    rows = [line.split(",") for line in _sample_bytes().decode().splitlines()[1:]]
+    xml = ('<?xml version="1.0" encoding="UTF-8"?>\n<testResults version="1.2">\n' + "".join(
+        f'<httpSample t="{r[1]}" ts="{r[0]}" s="{r[6]}" lb="{r[2]}" rc="{r[3]}">'
+        f'<httpSample t="1" ts="{r[0]}" s="true" lb="embebido"/></httpSample>\n' for r in rows)
+        + "</testResults>\n").encode()
+    semicolon = _sample_bytes().replace(b",", b";")
+
+    assert sniff_format(xml, "run.jtl", "text/csv") == ("jmeter_xml", ",")
+    assert sniff_format(semicolon, "run.csv", "text/csv") == ("jmeter", ";")
+    for data in (xml, semicolon):
+        got, _ = detect_and_build_summary(data, "run.jtl", "text/csv")
+        assert got.model_dump(exclude={"run_id"}) == expected.model_dump(exclude={"run_id"})
+
+    with pytest.raises(ValueError):
+        sniff_format(b"timeStamp,elapsed\n", "run.json", "application/json")
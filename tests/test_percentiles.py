@@ -0,0 +1,60 @@
+import random
+
+import pytest
+
+from src.core.percentiles import percentile, percentiles
+from src.core.sketch import QuantileSketch, SUMMARY_QUANTILES
+
+
+def test_percentile_interpolates():
+    assert percentile([], 0.5) == 0.0
+    assert percentile([10.0], 0.99) == 10.0
+    assert percentile([1.0, 2.0, 3.0, 4.0], 0.5) == pytest.approx(2.5)
+    assert percentiles([4.0, 1.0, 3.0, 2.0], (0.5, 0.9)) == [pytest.approx(2.5), pytest.approx(3.7)]
+
+
+def test_sketch_exact_mode_matches_percentile():
+    values = [random.uniform(1, 1000) for _ in range(500)]
+    sk = QuantileSketch(relative_accuracy=0.01, exact_limit=1000)
+    for v in values:
+        sk.add(v)
+    assert sk.is_exact
+    assert sk.quantiles() == percentiles(values, SUMMARY_QUANTILES)
+
+
+def test_sketch_respects_relative_accuracy():
+    rnd = random.Random(7)
+    values = [rnd.lognormvariate(5, 1) for _ in range(20000)] + [0.0] * 10
+    sk = QuantileSketch(relative_accuracy=0.01, exact_limit=100)
+    for v in values:
+        sk.add(v)
+    assert not sk.is_exact
+    ranked = sorted(values)
+    for p, est in zip(SUMMARY_QUANTILES, sk.quantiles()):
+        real = ranked[int(p * (len(ranked) - 1))]
+        assert est == pytest.approx(real, rel=0.011)
+
+
+def test_sketch_merge_equals_single_pass():
+    rnd = random.Random(3)
+    values = [rnd.expovariate(1 / 200) for _ in range(5000)]
+    whole = QuantileSketch(relative_accuracy=0.02, exact_limit=0)
+    parts = [QuantileSketch(relative_accuracy=0.02, exact_limit=300) for _ in range(4)]
+    for i, v in enumerate(values):
+        whole.add(v)
+        parts[i % 4].add(v)
+    merged = QuantileSketch(relative_accuracy=0.02, exact_limit=300)
+    for part in parts:
+        merged.merge(part)
+    assert merged.count == whole.count
+    assert merged.quantiles() == whole.quantiles()
+    restored = QuantileSketch.from_dict(merged.to_dict())
+    assert restored.quantiles() == merged.quantiles()
+
+
+def test_sketch_merge_rejects_different_accuracy():
+    a = QuantileSketch(relative_accuracy=0.01)
+    b = QuantileSketch(relative_accuracy=0.02)
+    b.add(1.0)
+    with pytest.raises(ValueError):
+        a.merge(b)